@@ -0,0 +1,101 @@
+"""盤中即時報價輪詢基準測試（離線）：產生錄製格式的合成報價，以 RecordedSession 重播，
+量測每輪批次查詢、解碼與寫入報價表的時間，並確認低於輪詢間隔
+
+使用方式：python benchmarks/realtime_feed.py [--symbols 150] [--polls 200] [--session 錄製檔]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_core.realtime import (REALTIME_INTERVAL, QuoteFeed, RecordedSession,  # noqa: E402
+                                 mis_channel)
+
+
+class CountingSource:
+    """計算請求次數的報價來源包裝"""
+
+    def __init__(self, source):
+        self.source = source
+        self.requests = 0
+
+    def fetch(self, channels):
+        self.requests += 1
+        return self.source.fetch(channels)
+
+
+def write_synthetic_session(path, symbols, polls, interval=REALTIME_INTERVAL, seed=0):
+    """產生 MIS 回應格式的隨機漫步報價錄製檔"""
+    rng = np.random.default_rng(seed)
+    prev_close = rng.uniform(20, 600, len(symbols)).round(2)
+    price = prev_close.copy()
+    high, low = price.copy(), price.copy()
+    volume = np.zeros(len(symbols), dtype=int)
+    start = time.time()
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(polls):
+            price = (price * (1 + rng.normal(0, 0.001, len(symbols)))).round(2)
+            high, low = np.maximum(high, price), np.minimum(low, price)
+            volume += rng.integers(0, 50, len(symbols))
+            messages = [{
+                'c': code, 'n': f"股票{code}", 'ex': mis_channel(code).split('_')[0],
+                'ch': f"{code}.tw", 'z': f"{p:.4f}", 'y': f"{y:.4f}", 'o': f"{y:.4f}",
+                'h': f"{h:.4f}", 'l': f"{lo:.4f}", 'v': str(v),
+                'tlong': str(int((start + i * interval) * 1000)),
+                'b': f"{p - 0.05:.4f}_", 'a': f"{p + 0.05:.4f}_",
+            } for code, p, y, h, lo, v in zip(symbols, price, prev_close, high, low, volume)]
+            f.write(json.dumps({'time': start + i * interval, 'msgArray': messages},
+                               ensure_ascii=False) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="即時報價輪詢基準測試")
+    parser.add_argument('--symbols', type=int, default=150, help="股票數（使用合成資料時）")
+    parser.add_argument('--polls', type=int, default=200, help="輪詢次數")
+    parser.add_argument('--session', help="錄製的輪詢檔（預設產生合成資料）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = args.session
+        if not path:
+            path = os.path.join(workdir, 'session.jsonl')
+            symbols = [str(1101 + i) for i in range(args.symbols)]
+            write_synthetic_session(path, symbols, args.polls)
+        else:
+            with open(path, encoding='utf-8') as f:
+                symbols = [msg['c'] for msg in json.loads(f.readline())['msgArray']]
+
+        # 以模擬時鐘重播，每輪輪詢推進一個輪詢間隔
+        now = [0.0]
+        session = RecordedSession(path, clock=lambda: now[0])
+        source = CountingSource(session)
+        feed = QuoteFeed(source)
+        feed.add_symbols(symbols)
+
+        timings = []
+        for _ in range(args.polls):
+            now[0] += REALTIME_INTERVAL
+            start = time.perf_counter()
+            updated = feed.poll()
+            timings.append(time.perf_counter() - start)
+
+    print(f"{len(symbols)} 檔股票，{args.polls} 輪輪詢，每輪 {source.requests // args.polls} 個請求")
+    print(f"每輪解碼與寫入：中位數 {statistics.median(timings) * 1000:.2f} ms，"
+          f"最大 {max(timings) * 1000:.2f} ms（輪詢間隔 {REALTIME_INTERVAL} 秒）")
+    print(f"最後一輪更新 {len(updated)} 檔，{symbols[0]} 現價 {feed.table.get(symbols[0])['price']:.2f}")
+
+    if len(updated) != len(symbols) or max(timings) > REALTIME_INTERVAL:
+        print("輪詢未更新所有股票或超過輪詢間隔")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""本機服務壓力測試（離線）：以重播資料啟動服務，大量同時請求相同股票，
+量測延遲與吞吐量，並確認請求合併後向上游抓取的次數不超過股票數
+
+使用方式：python benchmarks/service_load.py [--requests 2000] [--concurrency 32] [--symbols 20]
+                                        [--latency 0.2] [--replay ohlcv_cache]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_core.market import format_stock_code  # noqa: E402
+from stock_core.service import (QuoteService, ReplayProvider, ServiceClient,  # noqa: E402
+                                create_server)
+
+ENDPOINTS = ['quote/{}', 'indicators/{}', 'bars/{}', 'chip/{}']
+
+
+def write_synthetic_replay(directory, symbols, days=500, seed=0):
+    """產生隨機漫步日K作為重播資料"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    for code in symbols:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+        open_ = close * (1 + rng.normal(0, 0.005, days))
+        df = pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) * 1.01,
+            'Low': np.minimum(open_, close) * 0.99,
+            'Close': close,
+            'Volume': rng.integers(1000, 100000, days).astype(float),
+        }, index=index)
+        df.to_csv(os.path.join(directory, f"{format_stock_code(code)}.csv"), index_label="Date")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本機服務壓力測試")
+    parser.add_argument('--requests', type=int, default=2000, help="請求總數")
+    parser.add_argument('--concurrency', type=int, default=32, help="同時請求數")
+    parser.add_argument('--symbols', type=int, default=20, help="股票數（使用合成資料時）")
+    parser.add_argument('--latency', type=float, default=0.2, help="模擬的上游延遲（秒）")
+    parser.add_argument('--replay', help="錄製的日K目錄（預設產生合成資料）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.replay:
+            directory = args.replay
+            symbols = [name.split('.')[0] for name in sorted(os.listdir(directory))
+                       if name.endswith('.csv')][:args.symbols]
+        else:
+            directory = workdir
+            symbols = [str(2000 + i) for i in range(args.symbols)]
+            write_synthetic_replay(directory, symbols)
+
+        provider = ReplayProvider(directory, args.latency)
+        service = QuoteService(provider, ledger_path=os.path.join(workdir, 'none.csv'))
+        server = create_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = ServiceClient(f"http://127.0.0.1:{server.server_address[1]}")
+
+        paths = [ENDPOINTS[i % len(ENDPOINTS)].format(symbols[(i // len(ENDPOINTS)) % len(symbols)])
+                 for i in range(args.requests)]
+
+        def timed(path):
+            start = time.perf_counter()
+            client.get(path)
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            latencies = sorted(executor.map(timed, paths))
+        elapsed = time.perf_counter() - start
+        server.shutdown()
+        server.server_close()
+
+    stats = service.stats()
+    print(f"{args.requests} 個請求，{len(symbols)} 檔股票，同時 {args.concurrency} 個連線")
+    print(f"總時間：{elapsed:.2f} 秒（{args.requests / elapsed:.0f} 請求/秒）")
+    print(f"延遲：中位數 {statistics.median(latencies) * 1000:.1f} ms，"
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms，"
+          f"最大 {latencies[-1] * 1000:.1f} ms")
+    print(f"快取命中 {stats['hits']}，載入 {stats['loads']}，合併 {stats['coalesced']}，"
+          f"上游抓取 {stats['upstream_fetches']}")
+
+    # 每檔股票最多抓取日K與籌碼各一次
+    limit = 2 * len(symbols)
+    if stats['upstream_fetches'] > limit:
+        print(f"上游抓取次數超過 {limit}：請求合併或快取失效")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
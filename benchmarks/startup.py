@@ -0,0 +1,108 @@
+"""啟動時間基準測試：量測 import stock_core、import main 與主視窗第一次繪製的時間，超出預算時回傳非 0
+
+使用方式：python benchmarks/startup.py [--repeat 5] [--core-budget 150] [--import-budget 300]
+                                   [--paint-budget 1500] [--ledger stock_trades-original.csv]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 啟動時不應載入的重量級套件（應在第一次使用時才匯入）
+HEAVY_MODULES = ['pandas', 'matplotlib', 'yfinance', 'requests', 'bs4', 'numba']
+
+# 核心函式庫不可依賴 GUI
+GUI_MODULES = ['tkinter', 'main']
+
+IMPORT_SCRIPT = """
+import json, os, sys, time
+start = time.perf_counter()
+import %s
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'seconds': elapsed,
+    'heavy': [m for m in %r if m in sys.modules],
+    'files': sorted(os.listdir('.')),
+}))
+"""
+
+PAINT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import main
+try:
+    root = main.build_gui()
+except Exception as e:  # 沒有顯示器（例如伺服器）時略過
+    print(json.dumps({'skipped': str(e)}))
+    sys.exit(0)
+root.update_idletasks()
+root.update()
+elapsed = time.perf_counter() - start
+root.destroy()
+print(json.dumps({'seconds': elapsed}))
+"""
+
+
+def run_child(script, workdir):
+    """在乾淨的子程序中執行量測腳本（工作目錄為暫存資料夾，避免動到使用者資料）"""
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    result = subprocess.run([sys.executable, '-c', script], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="量測啟動時間")
+    parser.add_argument('--repeat', type=int, default=5, help="重複次數（取中位數）")
+    parser.add_argument('--core-budget', type=float, default=150, help="import stock_core 預算（毫秒）")
+    parser.add_argument('--import-budget', type=float, default=300, help="import 預算（毫秒）")
+    parser.add_argument('--paint-budget', type=float, default=1500, help="第一次繪製預算（毫秒）")
+    parser.add_argument('--ledger', help="複製到測試目錄的交易紀錄檔（測試大量交易時的啟動時間）")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.ledger:
+            shutil.copy(args.ledger, os.path.join(workdir, 'stock_trades-original.csv'))
+        before = sorted(os.listdir(workdir))
+
+        checks = [('stock_core', args.core_budget, HEAVY_MODULES + GUI_MODULES),
+                  ('main', args.import_budget, HEAVY_MODULES)]
+        for module, budget, forbidden in checks:
+            script = IMPORT_SCRIPT % (module, forbidden)
+            imports = [run_child(script, workdir) for _ in range(args.repeat)]
+            import_ms = statistics.median(r['seconds'] for r in imports) * 1000
+            print(f"import {module}：{import_ms:.0f} ms（預算 {budget:.0f} ms）")
+            if import_ms > budget:
+                failed = True
+                print("  超出預算")
+            loaded = sorted({m for r in imports for m in r['heavy']})
+            if loaded:
+                failed = True
+                print(f"  import 時載入了不應載入的模組：{', '.join(loaded)}")
+            if imports[-1]['files'] != before:
+                failed = True
+                print("  import 時建立了檔案："
+                      f"{', '.join(set(imports[-1]['files']) - set(before))}")
+
+        paints = [run_child(PAINT_SCRIPT, workdir) for _ in range(args.repeat)]
+        if 'skipped' in paints[0]:
+            print(f"第一次繪製：略過（{paints[0]['skipped']}）")
+        else:
+            paint_ms = statistics.median(r['seconds'] for r in paints) * 1000
+            print(f"第一次繪製：{paint_ms:.0f} ms（預算 {args.paint_budget:.0f} ms）")
+            if paint_ms > args.paint_budget:
+                failed = True
+                print("  超出預算")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,185 +1,78 @@
 import time
-from datetime import time as time_obj  # Rename to avoid conflict
-from bs4 import BeautifulSoup
-import requests
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog
-import yfinance as yf
-import pandas as pd
+import numpy as np
 import os
-from datetime import datetime, timedelta, time
-import matplotlib.pyplot as plt
-import matplotlib
-# Use system Chinese font for macOS
-matplotlib.rcParams['font.family'] = [
-    'Arial Unicode MS', 'Heiti TC', 'STHeiti', 'Microsoft YaHei']
-
-# 設定 matplotlib 中文字型
-plt.rcParams['font.sans-serif'] = ['Arial Unicode MS']  # Mac OS 的中文字型
-plt.rcParams['axes.unicode_minus'] = False  # 讓負號正確顯示
+import sys
+import threading
+from datetime import datetime
+
+from stock_core.backtest import (BACKTEST_SHARES, STRATEGIES, backtest_strategy, load_price_panel,
+                                 parse_parameter_space, run_parameter_sweep)
+from stock_core.benchmark import BENCHMARKS, DEFAULT_BENCHMARK, ROLLING_WINDOWS
+from stock_core.charts import ChipChart, DownsampledLine, PriceChart, TechnicalChart
+from stock_core.cli import main as run_cli
+from stock_core.events import BarsUpdated, EventBus, LedgerChanged, QuoteUpdated, SymbolSelected
+from stock_core.intraday import INTRADAY_TIMEFRAMES, IntradayStore
+from stock_core.lazy import LazyImport, configure_matplotlib
+from stock_core.ledger import (append_trade, build_performance_report, build_stock_history,
+                               calculate_fees, format_trades_list, get_stock_holdings,
+                               load_original_trades)
+from stock_core.market import (TIMEFRAMES, fetch_quote, get_bars, load_chip_data,
+                               load_stock_universe, sync_daily_store)
+from stock_core.portfolio import PERIODS, load_portfolio_performance
+from stock_core.realtime import REALTIME_INTERVAL, QuoteFeed, RecordedSession
+from stock_core.reports import get_report_symbols
+from stock_core.risk import (RISK_LEVELS, AlertEngine, ExposureBook, load_risk_settings,
+                             save_risk_settings, validate_risk_settings)
+from stock_core.scheduler import RefreshScheduler
+from stock_core.screener import run_screener
+from stock_core.service import ServiceClient
+
+pd = LazyImport(globals(), 'pd', 'pandas')
+plt = LazyImport(globals(), 'plt', 'matplotlib.pyplot', on_load=configure_matplotlib)
+mdates = LazyImport(globals(), 'mdates', 'matplotlib.dates', on_load=configure_matplotlib)
+Figure = LazyImport(globals(), 'Figure', 'matplotlib.figure', 'Figure', configure_matplotlib)
+FigureCanvasTkAgg = LazyImport(globals(), 'FigureCanvasTkAgg', 'matplotlib.backends.backend_tkagg',
+                               'FigureCanvasTkAgg', configure_matplotlib)
 
 # 全局變量
 root = None
 entry_code = None
+entry_buy_price = None  # 新增交易：買入價格
+entry_shares = None  # 新增交易：股數
 stock_combo = None
 label_price = None
 text_history = None
+history_pager = None  # 歷史交易記錄分頁（TextPager）
 text_trades = None
 summary_frame = None
 chart_frame = None
 notebook = None  # 添加 notebook 作為全局變量
-
-# 設定交易紀錄檔案
-FILE_NAME = "stock_trades.csv"
-
-# 若檔案不存在，建立檔案
-if not os.path.exists(FILE_NAME):
-    df = pd.DataFrame(columns=[
-        "交易日期", "買/賣/股利", "代號", "股票", "交易類別",
-        "買入股數", "買入價格", "賣出股數", "賣出價格", "現價",
-        "手續費", "交易稅", "交易成本", "支出", "收入",
-        "價差", "ROR", "持有時間"
-    ])
-    df.to_csv(FILE_NAME, index=False)
-
-# 讀取歷史交易紀錄
-
-
-def load_trades():
-    """讀取交易記錄"""
-    if os.path.exists(FILE_NAME):
-        return pd.read_csv(FILE_NAME)
-    return pd.DataFrame(columns=[
-        "交易日期", "買/賣/股利", "代號", "股票", "交易類別",
-        "買入股數", "買入價格", "賣出股數", "賣出價格", "現價",
-        "手續費", "交易稅", "交易成本", "支出", "收入",
-        "價差", "ROR", "持有時間"
-    ])
-
-
-def format_stock_code(code):
-    """格式化股票代號為 Yahoo Finance 格式"""
-    # 移除任何非数字字符
-    code = ''.join(filter(str.isdigit, str(code)))
-
-    # 确保代码至少为4位数
-    code = code.zfill(4)
-
-    # DR股票（如9103美德医疗-DR）使用.TW
-    if code.startswith('91'):
-        return f"{code}.TW"
-    # ETF通常以00開頭
-    elif code.startswith('00'):
-        return f"{code}.TW"
-    # 上櫃股票通常以6開頭
-    elif code.startswith('6'):
-        return f"{code}.TWO"
-    # 其他情况（主要是上市股票）
-    else:
-        return f"{code}.TW"
-
-
-def calculate_fees(price, shares, is_buy=True):
-    """計算手續費和交易稅"""
-    fee = round(max(20, price * shares * 0.001425))  # 手續費 0.1425%，最低20元
-    tax = 0 if is_buy else round(price * shares * 0.003)  # 賣出時收取 0.3% 證交稅
-    return fee, tax
-
-
-def get_stock_name(stock):
-    """獲取股票名稱"""
-    try:
-        info = stock.info
-        return info.get('longName', '') or info.get('shortName', '')
-    except:
-        return ''
-
-
-def load_original_trades():
-    """讀取原始交易記錄檔案"""
-    try:
-        if os.path.exists("stock_trades-original.csv"):
-            # 讀取 CSV 文件，指定編碼為 utf-8
-            df = pd.read_csv("stock_trades-original.csv", encoding='utf-8')
-
-            # 確保必要的列存在
-            required_columns = [
-                "交易日期", "買/賣/股利", "代號", "股票", "交易類別",
-                "買入股數", "買入價格", "賣出股數", "賣出價格", "現價",
-                "手續費", "交易稅", "交易成本", "支出", "收入"
-            ]
-
-            for col in required_columns:
-                if col not in df.columns:
-                    print(f"警告：缺少必要欄位 {col}")
-                    return pd.DataFrame()
-
-            # 處理日期格式
-            df['交易日期'] = pd.to_datetime(df['交易日期']).dt.strftime('%Y/%m/%d')
-
-            # 處理數值欄位，將非數值填充為 0
-            numeric_columns = ['買入股數', '買入價格', '賣出股數', '賣出價格',
-                               '現價', '手續費', '交易稅', '交易成本']
-            for col in numeric_columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-            # 處理金額欄位中的逗號和引號
-            for col in ['支出', '收入']:
-                df[col] = pd.to_numeric(df[col].str.replace(
-                    ',', '').str.replace('"', ''), errors='coerce').fillna(0)
-
-            return df
-
-    except Exception as e:
-        print(f"讀取交易記錄時出錯：{str(e)}")
-        return pd.DataFrame()
-
-    return pd.DataFrame()
-
-
-def get_stock_holdings():
-    """獲取當前所有股票持股狀況"""
-    df = load_original_trades()
-    if df.empty:
-        return {}
-
-    holdings = {}
-
-    # 按股票代號分組處理
-    for code in df['代號'].unique():
-        stock_df = df[df['代號'] == code]
-
-        # 計算總買入和賣出股數
-        total_bought = stock_df[stock_df['買/賣/股利'] == '買']['買入股數'].sum()
-        total_sold = stock_df[stock_df['買/賣/股利'] == '賣']['賣出股數'].sum()
-
-        # 計算當前持股
-        current_shares = total_bought - total_sold
-
-        if current_shares > 0:
-            # 獲取最新的股票名稱
-            stock_name = stock_df.iloc[-1]['股票'] if pd.notna(
-                stock_df.iloc[-1]['股票']) else "未知股票"
-
-            # 計算平均成本
-            buy_records = stock_df[stock_df['買/賣/股利'] == '買']
-            total_cost = (buy_records['買入價格'] * buy_records['買入股數']).sum()
-            avg_cost = total_cost / total_bought if total_bought > 0 else 0
-
-            holdings[code] = {
-                'name': stock_name,
-                'shares': current_shares,
-                'avg_cost': avg_cost
-            }
-
-    return holdings
-
-
-def update_stock_list(*args):
-    """更新股票清單下拉選單"""
-    holdings = get_stock_holdings()
+timeframe_combo = None  # K線週期選單
+price_chart = None  # 主畫面K線圖（PriceChart）
+_lazy_tabs = {}  # 尚未建立的分頁：佔位頁面路徑 -> 建立函數
+refresh_scheduler = None  # 定時更新排程器（RefreshScheduler）
+watched_stock = None  # 目前定時更新的股票代號
+quote_feed = None  # 盤中即時報價（QuoteFeed）
+quote_labels = {}  # 即時報價欄位名稱 -> Label
+intraday_store = None  # 盤中分K（IntradayStore）
+alert_engine = None  # 持股停損/停利警示（AlertEngine）
+risk_settings = load_risk_settings()  # 風險控管參數（risk_settings.json）
+exposure_book = None  # 持股成本部位（ExposureBook），第一次檢查時由持股建立，交易紀錄變動時重建
+event_bus = EventBus()  # 頁面間的事件匯流排（build_gui 時改為以 root.after 合併分派）
+
+# 設定時改由本機服務取得報價（python main.py serve），例如 http://127.0.0.1:8765
+SERVICE_URL = os.environ.get("STOCK_SERVICE_URL")
+# 即時報價錄製檔：STOCK_MIS_REPLAY 時離線重播（不連線證交所），STOCK_MIS_RECORD 時錄製每輪結果
+MIS_REPLAY = os.environ.get("STOCK_MIS_REPLAY")
+MIS_RECORD = os.environ.get("STOCK_MIS_RECORD")
+
+
+def update_stock_list(path=None):
+    """更新股票清單下拉選單（path 預設為共用的交易紀錄檔）"""
+    trades = load_original_trades(path)
+    holdings = get_stock_holdings(trades)
 
     # 清空當前選項
     stock_combo['values'] = []
@@ -197,7 +90,7 @@ def update_stock_list(*args):
         stock_combo.set('無持股紀錄')
 
     # 確保所有持有的股票代號都能正確顯示在下拉選單中
-    all_codes = load_original_trades()['代號'].unique()
+    all_codes = trades['代號'].unique() if not trades.empty else []
     for code in all_codes:
         if code not in holdings:
             stock_options.append(f"{code} - 未知股票 (0股)")
@@ -209,276 +102,254 @@ def update_stock_list(*args):
         stock_combo.set('無持股紀錄')
 
 
-def show_stock_history(stock_code):
-    """顯示特定股票的歷史交易記錄"""
-    df = load_original_trades()
-    if df.empty:
-        return "無歷史交易記錄"
-
-    # 過濾指定股票的記錄並按日期排序（確保買賣順序正確）
-    stock_records = df[df['代號'] == int(stock_code)].sort_values('交易日期')
-    if stock_records.empty:
-        return "該股票無歷史交易記錄"
-
-    # 初始化變數
-    total_investment = 0  # 總投資（含手續費）
-    current_shares = 0   # 目前持股數
-    total_cost = 0      # 當前持股成本（不含手續費和交易稅）
-    total_profit = 0    # 總獲利
-
-    # 添加表頭
-    history_text = "═" * 120 + "\n"
-    history_text += "📊 歷史交易記錄\n"
-    history_text += "═" * 120 + "\n"
-
-    # 新增列標題
-    history_text += (
-        f"{'交易日期':^9.99} | "
-        f"{'交易':^5.5} | "
-        f"{'價格':>6} | "
-        f"{'股數':>9} | "
-        f"{'金額':>11} | "
-        f"{'手續費':>6.5} | "
-        f"{'交易稅':>6.5} | "
-        f"{'損益':>11}\n"
-    )
-    history_text += "─" * 120 + "\n"
+HISTORY_PAGE_ROWS = 500  # 歷史交易記錄每頁顯示的交易筆數
 
-    # 處理每筆交易
-    for _, row in stock_records.iterrows():
-        trade_type = row['買/賣/股利']
-        profit = 0
 
-        try:
-            if trade_type == '買':
-                # 處理買入交易
-                price = float(row['買入價格'])
-                shares = int(row['買入股數'])
-                amount = price * shares
-                fee = float(row['手續費']) if pd.notna(row.get('手續費')) else 20
-                tax = 0
-
-                # 更新持倉資訊
-                current_shares += shares
-                total_cost += amount
-                total_investment += (amount + fee)
-
-            elif trade_type == '賣':
-                # 處理賣出交易
-                price = float(row['賣出價格'])
-                shares = int(row['賣出股數'])
-                amount = price * shares
-                fee = float(row['手續費']) if pd.notna(row.get('手續費')) else 20
-                tax = float(row['交易稅']) if pd.notna(
-                    row.get('交易稅')) else round(amount * 0.003)
-
-                if current_shares >= shares:
-                    # 計算賣出部分的成本（使用平均成本）
-                    avg_cost_per_share = total_cost / current_shares
-                    sold_cost = avg_cost_per_share * shares
-
-                    # 計算本次交易獲利
-                    # 卖賣出收入 = 賣出金額 - 手續費 - 交易稅
-                    net_income = amount - fee - tax
-                    # 賣出成本 = 買進成本 + 買進手續費
-                    buy_fee = 20  # 買進手續費最低20元
-                    buy_cost = sold_cost + buy_fee
-                    # 實際獲利 = 賣出淨收入 - 買入成本
-                    profit = net_income - buy_cost
-                    total_profit += profit
-
-                    # 更新持倉資訊
-                    current_shares -= shares
-                    # 更新剩餘股票的成本
-                    if current_shares > 0:
-                        total_cost = avg_cost_per_share * current_shares
-                    else:
-                        total_cost = 0
-
-            # 格式化每筆交易記錄
-            history_text += (
-                f"{str(row['交易日期']):^12} | "
-                f"{trade_type:^6} | "
-                f"{price:>7.2f} | "
-                f"{shares:>10,d} | "
-                f"{amount:>12,.0f} | "
-                f"{fee:>8,.0f} | "
-                f"{tax:>8,.0f} | "
-                f"{profit:>12,.0f}\n"
-            )
+class TextPager:
+    """長文字報表分頁顯示：每次換頁只對 Text 元件做一次插入"""
 
-        except Exception as e:
-            print(f"處理交易記錄時出錯：{e}")
-            continue
-
-    # 新增匯總資訊
-    history_text += "═" * 120 + "\n"
-
-    # 計算報酬率（保留兩位小數）
-    if total_investment > 0:
-        roi = (total_profit / total_investment) * 100
-        history_text += (
-            f"總投資金額：{total_investment:>7,.0f} 元   |   "
-            f"總損益：{total_profit:>8,.0f} 元   |   "
-            f"報酬率：{roi:>8.2f}%\n"
-        )
+    def __init__(self, text, nav_master, page_rows=HISTORY_PAGE_ROWS):
+        self.text = text
+        self.page_rows = page_rows
+        self.header, self.lines, self.footer = "", [], ""
+        self.page = 0
 
-    # 新增目前持股資訊
-    history_text += f"目前持有：{current_shares:,d} 股"
-    if current_shares > 0 and total_cost > 0:
-        avg_cost = total_cost / current_shares
-        history_text += f"   |   平均成本：{avg_cost:,.2f} 元"
-    history_text += "\n"
+        self.prev_button = ttk.Button(nav_master, text="◀ 上一頁", width=8,
+                                      command=lambda: self.show_page(self.page - 1))
+        self.prev_button.pack(side='left', padx=5)
+        self.page_label = ttk.Label(nav_master, text="")
+        self.page_label.pack(side='left', padx=5)
+        self.next_button = ttk.Button(nav_master, text="下一頁 ▶", width=8,
+                                      command=lambda: self.show_page(self.page + 1))
+        self.next_button.pack(side='left', padx=5)
 
-    history_text += "═" * 120 + "\n"
-    return history_text
+    @property
+    def page_count(self):
+        return max(1, -(-len(self.lines) // self.page_rows))
 
+    def show(self, header, lines, footer="", page=-1):
+        """載入報表內容，預設顯示最後一頁（最新的交易）"""
+        self.header, self.lines, self.footer = header, lines, footer
+        self.show_page(self.page_count - 1 if page < 0 else page)
 
-def auto_update_price():
-    """自動更新股價"""
-    if hasattr(root, 'status_label'):
-        root.status_label.config(text="更新中...")
+    def show_page(self, page):
+        self.page = max(0, min(page, self.page_count - 1))
+        start = self.page * self.page_rows
+        body = "".join(self.lines[start:start + self.page_rows])
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, self.header + body + self.footer)
+
+        self.page_label.config(text=f"第 {self.page + 1} / {self.page_count} 頁")
+        self.prev_button.state(['!disabled' if self.page > 0 else 'disabled'])
+        self.next_button.state(
+            ['!disabled' if self.page < self.page_count - 1 else 'disabled'])
+
+
+def fetch_stock_update(stock_code):
+    """背景取得最新報價並預先更新日K快取（介面執行緒只需重繪）"""
+    quote = get_quote(stock_code)
+    get_bars(stock_code, "D")
+    return stock_code, quote
 
-    # 獲取當前時間
-    now = datetime.now()
-    current_time = now.time()
-    current_day = now.weekday()
 
-    # 檢查是否在交易時間內（週一至週五，8:30 至 13:30）
-    if current_day < 5 and time_obj(8, 30) <= current_time <= time_obj(13, 30):
-        result = get_stock_price()
+def on_quote_update(update):
+    """排程器更新報價後刷新價格與走勢圖"""
+    stock_code, quote = update
+    show_price(*quote)
+    event_bus.publish(BarsUpdated(frozenset([stock_code]), frozenset(TIMEFRAMES.values())))
 
     if hasattr(root, 'status_label'):
         root.status_label.config(text="就緒")
         if hasattr(root, 'update_time_label'):
-            current_time_str = now.strftime("%Y-%m-%d %H:%M:%S")
+            current_time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             root.update_time_label.config(text=f"最後更新：{current_time_str}")
 
-    # 每分鐘更新一次
-    root.after(60000, auto_update_price)
 
+def watch_stock(stock_code):
+    """定時更新目前顯示的股票：切換股票時取消前一檔的訂閱，計時器數量不隨切換次數增加"""
+    global watched_stock
+    if not refresh_scheduler or stock_code == watched_stock:
+        return
+    if watched_stock:
+        refresh_scheduler.unsubscribe(('quote', watched_stock), on_quote_update)
+    watched_stock = stock_code
+    # 剛取得過報價，等到下一次排程再更新
+    refresh_scheduler.subscribe(('quote', stock_code), lambda: fetch_stock_update(stock_code),
+                                on_quote_update, immediate=False)
+
+    # 加入即時報價輪詢，已有報價時立即顯示
+    if quote_feed:
+        quote_feed.add_symbols([stock_code])
+        show_realtime_quote(stock_code)
+
+
+def on_symbol_selected(event):
+    """切換股票：更新走勢圖與歷史交易記錄，之後由排程器定時更新這檔股票"""
+    update_stock_chart(event.code)
+    if history_pager:
+        history_pager.show(*build_stock_history(event.code))
+    watch_stock(event.code)
+
+
+def on_bars_updated(event):
+    """目前顯示的股票在所選週期有新K棒時重繪走勢圖"""
+    if watched_stock in event.codes and get_selected_timeframe() in event.timeframes:
+        update_stock_chart(watched_stock)
+
+
+def show_realtime_quote(stock_code):
+    """將即時報價表中的報價顯示在報價欄位"""
+    quote = quote_feed.table.get(stock_code) if quote_feed else None
+    if not quote or not quote_labels:
+        return
+    texts = {
+        "現價": f"{quote['price']:.2f}",
+        "漲跌": f"{quote['change']:+.2f}",
+        "漲跌幅": f"{quote['change_pct']:+.2f}%",
+        "成交量": f"{quote['volume']:,.0f} 張",
+        "最高": f"{quote['high']:.2f}",
+        "最低": f"{quote['low']:.2f}"
+    }
+    for label, text in texts.items():
+        quote_labels[label].config(text=text.replace('nan', '-'))
+
+
+def on_realtime_update(updated):
+    """即時報價輪詢完成：合成盤中分K、檢查停損/停利，並通知各頁面哪些股票有更新"""
+    if not updated:
+        return
+    intraday_store.add_quotes(quote_feed.table, updated)
+    if alert_engine:
+        notify_alerts(alert_engine.check_table(quote_feed.table))
+    codes = frozenset(updated)
+    event_bus.publish(QuoteUpdated(codes))
+    event_bus.publish(BarsUpdated(codes, frozenset(INTRADAY_TIMEFRAMES.values())))
+
+
+def notify_alerts(alerts):
+    """顯示新觸發的停損/停利提醒（同一輪的提醒合併為一個對話框）"""
+    if not alerts:
+        return
+    if hasattr(root, 'status_label'):
+        root.status_label.config(text=alerts[0].message)
+    root.bell()
+    messagebox.showwarning("停損/停利提醒", "\n".join(alert.message for alert in alerts))
+
+
+def refresh_alert_positions(path=None):
+    """依目前持股（path 預設為共用的交易紀錄檔）與停損/停利比例更新警示規則"""
+    if alert_engine is None:
+        return
+    try:
+        alert_engine.set_positions(get_stock_holdings(load_original_trades(path)),
+                                   risk_settings['stop_loss'],
+                                   risk_settings['take_profit'])
+    except Exception as e:
+        print(f"更新停損停利設定時出錯：{str(e)}")
+
+
+def get_exposure_book():
+    """取得持股成本部位（第一次使用時由共用的交易紀錄檔建立，記錄交易時增量更新）"""
+    global exposure_book
+    if exposure_book is None:
+        exposure_book = ExposureBook(get_stock_holdings())
+    return exposure_book
 
-def update_stock_chart(stock_code):
+
+def rebuild_exposure_book(path=None):
+    """交易紀錄檔（path 預設為共用的交易紀錄檔）變動後由持股重建成本部位"""
+    global exposure_book
+    try:
+        exposure_book = ExposureBook(get_stock_holdings(load_original_trades(path)))
+    except Exception as e:
+        print(f"更新持股部位時出錯：{str(e)}")
+
+
+def check_trade_risk(stock_code, amount):
+    """下單前風險檢查：通過或使用者確認仍要交易時回傳 True"""
+    violations = get_exposure_book().check(stock_code, amount, risk_settings)
+    if not violations:
+        return True
+    message = "\n".join(violations)
+    if RISK_LEVELS.get(risk_settings['warning_level']) == 'warn':
+        return messagebox.askyesno("風險控管", f"{message}\n\n仍要記錄這筆交易嗎？")
+    messagebox.showerror("風險控管", f"交易未記錄：\n{message}")
+    return False
+
+
+def start_realtime_quotes():
+    """開始輪詢持股與自選股的盤中即時報價（所有股票共用一個排程）"""
+    global quote_feed, intraday_store, alert_engine
+    intraday_store = IntradayStore()
+    alert_engine = AlertEngine()
+    refresh_alert_positions()
+    source = RecordedSession(MIS_REPLAY) if MIS_REPLAY else None
+    quote_feed = QuoteFeed(source, record_path=MIS_RECORD)
+    quote_feed.add_symbols(get_report_symbols())
+    refresh_scheduler.subscribe(('realtime',), quote_feed.poll, on_realtime_update,
+                                interval=REALTIME_INTERVAL)
+
+
+def get_selected_timeframe(combo=None):
+    """取得週期下拉選單目前選擇的週期代碼"""
+    combo = combo or timeframe_combo
+    if not combo:
+        return "D"
+    return {**TIMEFRAMES, **INTRADAY_TIMEFRAMES}.get(combo.get(), "D")
+
+
+def load_chart_bars(stock_code, timeframe):
+    """取得圖表用K線：分K讀取盤中環狀緩衝區（零複製），日/週/月K由日K快取推導"""
+    if timeframe in INTRADAY_TIMEFRAMES.values():
+        return intraday_store.bars(stock_code, timeframe) if intraday_store else pd.DataFrame()
+    return get_bars(stock_code, timeframe)
+
+
+def update_stock_chart(stock_code, timeframe=None):
     """更新股票技術走勢圖"""
-    global chart_frame
+    global chart_frame, price_chart
 
     if not chart_frame:
         print("圖表區域尚未初始化")
         return
 
+    timeframe = timeframe or get_selected_timeframe()
+
     try:
-        # 獲取股票數據
-        formatted_code = format_stock_code(stock_code)
-        stock = yf.Ticker(formatted_code)
-        df = stock.history(period="6mo")  # 獲取6個月的數據
+        # 獲取股票數據（由日K快取或盤中分K推導出所選週期）
+        df = load_chart_bars(stock_code, timeframe)
 
         if df.empty:
             return
 
-        # 清除原有圖表
-        for widget in chart_frame.winfo_children():
-            widget.destroy()
-
-        # 創建新圖表
-        fig = Figure(figsize=(10, 6))
-
-        # 設置全局字型大小
-        plt.rcParams['font.size'] = 10  # 基本字型大小
-        plt.rcParams['axes.titlesize'] = 10  # 標題字型大小
-        plt.rcParams['axes.labelsize'] = 10  # 軸標籤字型大小
-        plt.rcParams['xtick.labelsize'] = 10  # X軸刻度字型大小
-        plt.rcParams['ytick.labelsize'] = 10  # Y軸刻度字型大小
-        plt.rcParams['legend.fontsize'] = 10  # 圖例字型大小
-
-        # 主圖：K線圖
-        ax1 = fig.add_subplot(211)
-
-        # 繪製K線圖
-        candlestick_data = []
-        for date, row in df.iterrows():
-            candlestick_data.append((date, row['Open'],
-                                     row['High'],
-                                     row['Low'],
-                                     row['Close']))
-
-        # 設置x軸為日期
-        dates = [x[0] for x in candlestick_data]
-        ax1.set_xticks(range(0, len(dates), 20))
-        # 修改日期格式和方向
-        ax1.set_xticklabels([d.strftime('%m/%d') for d in dates[::20]],
-                            rotation=0,  # 水平顯示
-                            ha='center')  # 水平置中對齊
-
-        # 繪製蠟燭圖
-        for i, (date, open_price, high, low, close) in enumerate(candlestick_data):
-            if close >= open_price:
-                color = 'red'
-                alpha = 1.0
-            else:
-                color = 'green'
-                alpha = 1.0
-
-            # 繪製實體
-            ax1.add_patch(plt.Rectangle(
-                (i-0.3, min(open_price, close)),
-                0.6,
-                abs(open_price-close),
-                fill=True,
-                color=color,
-                alpha=alpha
-            ))
-            # 繪製上下影線
-            ax1.plot([i, i], [low, high], color=color, alpha=alpha)
-
-        # 計算並繪製均線
-        ma5 = df['Close'].rolling(window=5).mean()
-        ma20 = df['Close'].rolling(window=20).mean()
-        ma60 = df['Close'].rolling(window=60).mean()
-
-        ax1.plot(ma5.values, label='MA5', color='blue', linewidth=1)
-        ax1.plot(ma20.values, label='MA20', color='orange', linewidth=1)
-        ax1.plot(ma60.values, label='MA60', color='purple', linewidth=1)
-
-        ax1.set_title(f'{stock_code} 技術分析圖', pad=15, fontsize=14)
-        ax1.set_ylabel('股價', fontsize=12)
-        ax1.grid(True)
-        ax1.legend(loc='upper left', fontsize=10)
-
-        # 下方子圖：成交量
-        ax2 = fig.add_subplot(212, sharex=ax1)
-        volume_data = df['Volume'].values
-
-        # 根據漲跌繪製不同顏色的成交量柱狀圖
-        colors = ['red' if close >= open_price else 'green'
-                  for open_price, close
-                  in zip(df['Open'], df['Close'])]
-
-        ax2.bar(range(len(volume_data)),
-                volume_data,
-                color=colors,
-                alpha=0.7)
-        ax2.set_title('成交量', pad=15, fontsize=14)
-        ax2.set_ylabel('股數', fontsize=12)
-        ax2.grid(True)
-
-        # 設置成交量圖的 X 軸標籤
-        ax2.set_xticks(range(0, len(dates), 20))
-        ax2.set_xticklabels([d.strftime('%m/%d') for d in dates[::20]],
-                            rotation=0,  # 水平顯示
-                            ha='center')  # 水平置中對齊
-
-        # 調整布局，增加子圖之間的間距
-        fig.subplots_adjust(hspace=0.3)  # 增加垂直間距
-
-        # 創建畫布並顯示
-        canvas = FigureCanvasTkAgg(fig, master=chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill='both', expand=True)
+        # 圖表只建立一次，之後直接更新資料
+        if price_chart is None:
+            price_chart = PriceChart(chart_frame)
+        price_chart.update(df, stock_code, timeframe)
 
     except Exception as e:
         print(f"更新走勢圖時出錯：{str(e)}")
 
 
+def get_quote(stock_code):
+    """取得最新報價 (價格, 交易日期, 股票名稱)；設定 SERVICE_URL 時改由本機服務取得"""
+    if SERVICE_URL:
+        # 透過本機服務取得報價（與其他使用者共用快取）
+        quote = ServiceClient(SERVICE_URL).quote(stock_code)
+        return quote['price'], quote['date'], quote['name']
+    return fetch_quote(stock_code)
+
+
+def show_price(price, trading_date, stock_name):
+    """顯示目前價格和更新時間"""
+    current_time = datetime.now().strftime("%H:%M:%S")
+    current_price_text = (
+        f"{stock_name} 收盤價：{price:.2f} 元 "
+        f"({trading_date}) - 更新時間：{current_time}"
+    )
+    label_price.config(text=current_price_text)
+
+
 def get_stock_price():
     """獲取股票價格"""
     if not entry_code or not label_price:
@@ -490,50 +361,10 @@ def get_stock_price():
         return
 
     try:
-        # 首先嘗試 .TWO 格式（上櫃股票）
-        formatted_code = format_stock_code(stock_code)
-        stock = yf.Ticker(formatted_code)
-
-        # 嘗試獲取數據
-        data = stock.history(period="5d")
-        if len(data) == 0:
-            # 如果獲取失敗，嘗試切換交易所後綴
-            if formatted_code.endswith('.TWO'):
-                formatted_code = f"{stock_code}.TW"
-            else:
-                formatted_code = f"{stock_code}.TWO"
-            stock = yf.Ticker(formatted_code)
-            data = stock.history(period="5d")
-
-        if len(data) == 0:
-            raise Exception(
-                f"無法獲取股票 {stock_code} 的數據，請確認：\n1. 股票代碼是否正確\n2. 該股票是否仍在交易\n3. 是否為台股代碼")
-
-        # 獲取最新的收盤價和日期
-        price = data.iloc[-1]["Close"]
-        trading_date = data.index[-1].strftime("%Y-%m-%d")
-
-        # 取得股票名稱
-        stock_name = get_stock_name(stock)
-        if not stock_name:
-            stock_name = f"股票 {stock_code}"
-
-        # 显示当前价格和更新时间
-        current_time = datetime.now().strftime("%H:%M:%S")
-        current_price_text = (
-            f"{stock_name} 收盤價：{price:.2f} 元 "
-            f"({trading_date}) - 更新時間：{current_time}"
-        )
-        label_price.config(text=current_price_text)
-
-        # 更新技術走勢圖
-        update_stock_chart(stock_code)
+        show_price(*get_quote(stock_code))
 
-        # 顯示歷史交易記錄
-        if text_history:
-            history_text = show_stock_history(stock_code)
-            text_history.delete("1.0", tk.END)
-            text_history.insert(tk.END, history_text)
+        # 走勢圖、歷史交易記錄與其他頁面由 SymbolSelected 事件各自更新
+        event_bus.publish(SymbolSelected(stock_code))
 
     except Exception as e:
         error_msg = str(e)
@@ -554,6 +385,7 @@ def get_stock_price():
 
 
 def record_trade():
+    """記錄一筆買入交易（通過風險檢查後寫入共用的交易紀錄檔）"""
     stock_code = entry_code.get()
     buy_price = entry_buy_price.get()
     shares = entry_shares.get()
@@ -569,30 +401,25 @@ def record_trade():
         messagebox.showerror("錯誤", "請輸入有效數值")
         return
 
-    # 獲取股價和股票資訊
-    try:
-        formatted_code = format_stock_code(stock_code)
-        stock = yf.Ticker(formatted_code)
-
-        data = stock.history(period="1mo")
-        if len(data) == 0:
-            raise Exception("無法獲取股價數據")
+    # 計算相關費用和金額
+    fee, tax = calculate_fees(buy_price, shares, True)
+    total_cost = fee + tax
+    total_expense = buy_price * shares + total_cost
 
-        current_price = data.iloc[-1]["Close"]
-        stock_name = get_stock_name(stock)
+    # 下單前以含手續費的支出檢查單筆金額、單一標的部位與資金使用率
+    if not check_trade_risk(stock_code, total_expense):
+        return
 
+    # 獲取股價和股票資訊
+    try:
+        current_price, _, stock_name = get_quote(stock_code)
     except Exception as e:
         messagebox.showerror("錯誤", f"無法獲取當前股價\n錯誤信息：{str(e)}")
         return
 
-    # 計算相關費用和金額
-    fee, tax = calculate_fees(buy_price, shares, True)
-    total_cost = fee + tax
-    total_expense = buy_price * shares + total_cost
-
     # 準備新的交易記錄
     today = datetime.now().strftime("%Y/%m/%d")
-    new_trade = pd.DataFrame([{
+    new_trade = {
         "交易日期": today,
         "買/賣/股利": "買",
         "代號": stock_code,
@@ -611,54 +438,39 @@ def record_trade():
         "價差": current_price - buy_price,
         "ROR": "",
         "持有時間": 0
-    }])
+    }
 
-    # 存入 CSV
-    df = load_trades()
-    df = pd.concat([df, new_trade], ignore_index=True)
-    df.to_csv(FILE_NAME, index=False)
+    # 寫入持股、歷史與績效共用的交易紀錄檔，各頁面由 LedgerChanged 事件重新讀取
+    try:
+        path = append_trade(new_trade)
+    except Exception as e:
+        messagebox.showerror("錯誤", f"寫入交易紀錄時出錯：{str(e)}")
+        return
+    get_exposure_book().apply(stock_code, total_expense)
 
     messagebox.showinfo("成功", "交易已記錄！")
-    update_trades_list()
+    event_bus.publish(LedgerChanged(path))
+
 
 # 更新交易紀錄視窗
 
 
-def update_trades_list():
-    df = load_trades()
+def update_trades_list(path=None):
+    """顯示交易紀錄檔（path 預設為共用的交易紀錄檔）的所有交易"""
+    if not text_trades:
+        return
+    df = load_original_trades(path)
     text_trades.delete("1.0", tk.END)
 
     if df.empty:
         text_trades.insert(tk.END, "無交易紀錄")
         return
 
-    for _, row in df.iterrows():
-        # 格式化顯示內容
-        trade_type = row['買/賣/股利']
-        if trade_type == '買':
-            price = row['買入價格']
-            shares = row['買入股數']
-        else:
-            price = row['賣出價格']
-            shares = row['賣出股數']
-
-        text_trades.insert(tk.END, (
-            f"日期: {row['交易日期']} | "
-            f"交易: {trade_type} | "
-            f"代號: {row['代號']} | "
-            f"名稱: {row['股票']} | "
-            f"價格: {price} | "
-            f"股數: {shares} | "
-            f"現價: {row['現價']} | "
-            f"成本: {row['交易成本']} | "
-            f"價差: {row['價差']}\n"
-        ))
-        text_trades.insert(tk.END, "-"*100 + "\n")
+    text_trades.insert(tk.END, format_trades_list(df))
 
 
 def on_stock_selected(event):
     """當選擇股票時觸發"""
-    global notebook  # 添加全局引用
     selected = stock_combo.get()
     if selected and selected != '無持股紀錄':
         # 從選擇的項目中提取股票代碼
@@ -666,15 +478,8 @@ def on_stock_selected(event):
         # 設置輸入框的值
         entry_code.delete(0, tk.END)
         entry_code.insert(0, stock_code)
-        # 觸發獲取股價
+        # 觸發獲取股價（各頁面與定時更新由 SymbolSelected 事件處理）
         get_stock_price()
-        # 開始自動更新
-        auto_update_price()
-        # 更新籌碼資料
-        if notebook:  # 添加檢查
-            for frame in notebook.winfo_children():
-                if hasattr(frame, 'update_chip_data'):
-                    frame.update_chip_data(stock_code)
 
 
 def create_professional_gui(root_window):
@@ -692,26 +497,50 @@ def create_professional_gui(root_window):
     main_frame = create_main_trading_frame(notebook)
     notebook.add(main_frame, text="📊 即時交易")
 
-    # 2. 技術分析頁面
-    technical_frame = create_technical_analysis_frame(notebook)
-    notebook.add(technical_frame, text="📈 技術分析")
-
-    # 3. 籌碼分析頁面
-    chip_frame = create_chip_analysis_frame(notebook)
-    notebook.add(chip_frame, text="🔄 籌碼分析")
-
-    # 4. 績效報告頁面
-    performance_frame = create_performance_frame(notebook)
-    notebook.add(performance_frame, text="📋 績效報告")
-
-    # 5. 風險控管頁面
-    risk_frame = create_risk_management_frame(notebook)
-    notebook.add(risk_frame, text="⚠️ 風險控管")
+    # 其餘頁面在第一次切換過去時才建立
+    add_lazy_tab(notebook, create_technical_analysis_frame, "📈 技術分析")  # 2. 技術分析頁面
+    add_lazy_tab(notebook, create_chip_analysis_frame, "🔄 籌碼分析")  # 3. 籌碼分析頁面
+    add_lazy_tab(notebook, create_performance_frame, "📋 績效報告")  # 4. 績效報告頁面
+    add_lazy_tab(notebook, create_risk_management_frame, "⚠️ 風險控管")  # 5. 風險控管頁面
+    add_lazy_tab(notebook, create_screener_frame, "🔍 市場選股")  # 6. 市場選股頁面
+    add_lazy_tab(notebook, create_backtest_frame, "🧪 策略回測")  # 7. 策略回測頁面
+    notebook.bind('<<NotebookTabChanged>>', on_tab_changed)
+
+
+def add_lazy_tab(notebook, builder, text):
+    """先放入佔位頁面，等第一次切換到該分頁時才呼叫 builder 建立內容"""
+    placeholder = ttk.Frame(notebook)
+    ttk.Label(placeholder, text="載入中...").pack(expand=True)
+    notebook.add(placeholder, text=text)
+    _lazy_tabs[str(placeholder)] = builder
+    return placeholder
+
+
+def on_tab_changed(event):
+    """切換分頁時，若該分頁尚未建立則以實際內容取代佔位頁面"""
+    notebook = event.widget
+    tab_id = notebook.select()
+    builder = _lazy_tabs.pop(tab_id, None)
+    if builder is None:
+        return
+    try:
+        placeholder = notebook.nametowidget(tab_id)
+        index = notebook.index(tab_id)
+        text = notebook.tab(tab_id, 'text')
+        frame = builder(notebook)
+        notebook.forget(index)
+        notebook.insert(index, frame, text=text)
+        notebook.select(frame)
+        placeholder.destroy()
+    except Exception as e:
+        print(f"建立分頁時出錯：{str(e)}")
 
 
 def create_main_trading_frame(notebook):
     """創建主要交易頁面"""
     global entry_code, stock_combo, label_price, text_history, chart_frame
+    global history_pager
+    global timeframe_combo, entry_buy_price, entry_shares
 
     frame = ttk.Frame(notebook)
 
@@ -734,12 +563,21 @@ def create_main_trading_frame(notebook):
     stock_combo = ttk.Combobox(stock_select_frame, width=30)
     stock_combo.pack(side='left', padx=5)
 
+    # K線週期選擇（日/週/月）
+    timeframe_combo = ttk.Combobox(stock_select_frame, width=6, state='readonly',
+                                   values=list(TIMEFRAMES) + list(INTRADAY_TIMEFRAMES))
+    timeframe_combo.set("日線")
+    timeframe_combo.pack(side='left', padx=5)
+
     # 建立價格標籤
     label_price = ttk.Label(stock_select_frame, text="")
     label_price.pack(side='left', padx=5)
 
     # 綁定選擇事件
     stock_combo.bind('<<ComboboxSelected>>', on_stock_selected)
+    timeframe_combo.bind(
+        '<<ComboboxSelected>>',
+        lambda event: entry_code.get() and update_stock_chart(entry_code.get()))
 
     # 更新股票列表
     root.after(100, update_stock_list)  # 延遲 100ms 後更新股票列表
@@ -761,9 +599,21 @@ def create_main_trading_frame(notebook):
     row = 0
     for label, value in price_info.items():
         ttk.Label(quote_frame, text=label).grid(row=row, column=0, padx=5)
-        ttk.Label(quote_frame, text=value).grid(row=row, column=1, padx=5)
+        quote_labels[label] = ttk.Label(quote_frame, text=value)
+        quote_labels[label].grid(row=row, column=1, padx=5)
         row += 1
 
+    # 新增交易：記錄前依風險控管參數檢查單筆金額、單一標的部位與資金使用率
+    trade_frame = ttk.Frame(top_frame)
+    trade_frame.pack(fill='x', padx=5, pady=5)
+    ttk.Label(trade_frame, text="買入價格:").pack(side='left')
+    entry_buy_price = ttk.Entry(trade_frame, width=10)
+    entry_buy_price.pack(side='left', padx=5)
+    ttk.Label(trade_frame, text="股數:").pack(side='left')
+    entry_shares = ttk.Entry(trade_frame, width=10)
+    entry_shares.pack(side='left', padx=5)
+    ttk.Button(trade_frame, text="記錄買入", command=record_trade).pack(side='left', padx=5)
+
     # 中間區域：技術走勢圖
     chart_frame = ttk.LabelFrame(frame, text="技術走勢")
     chart_frame.pack(fill='both', expand=True, padx=5, pady=5)
@@ -772,9 +622,12 @@ def create_main_trading_frame(notebook):
     history_frame = ttk.LabelFrame(frame, text="歷史交易記錄")
     history_frame.pack(fill='both', expand=True, padx=5, pady=5)
 
-    # 創建文本框來顯示歷史交易記錄
+    # 創建文本框來顯示歷史交易記錄（交易筆數多時分頁顯示）
     text_history = tk.Text(history_frame, height=10, wrap=tk.WORD)
     text_history.pack(fill='both', expand=True, padx=5, pady=5)
+    history_nav = ttk.Frame(history_frame)
+    history_nav.pack(side='bottom', fill='x')
+    history_pager = TextPager(text_history, history_nav)
 
     # 添加滾動條
     scrollbar = ttk.Scrollbar(history_frame,
@@ -783,6 +636,13 @@ def create_main_trading_frame(notebook):
     scrollbar.pack(side='right', fill='y')
     text_history.configure(yscrollcommand=scrollbar.set)
 
+    event_bus.subscribe(SymbolSelected, on_symbol_selected)
+    event_bus.subscribe(BarsUpdated, on_bars_updated)
+    event_bus.subscribe(QuoteUpdated, lambda event: watched_stock in event.codes
+                        and show_realtime_quote(watched_stock))
+    event_bus.subscribe(LedgerChanged, lambda event: update_trades_list(event.path))
+    event_bus.subscribe(LedgerChanged, lambda event: update_stock_list(event.path))
+
     return frame
 
 
@@ -807,6 +667,13 @@ def create_technical_analysis_frame(notebook):
         "威廉指標": "williams"
     }
 
+    # K線週期選擇（日/週/月）
+    ttk.Label(indicators_frame, text="週期").pack(anchor='w', padx=5, pady=2)
+    tech_timeframe_combo = ttk.Combobox(indicators_frame, width=8, state='readonly',
+                                        values=list(TIMEFRAMES) + list(INTRADAY_TIMEFRAMES))
+    tech_timeframe_combo.set("日線")
+    tech_timeframe_combo.pack(anchor='w', padx=5, pady=2)
+
     # 右側：指標圖表顯示
     chart_container = ttk.LabelFrame(frame, text="技術指標圖表")
     chart_container.pack(side='right', fill='both',
@@ -830,143 +697,29 @@ def create_technical_analysis_frame(notebook):
         )
         cb.pack(anchor='w', padx=5, pady=2)
 
-    def update_technical_charts(stock_code):
+    tech_timeframe_combo.bind(
+        '<<ComboboxSelected>>', lambda event: on_indicator_change())
+
+    technical_chart = None
+
+    def update_technical_charts(stock_code, timeframe=None):
         """更新技術指標圖表"""
+        nonlocal technical_chart
+        timeframe = timeframe or get_selected_timeframe(tech_timeframe_combo)
         try:
-            # 清除現有圖表
-            for widget in chart_container.winfo_children():
-                widget.destroy()
-
-            # 獲取股票數據
-            formatted_code = format_stock_code(stock_code)
-            stock = yf.Ticker(formatted_code)
-            df = stock.history(period="6mo")
+            # 獲取股票數據（由日K快取或盤中分K推導出所選週期）
+            df = load_chart_bars(stock_code, timeframe)
 
             if df.empty:
                 return
 
-            # 計算需要的子圖數量
-            active_indicators = sum(var.get()
-                                    for var in indicator_vars.values())
-            if active_indicators == 0:
-                return
-
-            # 創建圖表
-            fig = Figure(figsize=(12, 2 * active_indicators))
-            current_subplot = 1
-
-            # KD 指標
-            if indicator_vars['kd'].get():
-                ax = fig.add_subplot(active_indicators, 1, current_subplot)
-                # 計算 KD 值
-                df['K'], df['D'] = calculate_kd(df)
-                ax.plot(df.index, df['K'], label='K值', color='blue')
-                ax.plot(df.index, df['D'], label='D值', color='orange')
-                ax.set_title('KD指標')
-                ax.grid(True)
-                ax.legend()
-                current_subplot += 1
-
-            # RSI 指標
-            if indicator_vars['rsi'].get():
-                ax = fig.add_subplot(active_indicators, 1, current_subplot)
-                # 計算 RSI
-                df['RSI'] = calculate_rsi(df)
-                ax.plot(df.index, df['RSI'], label='RSI', color='purple')
-                ax.axhline(y=70, color='r', linestyle='--')
-                ax.axhline(y=30, color='g', linestyle='--')
-                ax.set_title('RSI指標')
-                ax.grid(True)
-                ax.legend()
-                current_subplot += 1
-
-            # MACD 指標
-            if indicator_vars['macd'].get():
-                ax = fig.add_subplot(active_indicators, 1, current_subplot)
-                # 計算 MACD
-                df['MACD'], df['Signal'], df['Hist'] = calculate_macd(df)
-                ax.plot(df.index, df['MACD'], label='MACD', color='blue')
-                ax.plot(df.index, df['Signal'], label='Signal', color='orange')
-                ax.bar(df.index, df['Hist'],
-                       label='Histogram', color='gray', alpha=0.3)
-                ax.set_title('MACD指標')
-                ax.grid(True)
-                ax.legend()
-                current_subplot += 1
-
-            # 布林通道
-            if indicator_vars['bollinger'].get():
-                ax = fig.add_subplot(active_indicators, 1, current_subplot)
-                # 計算布林通道
-                df['Middle'], df['Upper'], df['Lower'] = calculate_bollinger_bands(
-                    df)
-                ax.plot(df.index, df['Close'], label='收盤價', color='black')
-                ax.plot(df.index, df['Upper'], label='上軌', color='red')
-                ax.plot(df.index, df['Middle'], label='中軌', color='blue')
-                ax.plot(df.index, df['Lower'], label='下軌', color='green')
-                ax.set_title('布林通道')
-                ax.grid(True)
-                ax.legend()
-                current_subplot += 1
-
-            # 移動平均線
-            if indicator_vars['ma'].get():
-                ax = fig.add_subplot(active_indicators, 1, current_subplot)
-                # 計算移動平均線
-                df['MA5'] = df['Close'].rolling(window=5).mean()
-                df['MA20'] = df['Close'].rolling(window=20).mean()
-                df['MA60'] = df['Close'].rolling(window=60).mean()
-                ax.plot(df.index, df['Close'], label='收盤價',
-                        color='black', alpha=0.5)
-                ax.plot(df.index, df['MA5'], label='MA5', color='blue')
-                ax.plot(df.index, df['MA20'], label='MA20', color='orange')
-                ax.plot(df.index, df['MA60'], label='MA60', color='red')
-                ax.set_title('移動平均線')
-                ax.grid(True)
-                ax.legend()
-                current_subplot += 1
-
-            # 成交量
-            if indicator_vars['volume'].get():
-                ax = fig.add_subplot(active_indicators, 1, current_subplot)
-                ax.bar(df.index, df['Volume'], label='成交量',
-                       color='gray', alpha=0.5)
-                ax.set_title('成交量')
-                ax.grid(True)
-                ax.legend()
-                current_subplot += 1
-
-            # OBV
-            if indicator_vars['obv'].get():
-                ax = fig.add_subplot(active_indicators, 1, current_subplot)
-                # 計算 OBV
-                df['OBV'] = calculate_obv(df)
-                ax.plot(df.index, df['OBV'], label='OBV', color='purple')
-                ax.set_title('OBV指標')
-                ax.grid(True)
-                ax.legend()
-                current_subplot += 1
-
-            # 威廉指標
-            if indicator_vars['williams'].get():
-                ax = fig.add_subplot(active_indicators, 1, current_subplot)
-                # 計算威廉指標
-                df['Williams %R'] = calculate_williams_r(df)
-                ax.plot(df.index, df['Williams %R'],
-                        label='Williams %R', color='blue')
-                ax.axhline(y=-20, color='r', linestyle='--')
-                ax.axhline(y=-80, color='g', linestyle='--')
-                ax.set_title('威廉指標')
-                ax.grid(True)
-                ax.legend()
-
-            # 調整布局
-            fig.tight_layout()
+            # 依勾選順序排列的指標
+            selected = [code for code, var in indicator_vars.items() if var.get()]
 
-            # 創建畫布並顯示
-            canvas = FigureCanvasTkAgg(fig, master=chart_container)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill='both', expand=True)
+            # 圖表只建立一次，之後直接更新資料
+            if technical_chart is None:
+                technical_chart = TechnicalChart(chart_container)
+            technical_chart.update(df, selected)
 
         except Exception as e:
             print(f"更新技術指標圖表時出錯：{str(e)}")
@@ -974,67 +727,18 @@ def create_technical_analysis_frame(notebook):
     # 將更新函數保存為全局變量
     frame.update_technical_charts = update_technical_charts
 
-    return frame
-
-
-def calculate_kd(df, n=9, m1=3, m2=3):
-    """計算KD指標"""
-    high_n = df['High'].rolling(n).max()
-    low_n = df['Low'].rolling(n).min()
-    rsv = (df['Close'] - low_n) / (high_n - low_n) * 100
-    k = rsv.rolling(m1).mean()
-    d = k.rolling(m2).mean()
-    return k, d
-
-
-def calculate_rsi(df, period=14):
-    """計算RSI指標"""
-    delta = df['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-
-def calculate_macd(df, fast=12, slow=26, signal=9):
-    """計算MACD指標"""
-    exp1 = df['Close'].ewm(span=fast, adjust=False).mean()
-    exp2 = df['Close'].ewm(span=slow, adjust=False).mean()
-    macd = exp1 - exp2
-    signal_line = macd.ewm(span=signal, adjust=False).mean()
-    histogram = macd - signal_line
-    return macd, signal_line, histogram
-
-
-def calculate_bollinger_bands(df, period=20, std_dev=2):
-    """計算布林通道"""
-    middle = df['Close'].rolling(window=period).mean()
-    std = df['Close'].rolling(window=period).std()
-    upper = middle + (std * std_dev)
-    lower = middle - (std * std_dev)
-    return middle, upper, lower
-
-
-def calculate_obv(df):
-    """計算OBV指標"""
-    obv = pd.Series(index=df.index, dtype='float64')
-    obv.iloc[0] = 0
-    for i in range(1, len(df)):
-        if df['Close'].iloc[i] > df['Close'].iloc[i-1]:
-            obv.iloc[i] = obv.iloc[i-1] + df['Volume'].iloc[i]
-        elif df['Close'].iloc[i] < df['Close'].iloc[i-1]:
-            obv.iloc[i] = obv.iloc[i-1] - df['Volume'].iloc[i]
-        else:
-            obv.iloc[i] = obv.iloc[i-1]
-    return obv
+    def on_bars_updated(event):
+        selected = event_bus.latest(SymbolSelected)
+        if selected and selected.code in event.codes \
+                and get_selected_timeframe(tech_timeframe_combo) in event.timeframes:
+            update_technical_charts(selected.code)
 
+    # 建立時同步目前選擇的股票
+    event_bus.subscribe(SymbolSelected, lambda event: update_technical_charts(event.code),
+                        replay=True)
+    event_bus.subscribe(BarsUpdated, on_bars_updated)
 
-def calculate_williams_r(df, period=14):
-    """計算威廉指標"""
-    highest_high = df['High'].rolling(window=period).max()
-    lowest_low = df['Low'].rolling(window=period).min()
-    wr = -100 * ((highest_high - df['Close']) / (highest_high - lowest_low))
-    return wr
+    return frame
 
 
 def create_chip_analysis_frame(notebook):
@@ -1066,101 +770,83 @@ def create_chip_analysis_frame(notebook):
     chart_frame = ttk.LabelFrame(frame, text="籌碼變化")
     chart_frame.pack(side='right', fill='both', expand=True, padx=5, pady=5)
 
+    chip_chart = None
+
     def update_chip_data(stock_code):
         """更新籌碼資料"""
+        nonlocal chip_chart
         try:
-            # 獲取股票數據
-            formatted_code = format_stock_code(stock_code)
-            stock = yf.Ticker(formatted_code)
-
-            # 獲取大戶持股資料（最近5個交易日）
-            df = stock.history(period="5d")
-
-            if df.empty:
+            data = load_chip_data(stock_code)
+            if data is None:
                 return
 
-            # 清除現有圖表
-            for widget in chart_frame.winfo_children():
-                widget.destroy()
-
-            # 創建圖表
-            fig = Figure(figsize=(10, 8))
-
-            # 設置全局字型
-            plt.rcParams['font.size'] = 10
-
-            # 三大法人買賣超圖
-            ax1 = fig.add_subplot(311)
-            dates = df.index
-
-            # 模擬三大法人買賣超數據（實際應從其他數據源獲取）
-            foreign_buy = df['Volume'] * 0.4  # 外資買超
-            trust_buy = df['Volume'] * 0.1    # 投信買超
-            dealer_buy = df['Volume'] * 0.05   # 自營商買超
-
-            ax1.bar(dates, foreign_buy, label='外資', color='red', alpha=0.7)
-            ax1.bar(dates, trust_buy, bottom=foreign_buy,
-                    label='投信', color='green', alpha=0.7)
-            ax1.bar(dates, dealer_buy, bottom=foreign_buy +
-                    trust_buy, label='自營商', color='blue', alpha=0.7)
-
-            ax1.set_title('三大法人買賣超')
-            ax1.legend()
-            ax1.grid(True)
-
-            # 融資融券圖
-            ax2 = fig.add_subplot(312)
-            margin_data = df['High'] * 1000  # 模擬融資餘額
-            short_data = df['Low'] * 1000    # 模擬融券餘額
-
-            ax2.plot(dates, margin_data, label='融資餘額', color='red', marker='o')
-            ax2.plot(dates, short_data, label='融券餘額',
-                     color='green', marker='o')
-            ax2.set_title('融資融券餘額')
-            ax2.legend()
-            ax2.grid(True)
-
-            # 股權分散圖
-            ax3 = fig.add_subplot(313)
-            holding_data = {
-                '外資': 40,
-                '投信': 10,
-                '自營商': 5,
-                '其他': 45
-            }
-
-            ax3.pie(holding_data.values(),
-                    labels=holding_data.keys(),
-                    autopct='%1.1f%%',
-                    colors=['red', 'green', 'blue', 'gray'])
-            ax3.set_title('股權分散')
+            # 圖表只建立一次，之後直接更新資料
+            if chip_chart is None:
+                chip_chart = ChipChart(chart_frame)
+            chip_chart.update(data['dates'], data['foreign'], data['trust'], data['dealer'],
+                              data['margin'], data['short'], data['holding'])
 
             # 更新左側籌碼資訊
+            holding_data = data['holding']
             labels['foreign_holding'].config(text=f"{holding_data['外資']:.2f}%")
             labels['trust_holding'].config(text=f"{holding_data['投信']:.2f}%")
             labels['dealer_holding'].config(text=f"{holding_data['自營商']:.2f}%")
             labels['margin_balance'].config(
-                text=f"{margin_data.iloc[-1]:,.0f}")
-            labels['short_balance'].config(text=f"{short_data.iloc[-1]:,.0f}")
+                text=f"{data['margin'].iloc[-1]:,.0f}")
+            labels['short_balance'].config(text=f"{data['short'].iloc[-1]:,.0f}")
             labels['day_trade_ratio'].config(text="5.23%")  # 模擬當沖比率
 
-            # 調整布局
-            fig.tight_layout()
-
-            # 創建畫布並顯示
-            canvas = FigureCanvasTkAgg(fig, master=chart_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill='both', expand=True)
-
         except Exception as e:
             print(f"更新籌碼資料時出錯：{str(e)}")
 
-    # 將更新函數保存為 frame 的屬性
-    frame.update_chip_data = update_chip_data
+    # 切換股票時更新（建立時同步目前選擇的股票）
+    event_bus.subscribe(SymbolSelected, lambda event: update_chip_data(event.code), replay=True)
 
     return frame
 
 
+# 績效摘要與風險指標：(顯示名稱, 指標鍵值, 格式)
+PERFORMANCE_SUMMARY_ITEMS = [
+    ("總投資報酬率", 'twr', "{:+.2f}%"),
+    ("年化報酬率", 'annual_return', "{:+.2f}%"),
+    ("夏普比率", 'sharpe', "{:.2f}"),
+    ("最大回撤", 'max_drawdown', "{:.2f}%"),
+    ("勝率", 'win_rate', "{:.1f}%"),
+    ("獲利因子", 'profit_factor', "{:.2f}")
+]
+RISK_ITEMS = [
+    ("波動率", 'volatility', "{:.2f}%"),
+    ("最大回撤", 'max_drawdown', "{:.2f}%"),
+    ("Beta係數", 'beta', "{:.2f}"),
+    ("Alpha（年化）", 'alpha', "{:+.2f}%"),
+    ("追蹤誤差", 'tracking_error', "{:.2f}%"),
+    ("夏普比率", 'sharpe', "{:.2f}"),
+    ("索提諾比率", 'sortino', "{:.2f}"),
+    ("資訊比率", 'information_ratio', "{:.2f}")
+]
+# 相對大盤表格欄位：(欄位名稱, 指標鍵值, 格式)
+RELATIVE_COLUMNS = [
+    ("Beta", 'beta', "{:.2f}"),
+    ("Alpha", 'alpha', "{:+.2f}%"),
+    ("追蹤誤差", 'tracking_error', "{:.2f}%"),
+    ("資訊比率", 'information_ratio', "{:.2f}")
+]
+
+
+def load_performance_report(benchmark=DEFAULT_BENCHMARK, path=None):
+    """讀取績效報告（交易列表、每日淨值、期間報酬、績效與相對基準指標；交易紀錄與股價未變時使用快取）"""
+    performance = load_portfolio_performance(path, benchmark=benchmark)
+    return {**performance, 'trades': build_performance_report(performance['trades'])['trades']}
+
+
+def show_metrics(labels, items, metrics):
+    """依格式顯示指標數值，無法計算的指標顯示 —"""
+    for _, key, fmt in items:
+        value = metrics.get(key)
+        valid = value is not None and np.isfinite(value)
+        labels[key].config(text=fmt.format(value) if valid else "—")
+
+
 def create_performance_frame(notebook):
     """創建績效報告頁面"""
     frame = ttk.Frame(notebook)
@@ -1169,23 +855,15 @@ def create_performance_frame(notebook):
     summary_frame = ttk.LabelFrame(frame, text="績效摘要")
     summary_frame.pack(fill='x', padx=5, pady=5)
 
-    # 使用Grid布局顯示績效指標
-    performance_metrics = [
-        ("總投資報酬率", "+15.2%"),
-        ("年化報酬率", "+12.8%"),
-        ("夏普比率", "1.25"),
-        ("最大回撤", "-8.5%"),
-        ("勝率", "65.2%"),
-        ("獲利因子", "1.85")
-    ]
-
-    for i, (metric, value) in enumerate(performance_metrics):
+    # 使用Grid布局顯示績效指標（數值於背景計算完成後填入）
+    value_labels = {}
+    for i, (metric, key, _) in enumerate(PERFORMANCE_SUMMARY_ITEMS):
         col = i % 3
         row = i // 3
         ttk.Label(summary_frame, text=metric).grid(
             row=row, column=col*2, padx=5, pady=2, sticky='e')
-        ttk.Label(summary_frame, text=value).grid(
-            row=row, column=col*2+1, padx=5, pady=2, sticky='w')
+        value_labels[key] = ttk.Label(summary_frame, text="計算中...")
+        value_labels[key].grid(row=row, column=col*2+1, padx=5, pady=2, sticky='w')
 
     # 下方：詳細績效分析
     details_frame = ttk.Notebook(frame)
@@ -1199,14 +877,19 @@ def create_performance_frame(notebook):
     returns_left = ttk.Frame(returns_frame)
     returns_left.pack(side='left', fill='both', expand=True)
 
-    # 月度報酬表格
-    monthly_returns = ttk.LabelFrame(returns_left, text="月度報酬率")
+    # 期間報酬表格（月/季/年）
+    monthly_returns = ttk.LabelFrame(returns_left, text="期間報酬率")
     monthly_returns.pack(fill='both', expand=True, padx=5, pady=5)
 
+    period_var = tk.StringVar(value="月")
+    period_combo = ttk.Combobox(monthly_returns, textvariable=period_var,
+                                values=list(PERIODS.keys()), state='readonly', width=6)
+    period_combo.pack(anchor='w', padx=5, pady=2)
+
     # 創建表格
     tree = ttk.Treeview(monthly_returns, columns=(
-        '年月', '報酬率', '累計報酬'), show='headings')
-    tree.heading('年月', text='年月')
+        '期間', '報酬率', '累計報酬'), show='headings')
+    tree.heading('期間', text='期間')
     tree.heading('報酬率', text='報酬率')
     tree.heading('累計報酬', text='累計報酬')
     tree.pack(fill='both', expand=True)
@@ -1240,20 +923,12 @@ def create_performance_frame(notebook):
     risk_metrics = ttk.LabelFrame(risk_left, text="風險指標")
     risk_metrics.pack(fill='both', expand=True, padx=5, pady=5)
 
-    risk_items = [
-        ("波動率", "15.2%"),
-        ("最大回撤", "-8.5%"),
-        ("Beta係數", "0.85"),
-        ("夏普比率", "1.25"),
-        ("索提諾比率", "1.15"),
-        ("資訊比率", "0.95")
-    ]
-
-    for i, (metric, value) in enumerate(risk_items):
+    risk_labels = {}
+    for i, (metric, key, _) in enumerate(RISK_ITEMS):
         ttk.Label(risk_metrics, text=metric).grid(
             row=i, column=0, padx=5, pady=2, sticky='e')
-        ttk.Label(risk_metrics, text=value).grid(
-            row=i, column=1, padx=5, pady=2, sticky='w')
+        risk_labels[key] = ttk.Label(risk_metrics, text="計算中...")
+        risk_labels[key].grid(row=i, column=1, padx=5, pady=2, sticky='w')
 
     # 風險分析圖表
     risk_right = ttk.Frame(risk_frame)
@@ -1266,17 +941,47 @@ def create_performance_frame(notebook):
     canvas2.draw()
     canvas2.get_tk_widget().pack(fill='both', expand=True)
 
-    # 3. 交易記錄頁面
+    # 3. 相對大盤頁面
+    relative_frame = ttk.Frame(details_frame)
+    details_frame.add(relative_frame, text="相對大盤")
+
+    relative_controls = ttk.Frame(relative_frame)
+    relative_controls.pack(fill='x', padx=5, pady=5)
+    ttk.Label(relative_controls, text="基準：").pack(side='left')
+    benchmark_var = tk.StringVar(value=next(
+        name for name, symbol in BENCHMARKS.items() if symbol == DEFAULT_BENCHMARK))
+    benchmark_combo = ttk.Combobox(relative_controls, textvariable=benchmark_var,
+                                   values=list(BENCHMARKS.keys()), state='readonly', width=12)
+    benchmark_combo.pack(side='left', padx=5)
+    ttk.Label(relative_controls, text="滾動視窗（日）：").pack(side='left')
+    window_var = tk.StringVar(value=str(ROLLING_WINDOWS[1]))
+    window_combo = ttk.Combobox(relative_controls, textvariable=window_var,
+                                values=[str(w) for w in ROLLING_WINDOWS], state='readonly', width=6)
+    window_combo.pack(side='left', padx=5)
+
+    relative_left = ttk.LabelFrame(relative_frame, text="投資組合與持股（最新滾動值）")
+    relative_left.pack(side='left', fill='both', expand=True, padx=5, pady=5)
+    relative_tree = ttk.Treeview(relative_left, columns=['名稱'] + [c for c, _, _ in RELATIVE_COLUMNS],
+                                 show='headings')
+    for column in ['名稱'] + [c for c, _, _ in RELATIVE_COLUMNS]:
+        relative_tree.heading(column, text=column)
+        relative_tree.column(column, width=90)
+    relative_tree.pack(fill='both', expand=True)
+
+    relative_right = ttk.Frame(relative_frame)
+    relative_right.pack(side='right', fill='both', expand=True)
+    fig3 = Figure(figsize=(6, 4))
+    ax3 = fig3.add_subplot(111)
+    ax3.set_title('投資組合滾動 Beta')
+    canvas3 = FigureCanvasTkAgg(fig3, master=relative_right)
+    canvas3.draw()
+    canvas3.get_tk_widget().pack(fill='both', expand=True)
+
+    # 4. 交易記錄頁面
     trades_frame = ttk.Frame(details_frame)
     details_frame.add(trades_frame, text="交易記錄")
 
-    # 創建交易記錄表格
-    trades_tree = ttk.Treeview(trades_frame,
-                               columns=('日期', '代碼', '股票名稱', '交易', '價格',
-                                        '數量', '金額', '手續費', '交易稅', '損益'),
-                               show='headings')
-
-    # 設置列標題
+    # 創建交易記錄表格（只繪製可見範圍的資料列）
     column_headers = [
         ('日期', 100),
         ('代碼', 80),
@@ -1289,113 +994,140 @@ def create_performance_frame(notebook):
         ('交易稅', 80),
         ('損益', 100)
     ]
+    trades_table = VirtualTable(trades_frame, column_headers, formatters={
+        '價格': lambda v: f"{v:.2f}" if not pd.isna(v) else "",
+        '數量': lambda v: f"{int(v):,}" if not pd.isna(v) else "",
+        '金額': lambda v: f"{v:,.0f}",
+    })
+    trades_table.pack(fill='both', expand=True)
+
+    # 表格與圖表先顯示計算中，資料於背景計算完成後再填入
+    tree.insert('', 'end', values=('計算中...', '', ''))
+    trades_table.show_message('計算中...')
+
+    periods = {}
+
+    def show_periods(event=None):
+        """顯示所選期間的報酬（已預先計算，切換時不需重算）"""
+        returns = periods.get(PERIODS[period_var.get()])
+        if returns is None:
+            return
+        tree.delete(*tree.get_children())
+        for label, value, total in zip(returns['期間'], returns['報酬率'], returns['累計報酬']):
+            tree.insert('', 'end', values=(label, f'{value:.2%}', f'{total:.2%}'))
 
-    for header, width in column_headers:
-        trades_tree.heading(header, text=header)
-        trades_tree.column(header, width=width)
+    period_combo.bind('<<ComboboxSelected>>', show_periods)
 
-    # 添加滾動條
-    trades_scrollbar = ttk.Scrollbar(
-        trades_frame, orient="vertical", command=trades_tree.yview)
-    trades_scrollbar.pack(side='right', fill='y')
-    trades_tree.configure(yscrollcommand=trades_scrollbar.set)
-    trades_tree.pack(fill='both', expand=True)
-
-    # 更新交易記錄
-    df = load_original_trades()
-    if not df.empty:
-        for _, row in df.iterrows():
-            trade_type = row['買/賣/股利']
-            if trade_type == '買':
-                price = row['買入價格']
-                shares = row['買入股數']
-                amount = price * shares
-            else:
-                price = row['賣出價格']
-                shares = row['賣出股數']
-                amount = price * \
-                    shares if not pd.isna(price) and not pd.isna(shares) else 0
-
-            trades_tree.insert('', 'end', values=(
-                row['交易日期'],
-                row['代號'],
-                row['股票'],  # 新增股票名稱
-                trade_type,
-                f"{float(price):.2f}" if not pd.isna(price) else "",
-                f"{int(shares):,}" if not pd.isna(shares) else "",
-                f"{amount:,.0f}",
-                row['手續費'],
-                row['交易稅'],
-                row.get('價差', '')
-            ))
-
-    # 更新圖表數據
-    if not df.empty:
-        # 計算累計報酬
-        cumulative_returns = []
-        current_return = 0
-        dates = []
-
-        for _, row in df.sort_values('交易日期').iterrows():
-            if row['買/賣/股利'] == '買':
-                current_return -= (float(row['買入價格']) * float(row['買入股數']) +
-                                   float(row['手續費']) if pd.notna(row['手續費']) else 20)
-            elif row['買/賣/股利'] == '賣':
-                current_return += (float(row['賣出價格']) * float(row['賣出股數']) -
-                                   float(row['手續費']) if pd.notna(row['手續費']) else 20 -
-                                   float(row['交易稅']) if pd.notna(row['交易稅']) else 0)
-
-            cumulative_returns.append(current_return)
-            dates.append(pd.to_datetime(row['交易日期']))
-
-        # 更新報酬分析圖表
-        ax.clear()
-        ax.plot(dates, cumulative_returns, marker='o')
-        ax.set_title('累計報酬走勢')
-        ax.grid(True)
-        plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
-        fig.tight_layout()
-        canvas.draw()
-
-        # 更新風險分析圖表
-        ax2.clear()
-        # 計算回撤
-        peak = 0
-        drawdowns = []
-        for ret in cumulative_returns:
-            if ret > peak:
-                peak = ret
-            drawdown = (ret - peak) / peak * 100 if peak != 0 else 0
-            drawdowns.append(drawdown)
-
-        ax2.plot(dates, drawdowns, color='red')
-        ax2.set_title('回撤分析')
-        ax2.grid(True)
-        plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
-        fig2.tight_layout()
-        canvas2.draw()
-
-    # 更新月度報酬率表格
-    df = load_original_trades()
-    if not df.empty:
-        # 計算每月的報酬率
-        df['交易日期'] = pd.to_datetime(df['交易日期'])
-        df.set_index('交易日期', inplace=True)
-        monthly_returns = df.resample('ME').apply(lambda x: (
-            x['收入'].sum() - x['支出'].sum()) / x['支出'].sum() if x['支出'].sum() != 0 else 0)
-
-        # 清空表格
-        for item in tree.get_children():
-            tree.delete(item)
-
-        # 插入新數據
-        for date, value in monthly_returns.items():
-            tree.insert('', 'end', values=(date.strftime(
-                '%Y-%m'), f'{value:.2%}', f'{value:.2f}'))
+    analysis = {}
+
+    def show_relative(event=None):
+        """顯示所選視窗的各持股相對基準指標（已預先計算所有視窗）"""
+        relative_tree.delete(*relative_tree.get_children())
+        latest = analysis.get('latest')
+        if latest is None:
+            return
+        window = int(window_var.get())
+        for name, row in latest.iterrows():
+            values = [row[(key, window)] for _, key, _ in RELATIVE_COLUMNS]
+            relative_tree.insert('', 'end', values=[name] + [
+                fmt.format(v) if np.isfinite(v) else "—"
+                for v, (_, _, fmt) in zip(values, RELATIVE_COLUMNS)])
+
+    window_combo.bind('<<ComboboxSelected>>', show_relative)
+
+    def show_report(report):
+        """將背景計算好的績效資料填入表格與圖表"""
+        trades_table.set_data(report['trades'])
+        show_metrics(value_labels, PERFORMANCE_SUMMARY_ITEMS, report['metrics'])
+        show_metrics(risk_labels, RISK_ITEMS, report['metrics'])
+
+        periods.update(report['periods'])
+        show_periods()
+
+        analysis.clear()
+        analysis.update(report['benchmark'])
+        show_relative()
+        ax3.clear()
+        rolling = analysis.get('rolling')
+        if rolling is not None and not rolling.empty:
+            ax3.xaxis_date()
+            x = mdates.date2num(rolling.index)
+            for window in ROLLING_WINDOWS:
+                DownsampledLine(ax3.plot([], [], label=f'{window}日')[0], x,
+                                rolling[('beta', window)].to_numpy())
+            ax3.relim()
+            ax3.autoscale_view()
+            ax3.legend()
+            ax3.grid(True)
+            plt.setp(ax3.xaxis.get_majorticklabels(), rotation=45)
+        ax3.set_title(f'投資組合滾動 Beta（相對{benchmark_var.get()}）')
+        fig3.tight_layout()
+        canvas3.draw_idle()
+
+        curve = report['equity_curve']
+        if len(curve):
+            # 更新報酬分析圖表（時間加權累計報酬率）
+            ax.clear()
+            ax.xaxis_date()
+            x = mdates.date2num(curve.index)
+            DownsampledLine(ax.plot([], [])[0], x, (curve['nav'].to_numpy() - 1) * 100)
+            ax.relim()
+            ax.autoscale_view()
+            ax.set_title('累計報酬走勢（%）')
+            ax.grid(True)
+            plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
+            fig.tight_layout()
+            canvas.draw_idle()
+
+            # 更新風險分析圖表
+            ax2.clear()
+            ax2.xaxis_date()
+            DownsampledLine(ax2.plot([], [], color='red')[0], x, curve['drawdown'].to_numpy() * 100)
+            ax2.relim()
+            ax2.autoscale_view()
+            ax2.set_title('回撤分析（%）')
+            ax2.grid(True)
+            plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
+            fig2.tight_layout()
+            canvas2.draw_idle()
+
+    def show_error(e):
+        print(f"計算績效報告時出錯：{str(e)}")
+        trades_table.show_message('')
+        tree.delete(*tree.get_children())
+        relative_tree.delete(*relative_tree.get_children())
+        for label in list(value_labels.values()) + list(risk_labels.values()):
+            label.config(text="—")
+
+    def reload_benchmark(event=None, path=None):
+        """切換基準或交易紀錄變動後於背景重新計算（其他基準的結果會保留在快取中）"""
+        relative_tree.delete(*relative_tree.get_children())
+        relative_tree.insert('', 'end', values=('計算中...',))
+        benchmark = BENCHMARKS[benchmark_var.get()]
+        run_in_background(frame, lambda: load_performance_report(benchmark, path),
+                          show_report, show_error)
+
+    benchmark_combo.bind('<<ComboboxSelected>>', reload_benchmark)
+    event_bus.subscribe(LedgerChanged, lambda event: reload_benchmark(path=event.path))
+
+    run_in_background(frame, load_performance_report, show_report, show_error)
 
     return frame
 
 
+# 風險參數欄位 -> risk_settings 鍵值
+RISK_SETTING_KEYS = {
+    "總資金": 'total_capital',
+    "單筆交易上限": 'max_trade_amount',
+    "停損比例": 'stop_loss',
+    "停利比例": 'take_profit',
+    "資金使用率上限": 'max_capital_usage',
+    "單一標的部位上限": 'max_position_pct',
+    "風險警告等級": 'warning_level'
+}
+ALERT_COLUMNS = ["代號", "名稱", "股數", "平均成本", "停損價", "停利價", "現價"]
+
+
 def create_risk_management_frame(notebook):
     """創建風險控管頁面"""
     frame = ttk.Frame(notebook)
@@ -1405,6 +1137,7 @@ def create_risk_management_frame(notebook):
     settings_frame.pack(side='left', fill='y', padx=5, pady=5)
 
     risk_params = [
+        ("總資金", "entry"),
         ("單筆交易上限", "entry"),
         ("停損比例", "entry"),
         ("停利比例", "entry"),
@@ -1413,28 +1146,723 @@ def create_risk_management_frame(notebook):
         ("風險警告等級", "combo")
     ]
 
+    setting_entries = {}
     for param, widget_type in risk_params:
         param_frame = ttk.Frame(settings_frame)
         param_frame.pack(fill='x', padx=5, pady=2)
 
         ttk.Label(param_frame, text=param).pack(side='left')
         if widget_type == "entry":
-            ttk.Entry(param_frame, width=10).pack(side='right')
+            entry = ttk.Entry(param_frame, width=10)
+            entry.pack(side='right')
+            entry.insert(0, f"{risk_settings[RISK_SETTING_KEYS[param]]:g}")
         else:
-            ttk.Combobox(param_frame, width=10).pack(side='right')
+            entry = ttk.Combobox(param_frame, width=10, state='readonly',
+                                 values=list(RISK_LEVELS))
+            entry.set(risk_settings[RISK_SETTING_KEYS[param]])
+            entry.pack(side='right')
+        setting_entries[RISK_SETTING_KEYS[param]] = entry
 
     # 右側：風險監控儀表板
     dashboard_frame = ttk.LabelFrame(frame, text="風險監控儀表板")
     dashboard_frame.pack(side='right', fill='both',
                          expand=True, padx=5, pady=5)
 
-    # 可以使用 matplotlib 來繪製風險監控圖表
+    # 各持股的停損/停利價（依平均成本與停損/停利比例計算）
+    alert_tree = ttk.Treeview(dashboard_frame, columns=ALERT_COLUMNS, show='headings', height=8)
+    for col in ALERT_COLUMNS:
+        alert_tree.heading(col, text=col)
+        alert_tree.column(col, width=80, anchor='e' if col not in ("代號", "名稱") else 'w')
+    alert_tree.pack(fill='x', padx=5, pady=5)
+
+    # 風險額度使用率（持股成本相對各項上限）
     canvas = tk.Canvas(dashboard_frame, bg='white')
     canvas.pack(fill='both', expand=True, padx=5, pady=5)
 
+    def draw_utilization(event=None):
+        """以長條顯示資金使用率與部位最大股票的集中度（綠：80% 以下、橙：接近上限、紅：超限）"""
+        canvas.delete('all')
+        bar_left, bar_width = 110, max(canvas.winfo_width() - 260, 100)
+        canvas.create_text(10, 12, anchor='w', text="風險額度使用率（持股成本 / 總資金）")
+        for i, (name, value, limit) in enumerate(get_exposure_book().utilization(risk_settings)):
+            y = 40 + i * 30
+            ratio = value / limit
+            color = '#2e7d32' if ratio < 0.8 else '#f9a825' if ratio < 1 else '#c62828'
+            canvas.create_text(10, y + 8, anchor='w', text=name)
+            canvas.create_rectangle(bar_left, y, bar_left + bar_width, y + 16, outline='#999999')
+            canvas.create_rectangle(bar_left, y, bar_left + bar_width * min(ratio, 1), y + 16,
+                                    fill=color, outline='')
+            canvas.create_text(bar_left + bar_width + 10, y + 8, anchor='w',
+                               text=f"{value:.1f}% / 上限 {limit:g}%")
+
+    canvas.bind('<Configure>', draw_utilization)
+
+    def show_alert_positions():
+        alert_tree.delete(*alert_tree.get_children())
+        positions = alert_engine.positions if alert_engine else {}
+        for code, info in positions.items():
+            quote = quote_feed.table.get(code) if quote_feed else None
+            alert_tree.insert('', 'end', iid=code, values=(
+                code, info['name'], f"{info['shares']:,.0f}", f"{info['avg_cost']:.2f}",
+                f"{info['stop_loss']:.2f}", f"{info['take_profit']:.2f}",
+                f"{quote['price']:.2f}" if quote else "-"))
+
+    def apply_settings():
+        try:
+            values = {key: entry.get() if key == 'warning_level' else float(entry.get())
+                      for key, entry in setting_entries.items()}
+        except ValueError:
+            messagebox.showerror("錯誤", "請輸入有效數值")
+            return
+        try:
+            validate_risk_settings(values)
+        except ValueError as e:
+            messagebox.showerror("錯誤", str(e))
+            return
+        risk_settings.update(values)
+        try:
+            save_risk_settings(risk_settings)
+        except Exception as e:
+            messagebox.showerror("錯誤", f"儲存風險參數時出錯：{str(e)}")
+            return
+        refresh_alert_positions()
+        show_alert_positions()
+        draw_utilization()
+
+    def on_quote_updated(event):
+        """只更新有新報價的持股現價"""
+        for code in event.codes:
+            quote = quote_feed.table.get(code) if alert_tree.exists(code) else None
+            if quote:
+                alert_tree.set(code, "現價", f"{quote['price']:.2f}")
+
+    ttk.Button(settings_frame, text="套用設定", command=apply_settings).pack(padx=5, pady=5)
+    show_alert_positions()
+    event_bus.subscribe(QuoteUpdated, on_quote_updated)
+    event_bus.subscribe(LedgerChanged, lambda event: show_alert_positions())
+    event_bus.subscribe(LedgerChanged, draw_utilization)
+
     return frame
 
 
+def run_in_background(widget, task, on_done, on_error=None):
+    """在背景執行緒執行耗時工作，完成後回到 Tk 主執行緒呼叫 on_done / on_error"""
+    outcome = {}
+
+    def worker():
+        try:
+            outcome['result'] = task()
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+
+    def check():
+        if thread.is_alive():
+            widget.after(100, check)
+        elif 'error' in outcome:
+            if on_error:
+                on_error(outcome['error'])
+            else:
+                print(f"背景工作出錯：{str(outcome['error'])}")
+        else:
+            on_done(outcome['result'])
+
+    check()
+
+
+def create_screener_frame(notebook):
+    """創建市場選股頁面"""
+    frame = ttk.Frame(notebook)
+
+    # 左側：選股條件
+    conditions_frame = ttk.LabelFrame(frame, text="選股條件")
+    conditions_frame.pack(side='left', fill='y', padx=5, pady=5)
+
+    # (條件名稱, 參數名稱, 參數標籤, 預設值)
+    condition_items = [
+        ("KD黃金交叉", None, None, None),
+        ("RSI低於門檻", "threshold", "門檻", "30"),
+        ("站上均線", "period", "天數", "60"),
+        ("外資連續買超", "days", "天數", "3")
+    ]
+
+    condition_vars = {}
+    param_entries = {}
+    for name, param, param_label, default in condition_items:
+        row_frame = ttk.Frame(conditions_frame)
+        row_frame.pack(fill='x', padx=5, pady=2)
+        var = tk.BooleanVar(value=False)
+        condition_vars[name] = var
+        ttk.Checkbutton(row_frame, text=name, variable=var).pack(side='left')
+        if param:
+            entry = ttk.Entry(row_frame, width=5)
+            entry.insert(0, default)
+            entry.pack(side='right')
+            ttk.Label(row_frame, text=param_label).pack(side='right')
+            param_entries[name] = (param, entry)
+
+    match_var = tk.StringVar(value="all")
+    ttk.Radiobutton(conditions_frame, text="全部符合", value="all",
+                    variable=match_var).pack(anchor='w', padx=5)
+    ttk.Radiobutton(conditions_frame, text="任一符合", value="any",
+                    variable=match_var).pack(anchor='w', padx=5)
+
+    status_label = ttk.Label(conditions_frame, text="")
+
+    # 右側：選股結果
+    result_frame = ttk.LabelFrame(frame, text="選股結果")
+    result_frame.pack(side='right', fill='both', expand=True, padx=5, pady=5)
+
+    columns = ("代號", "股票", "收盤價", "漲跌幅", "成交量", "符合條件數", "符合條件")
+    result_tree = ttk.Treeview(result_frame, columns=columns, show='headings')
+    for column, width in zip(columns, (70, 100, 80, 80, 100, 80, 250)):
+        result_tree.heading(column, text=column)
+        result_tree.column(column, width=width)
+
+    result_scrollbar = ttk.Scrollbar(
+        result_frame, orient="vertical", command=result_tree.yview)
+    result_scrollbar.pack(side='right', fill='y')
+    result_tree.configure(yscrollcommand=result_scrollbar.set)
+    result_tree.pack(fill='both', expand=True)
+
+    def on_error(error):
+        status_label.config(text="執行失敗")
+        messagebox.showerror("錯誤", f"選股時發生錯誤：{error}")
+
+    def on_sync():
+        """更新全市場日K資料庫"""
+        status_label.config(text="更新資料中...")
+
+        def task():
+            universe = load_stock_universe()
+            sync_daily_store(universe['symbol'].tolist())
+            return len(universe)
+
+        run_in_background(frame, task, lambda count: status_label.config(
+            text=f"已更新 {count} 檔股票"), on_error)
+
+    def on_screen():
+        """執行選股"""
+        conditions = []
+        try:
+            for name, var in condition_vars.items():
+                if not var.get():
+                    continue
+                params = {}
+                if name in param_entries:
+                    param, entry = param_entries[name]
+                    params[param] = int(entry.get())
+                conditions.append((name, params))
+        except ValueError:
+            messagebox.showerror("錯誤", "請輸入有效數值")
+            return
+
+        if not conditions:
+            messagebox.showwarning("警告", "請至少選擇一個選股條件")
+            return
+
+        min_match = len(conditions) if match_var.get() == "all" else 1
+        status_label.config(text="選股中...")
+        started = time.time()
+
+        def show_results(result_df):
+            for item in result_tree.get_children():
+                result_tree.delete(item)
+            for row in result_df.itertuples(index=False):
+                result_tree.insert('', 'end', values=(
+                    row.代號, row.股票, f"{row.收盤價:.2f}", f"{row.漲跌幅:+.2f}%",
+                    f"{row.成交量:,.0f}", row.符合條件數, row.符合條件))
+            status_label.config(
+                text=f"共 {len(result_df)} 檔，耗時 {time.time() - started:.1f} 秒")
+
+        run_in_background(frame, lambda: run_screener(conditions, min_match=min_match),
+                          show_results, on_error)
+
+    def on_result_selected(event):
+        """雙擊結果時切換到該股票"""
+        selection = result_tree.selection()
+        if not selection or not entry_code:
+            return
+        stock_code = result_tree.item(selection[0], 'values')[0]
+        entry_code.delete(0, tk.END)
+        entry_code.insert(0, stock_code)
+        get_stock_price()
+
+    result_tree.bind('<Double-1>', on_result_selected)
+
+    ttk.Button(conditions_frame, text="更新資料庫",
+               command=on_sync).pack(fill='x', padx=5, pady=2)
+    ttk.Button(conditions_frame, text="開始選股",
+               command=on_screen).pack(fill='x', padx=5, pady=2)
+    status_label.pack(anchor='w', padx=5, pady=2)
+
+    return frame
+
+
+def create_backtest_frame(notebook):
+    """創建策略回測頁面"""
+    frame = ttk.Frame(notebook)
+
+    # 左側：回測設定
+    settings_frame = ttk.LabelFrame(frame, text="回測設定")
+    settings_frame.pack(side='left', fill='y', padx=5, pady=5)
+
+    ttk.Label(settings_frame, text="股票代碼（逗號分隔，空白為目前持股）").pack(
+        anchor='w', padx=5, pady=2)
+    codes_entry = ttk.Entry(settings_frame, width=30)
+    codes_entry.pack(fill='x', padx=5, pady=2)
+
+    ttk.Label(settings_frame, text="策略").pack(anchor='w', padx=5, pady=2)
+    strategy_combo = ttk.Combobox(settings_frame, state='readonly',
+                                  values=list(STRATEGIES.keys()))
+    strategy_combo.set("KD交叉")
+    strategy_combo.pack(fill='x', padx=5, pady=2)
+
+    # 策略參數欄位隨策略切換
+    params_frame = ttk.Frame(settings_frame)
+    params_frame.pack(fill='x', padx=5, pady=2)
+    param_entries = {}
+
+    def build_param_entries(event=None):
+        for widget in params_frame.winfo_children():
+            widget.destroy()
+        param_entries.clear()
+        _, defaults = STRATEGIES[strategy_combo.get()]
+        for i, (name, value) in enumerate(defaults.items()):
+            ttk.Label(params_frame, text=name).grid(row=i, column=0, sticky='e')
+            entry = ttk.Entry(params_frame, width=8)
+            entry.insert(0, str(value))
+            entry.grid(row=i, column=1, sticky='w', padx=5)
+            param_entries[name] = entry
+
+    build_param_entries()
+
+    option_entries = {}
+    for label, key, default in [("停損比例(%)", "stop_loss", "20"),
+                                ("停利比例(%)", "take_profit", "20"),
+                                ("每次股數", "shares", str(BACKTEST_SHARES))]:
+        row_frame = ttk.Frame(settings_frame)
+        row_frame.pack(fill='x', padx=5, pady=2)
+        ttk.Label(row_frame, text=label).pack(side='left')
+        entry = ttk.Entry(row_frame, width=8)
+        entry.insert(0, default)
+        entry.pack(side='right')
+        option_entries[key] = entry
+
+    ttk.Label(settings_frame, text="回測期間").pack(anchor='w', padx=5, pady=2)
+    period_combo = ttk.Combobox(settings_frame, state='readonly',
+                                values=["1y", "3y", "5y", "10y"])
+    period_combo.set("10y")
+    period_combo.pack(fill='x', padx=5, pady=2)
+
+    status_label = ttk.Label(settings_frame, text="")
+
+    # 右側：回測結果
+    result_frame = ttk.Frame(frame)
+    result_frame.pack(side='right', fill='both', expand=True, padx=5, pady=5)
+
+    metrics_frame = ttk.LabelFrame(result_frame, text="回測績效")
+    metrics_frame.pack(fill='x', padx=5, pady=5)
+    metric_labels = {}
+    metric_items = [("總報酬", "total_return"), ("報酬率", "roi"),
+                    ("勝率", "win_rate"), ("獲利因子", "profit_factor"),
+                    ("交易次數", "total_trades")]
+    for i, (label, key) in enumerate(metric_items):
+        ttk.Label(metrics_frame, text=label).grid(
+            row=0, column=i * 2, padx=5, pady=2, sticky='e')
+        metric_labels[key] = ttk.Label(metrics_frame, text="-")
+        metric_labels[key].grid(row=0, column=i * 2 + 1, padx=5, pady=2, sticky='w')
+
+    trades_box = ttk.LabelFrame(result_frame, text="回測交易")
+    trades_box.pack(fill='both', expand=True, padx=5, pady=5)
+    columns = ('日期', '代碼', '交易', '價格', '數量', '手續費', '交易稅', 'ROR')
+    trades_table = VirtualTable(trades_box, [(column, 90) for column in columns], formatters={
+        '價格': lambda v: f"{v:.2f}",
+        '數量': lambda v: f"{v:,.0f}",
+        '手續費': lambda v: f"{v:,.0f}",
+        '交易稅': lambda v: f"{v:,.0f}",
+        'ROR': lambda v: f"{v:.2f}%" if not pd.isna(v) else "",
+    })
+    trades_table.pack(fill='both', expand=True)
+
+    def read_settings():
+        """讀取回測設定，數值錯誤時回傳 None"""
+        codes = [c.strip() for c in codes_entry.get().split(',') if c.strip()]
+        if not codes:
+            codes = [str(code) for code in get_stock_holdings()]
+        try:
+            params = {name: float(entry.get()) if '.' in entry.get() else int(entry.get())
+                      for name, entry in param_entries.items()}
+            stop_loss = float(option_entries['stop_loss'].get()) / 100
+            take_profit = float(option_entries['take_profit'].get()) / 100
+            shares = int(option_entries['shares'].get())
+        except ValueError:
+            messagebox.showerror("錯誤", "請輸入有效數值")
+            return None
+        if not codes:
+            messagebox.showwarning("警告", "請輸入股票代碼")
+            return None
+        return codes, params, stop_loss, take_profit, shares
+
+    def on_run():
+        """執行回測"""
+        settings = read_settings()
+        if not settings:
+            return
+        codes, params, stop_loss, take_profit, shares = settings
+        strategy = strategy_combo.get()
+        period = period_combo.get()
+        status_label.config(text="回測中...")
+        started = time.time()
+
+        def show_results(result):
+            trades, metrics = result
+            for key, label in metric_labels.items():
+                value = metrics.get(key, 0)
+                if key in ('roi', 'win_rate'):
+                    label.config(text=f"{value:.2f}%")
+                elif key == 'profit_factor':
+                    label.config(text=f"{value:.2f}")
+                else:
+                    label.config(text=f"{value:,.0f}")
+
+            is_buy = (trades['買/賣/股利'] == '買').to_numpy()
+            trades_table.set_data(pd.DataFrame({
+                '日期': trades['交易日期'].to_numpy(),
+                '代碼': trades['代號'].to_numpy(),
+                '交易': trades['買/賣/股利'].to_numpy(),
+                '價格': np.where(is_buy, trades['買入價格'], trades['賣出價格']),
+                '數量': np.where(is_buy, trades['買入股數'], trades['賣出股數']),
+                '手續費': trades['手續費'].to_numpy(),
+                '交易稅': trades['交易稅'].to_numpy(),
+                'ROR': np.where(is_buy, np.nan, trades['ROR']),
+            }))
+            status_label.config(
+                text=f"{len(codes)} 檔，耗時 {time.time() - started:.1f} 秒")
+
+        def on_error(error):
+            status_label.config(text="回測失敗")
+            messagebox.showerror("錯誤", f"回測時發生錯誤：{error}")
+
+        run_in_background(frame, lambda: backtest_strategy(
+            codes, strategy, params, period, stop_loss, take_profit, shares),
+            show_results, on_error)
+
+    # 參數最佳化：各參數輸入範圍（起:迄:間距 或 a,b,c）
+    sweep_frame = ttk.LabelFrame(settings_frame, text="參數最佳化")
+    mode_combo = ttk.Combobox(sweep_frame, state='readonly', width=10,
+                              values=["網格搜尋", "隨機搜尋"])
+    mode_combo.set("網格搜尋")
+    mode_combo.grid(row=0, column=0, padx=5, pady=2)
+    ttk.Label(sweep_frame, text="隨機組數").grid(row=0, column=1, sticky='e')
+    samples_entry = ttk.Entry(sweep_frame, width=6)
+    samples_entry.insert(0, "200")
+    samples_entry.grid(row=0, column=2, padx=5, pady=2)
+    ttk.Label(sweep_frame, text="範圍：起:迄:間距 或 a,b,c").grid(
+        row=1, column=0, columnspan=3, sticky='w', padx=5)
+    space_frame = ttk.Frame(sweep_frame)
+    space_frame.grid(row=2, column=0, columnspan=3, sticky='we', padx=5)
+    space_entries = {}
+
+    def build_space_entries():
+        for widget in space_frame.winfo_children():
+            widget.destroy()
+        space_entries.clear()
+        _, defaults = STRATEGIES[strategy_combo.get()]
+        for i, (name, value) in enumerate(defaults.items()):
+            ttk.Label(space_frame, text=name).grid(row=i, column=0, sticky='e')
+            entry = ttk.Entry(space_frame, width=14)
+            entry.insert(0, str(value))
+            entry.grid(row=i, column=1, sticky='w', padx=5)
+            space_entries[name] = entry
+
+    def on_strategy_changed(event=None):
+        build_param_entries()
+        build_space_entries()
+
+    strategy_combo.bind('<<ComboboxSelected>>', on_strategy_changed)
+    build_space_entries()
+
+    def on_sweep():
+        """執行參數最佳化"""
+        settings = read_settings()
+        if not settings:
+            return
+        codes, _, stop_loss, take_profit, shares = settings
+        try:
+            space = {name: parse_parameter_space(entry.get())
+                     for name, entry in space_entries.items()}
+            n_samples = int(samples_entry.get())
+        except ValueError:
+            messagebox.showerror("錯誤", "參數範圍格式錯誤")
+            return
+        mode = "grid" if mode_combo.get() == "網格搜尋" else "random"
+        strategy = strategy_combo.get()
+        period = period_combo.get()
+        status_label.config(text="參數最佳化中...")
+        started = time.time()
+
+        def task():
+            panel = load_price_panel(codes, period)
+            if not panel:
+                raise ValueError("無可用的價格資料")
+            return run_parameter_sweep(panel, strategy, space, mode, n_samples,
+                                       stop_loss=stop_loss, take_profit=take_profit,
+                                       shares=shares)
+
+        def show_results(result_df):
+            status_label.config(
+                text=f"{len(result_df)} 組參數，耗時 {time.time() - started:.1f} 秒")
+            window = tk.Toplevel(frame)
+            window.title(f"參數最佳化結果 - {strategy}")
+            tree = ttk.Treeview(window, columns=list(result_df.columns), show='headings')
+            scrollbar = ttk.Scrollbar(window, orient="vertical", command=tree.yview)
+            scrollbar.pack(side='right', fill='y')
+            tree.configure(yscrollcommand=scrollbar.set)
+            tree.pack(fill='both', expand=True)
+            fill_sortable_tree(tree, result_df)
+
+        def on_error(error):
+            status_label.config(text="參數最佳化失敗")
+            messagebox.showerror("錯誤", f"參數最佳化時發生錯誤：{error}")
+
+        run_in_background(frame, task, show_results, on_error)
+
+    ttk.Button(settings_frame, text="開始回測",
+               command=on_run).pack(fill='x', padx=5, pady=5)
+    sweep_frame.pack(fill='x', padx=5, pady=5)
+    ttk.Button(sweep_frame, text="開始最佳化", command=on_sweep).grid(
+        row=3, column=0, columnspan=3, sticky='we', padx=5, pady=5)
+    status_label.pack(anchor='w', padx=5, pady=2)
+
+    return frame
+
+
+def format_cell(value):
+    """表格儲存格的預設格式：缺值顯示空白"""
+    if value is None or (isinstance(value, (float, np.floating)) and np.isnan(value)):
+        return ""
+    return str(value)
+
+
+class VirtualTable:
+    """大量資料表格：只格式化並放入可見範圍（含緩衝）的資料列，排序與篩選直接在欄位陣列上進行"""
+
+    BUFFER_ROWS = 50  # 可見範圍上下額外預先格式化的列數
+    FILTER_DELAY = 200  # 篩選輸入停止多久後才重新篩選（毫秒）
+
+    def __init__(self, master, columns, formatters=None, filterable=True):
+        # columns 為 [(欄位名稱, 寬度)]；formatters 為 {欄位名稱: 值 -> 字串}
+        self.frame = ttk.Frame(master)
+        self.columns = [name for name, _ in columns]
+        self.formatters = formatters or {}
+
+        self.filter_var = None
+        self.count_label = None
+        if filterable:
+            filter_bar = ttk.Frame(self.frame)
+            filter_bar.pack(fill='x')
+            ttk.Label(filter_bar, text="篩選").pack(side='left', padx=5)
+            self.filter_var = tk.StringVar()
+            ttk.Entry(filter_bar, textvariable=self.filter_var, width=20).pack(
+                side='left', padx=5, pady=2)
+            self.filter_var.trace_add('write', lambda *args: self._schedule_filter())
+            self.count_label = ttk.Label(filter_bar, text="")
+            self.count_label.pack(side='right', padx=5)
+
+        body = ttk.Frame(self.frame)
+        body.pack(fill='both', expand=True)
+        self.scrollbar = ttk.Scrollbar(body, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+        self.tree = ttk.Treeview(body, columns=self.columns, show='headings')
+        for name, width in columns:
+            self.tree.heading(name, text=name, command=lambda c=name: self.sort_by(c))
+            self.tree.column(name, width=width)
+        self.tree.pack(fill='both', expand=True)
+
+        self.tree.bind('<Configure>', self._on_resize)
+        self.tree.bind('<MouseWheel>', self._on_wheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+        self.tree.bind('<Prior>', lambda e: self.scroll(-self.visible_rows))
+        self.tree.bind('<Next>', lambda e: self.scroll(self.visible_rows))
+
+        self.data = {name: np.array([], dtype=object) for name in self.columns}
+        self.size = 0
+        self.order = np.arange(0)  # 依排序後的資料列位置
+        self.mask = None  # 篩選結果（None 表示不篩選）
+        self.view = np.arange(0)  # 目前顯示的資料列位置（已排序、已篩選）
+        self.search_text = None  # 篩選用的整列文字，第一次篩選時才建立
+        self.sort_column = None
+        self.ascending = True
+        self.top = 0
+        self.visible_rows = 20
+        self.items = []  # 重複使用的 Treeview 項目
+        self.cache_start = 0
+        self.cache_rows = []
+        self.filter_job = None
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set_data(self, df):
+        """載入資料（DataFrame 欄位需包含 columns），保留目前的排序與篩選"""
+        self.data = {name: df[name].to_numpy() for name in self.columns}
+        self.size = len(df)
+        self.search_text = None
+        self.order = np.arange(self.size)
+        if self.sort_column is not None:
+            self.order = self._sorted_order(self.sort_column, self.ascending)
+        self.mask = None
+        if self.filter_var is not None and self.filter_var.get().strip():
+            self.mask = self._filter_mask(self.filter_var.get().strip())
+        self.top = 0
+        self._refresh_view()
+
+    def show_message(self, text):
+        """清空表格並顯示一行訊息（例如計算中）"""
+        self.tree.delete(*self.tree.get_children())
+        self.items = [self.tree.insert('', 'end', values=(text,))]
+        self.cache_rows = []
+
+    def sort_by(self, column):
+        """依欄位排序（再點一次反向），只對排序索引進行運算"""
+        ascending = not self.ascending if self.sort_column == column else True
+        self.sort_column, self.ascending = column, ascending
+        self.order = self._sorted_order(column, ascending)
+        self.top = 0
+        self._refresh_view()
+
+    def _sorted_order(self, column, ascending):
+        values = pd.Series(self.data[column])
+        try:
+            ordered = values.sort_values(ascending=ascending, kind='mergesort',
+                                         na_position='last')
+        except TypeError:
+            # 混合型別的欄位改以文字排序
+            ordered = values.astype(str).sort_values(ascending=ascending, kind='mergesort')
+        return ordered.index.to_numpy()
+
+    def _schedule_filter(self):
+        if self.filter_job is not None:
+            self.frame.after_cancel(self.filter_job)
+        self.filter_job = self.frame.after(self.FILTER_DELAY, self._apply_filter)
+
+    def _apply_filter(self):
+        self.filter_job = None
+        text = self.filter_var.get().strip()
+        self.mask = self._filter_mask(text) if text else None
+        self.top = 0
+        self._refresh_view()
+
+    def _filter_mask(self, text):
+        """任一文字欄位（日期、代碼、名稱等）包含輸入文字（不分大小寫）的資料列"""
+        if self.search_text is None:
+            joined = pd.Series([''] * self.size, dtype=object)
+            for name in self.columns:
+                values = pd.Series(self.data[name])
+                if not pd.api.types.is_numeric_dtype(values):
+                    joined = joined + '\t' + values.fillna('').astype(str)
+            self.search_text = joined.str.lower()
+        return self.search_text.str.contains(text.lower(), regex=False).to_numpy()
+
+    def _refresh_view(self):
+        self.view = self.order if self.mask is None else self.order[self.mask[self.order]]
+        self.cache_rows = []
+        if self.count_label is not None:
+            self.count_label.config(text=f"{len(self.view):,} / {self.size:,} 筆")
+        self.render()
+
+    def _format_rows(self, start, stop):
+        """將 view[start:stop] 的資料列格式化為字串"""
+        index = self.view[start:stop]
+        columns = [[self.formatters.get(name, format_cell)(value)
+                    for value in self.data[name][index]] for name in self.columns]
+        return list(zip(*columns))
+
+    def render(self):
+        """只更新可見範圍的 Treeview 項目"""
+        total = len(self.view)
+        self.top = max(0, min(self.top, total - self.visible_rows))
+        stop = min(total, self.top + self.visible_rows)
+
+        # 可見範圍超出已格式化的緩衝區時，重新格式化（含上下緩衝）
+        cache_stop = self.cache_start + len(self.cache_rows)
+        if self.top < self.cache_start or stop > cache_stop:
+            self.cache_start = max(0, self.top - self.BUFFER_ROWS)
+            self.cache_rows = self._format_rows(
+                self.cache_start, min(total, stop + self.BUFFER_ROWS))
+        rows = self.cache_rows[self.top - self.cache_start:stop - self.cache_start]
+
+        for i, values in enumerate(rows):
+            if i < len(self.items):
+                self.tree.item(self.items[i], values=values)
+            else:
+                self.items.append(self.tree.insert('', 'end', values=values))
+        if len(self.items) > len(rows):
+            self.tree.delete(*self.items[len(rows):])
+            del self.items[len(rows):]
+
+        if total:
+            self.scrollbar.set(self.top / total, stop / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll(self, rows):
+        self.top += rows
+        self.render()
+        return 'break'
+
+    def _on_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.view))
+            self.render()
+        elif args[0] == 'scroll':
+            step = self.visible_rows if args[2] == 'pages' else 1
+            self.scroll(int(args[1]) * step)
+
+    def _on_wheel(self, event):
+        # Windows 每格為 120，macOS 為 1
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self.scroll(-3 * delta)
+
+    def _on_resize(self, event):
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        rows = max(1, (event.height - row_height) // row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.render()
+
+
+def fill_sortable_tree(tree, df):
+    """將 DataFrame 填入 Treeview，點選欄位標題可依該欄排序（再點一次反向）"""
+    state = {'df': df, 'column': None, 'ascending': True}
+
+    def format_value(value):
+        if isinstance(value, (float, np.floating)):
+            return f"{value:,.4f}" if abs(value) < 100 else f"{value:,.0f}"
+        return value
+
+    def render():
+        tree.delete(*tree.get_children())
+        for row in state['df'].itertuples(index=False):
+            tree.insert('', 'end', values=[format_value(v) for v in row])
+
+    def sort_by(column):
+        ascending = not state['ascending'] if state['column'] == column else False
+        state.update(column=column, ascending=ascending,
+                     df=state['df'].sort_values(column, ascending=ascending,
+                                                kind='mergesort'))
+        render()
+
+    for column in df.columns:
+        tree.heading(column, text=column, command=lambda c=column: sort_by(c))
+        tree.column(column, width=100)
+    render()
+
+
 def setup_styles():
     """設定自定義樣式"""
     style = ttk.Style()
@@ -1530,11 +1958,17 @@ def create_menu(root_window):
         label="關於", command=lambda: messagebox.showinfo("關於", "專業股票交易系統 v1.0"))
 
 
-def initialize_gui():
-    """初始化圖形界面"""
+def build_gui():
+    """建立主視窗與所有元件（不進入主循環），回傳 root 視窗"""
+    global refresh_scheduler
     root_window = tk.Tk()
     root_window.title("專業股票交易系統")
 
+    # 事件在同一輪 Tk 事件迴圈中合併後再分派；交易紀錄變動時先重建持股部位與停損/停利規則
+    event_bus.call_later = root_window.after
+    event_bus.subscribe(LedgerChanged, lambda event: rebuild_exposure_book(event.path))
+    event_bus.subscribe(LedgerChanged, lambda event: refresh_alert_positions(event.path))
+
     # 設置視窗大小和位置
     window_width = 1200
     window_height = 800
@@ -1560,455 +1994,29 @@ def initialize_gui():
     root_window.status_label = status_label
     root_window.update_time_label = update_time_label
 
-    # 啟動主循環
-    root_window.mainloop()
-
-
-def calculate_performance_metrics(stock_code=None):
-    """計算交易績效指標"""
-    df = load_original_trades()
-    if df.empty:
-        return {}
-
-    # 如果指定了股票代碼，只分析該股票
-    if stock_code:
-        df = df[df['代號'] == stock_code]
-
-    metrics = {
-        'total_investment': 0,  # 總投資金額
-        'total_return': 0,      # 總報酬
-        'win_rate': 0,         # 勝率
-        'profit_factor': 0,    # 獲利因子
-        'max_drawdown': 0,     # 最大回撤
-        'total_trades': 0,     # 總交易次數
-        'win_trades': 0,       # 獲利次數
-        'loss_trades': 0       # 虧損次數
-    }
-
-    # 計算交易統計
-    total_profit = 0
-    total_loss = 0
-
-    # 按股票分組計算
-    for code in df['代號'].unique():
-        stock_df = df[df['代號'] == code]
-
-        # 計算買入成本
-        buy_cost = 0
-        buy_shares = 0
-        sell_profit = 0
-
-        for _, row in stock_df.iterrows():
-            if row['買/賣/股利'] == '買':
-                cost = row['買入價格'] * row['買入股數']
-                fee = float(row['手續費']) if pd.notna(row['手續費']) else 20
-                buy_cost += cost + fee
-                buy_shares += row['買入股數']
-                metrics['total_investment'] += cost + fee
-
-            elif row['買/賣/股利'] == '賣':
-                revenue = row['賣出價格'] * row['賣出股數']
-                fee = float(row['手續費']) if pd.notna(row['手續費']) else 20
-                tax = float(row['交易稅']) if pd.notna(
-                    row['交易稅']) else revenue * 0.003
-
-                # 計算此次賣出的成本
-                avg_cost = buy_cost / buy_shares if buy_shares > 0 else 0
-                sell_cost = avg_cost * row['賣出股數']
-
-                profit = revenue - sell_cost - fee - tax
-                if profit > 0:
-                    total_profit += profit
-                    metrics['win_trades'] += 1
-                else:
-                    total_loss += abs(profit)
-                    metrics['loss_trades'] += 1
-
-                metrics['total_trades'] += 1
-
-    # 計算績效指標
-    metrics['total_return'] = total_profit - total_loss
-    metrics['win_rate'] = (metrics['win_trades'] / metrics['total_trades']
-                           * 100) if metrics['total_trades'] > 0 else 0
-    metrics['profit_factor'] = total_profit / \
-        total_loss if total_loss > 0 else float('inf')
-
-    # 計算報酬率
-    if metrics['total_investment'] > 0:
-        metrics['roi'] = (metrics['total_return'] /
-                          metrics['total_investment']) * 100
-    else:
-        metrics['roi'] = 0
-
-    return metrics
-
-
-def update_performance_display():
-    """更新績效顯示"""
-    metrics = calculate_performance_metrics()
-
-    # 更新績效摘要標籤
-    performance_labels = {
-        'total_investment': f"總投資金額: {metrics['total_investment']:,.0f} 元",
-        'total_return': f"總報酬: {metrics['total_return']:,.0f} 元",
-        'roi': f"報酬率: {metrics['roi']:.2f}%",
-        'win_rate': f"勝率: {metrics['win_rate']:.1f}%",
-        'profit_factor': f"獲利因子: {metrics['profit_factor']:.2f}",
-        'total_trades': f"總交易次數: {metrics['total_trades']}"
-    }
-
-    # 更新績效顯示
-    row = 0
-    col = 0
-    for label, value in performance_labels.items():
-        ttk.Label(summary_frame, text=value).grid(
-            row=row, column=col, padx=5, pady=2, sticky='w'
-        )
-        col += 1
-        if col >= 3:
-            col = 0
-            row += 1
-
-
-def create_charts(frame):
-    """創建圖表顯示"""
-    # 創建圖表容器
-    fig = Figure(figsize=(12, 6))
-
-    # 添加子圖
-    ax1 = fig.add_subplot(221)  # 股價走勢
-    ax2 = fig.add_subplot(222)  # 獲利分布
-    ax3 = fig.add_subplot(223)  # 交易量
-    ax4 = fig.add_subplot(224)  # 累計報酬
-
-    # 獲取數據
-    df = load_original_trades()
-    if not df.empty:
-        # 轉換日期格式
-        df['交易日期'] = pd.to_datetime(df['交易日期'])
-
-        # 1. 繪製股價走勢
-        ax1.set_title('股價走勢')
-        for code in df['代號'].unique():
-            stock_df = df[df['代號'] == code]
-            ax1.plot(stock_df['交易日期'], stock_df['現價'],
-                     label=f"{code}", marker='o')
-        ax1.legend()
-        ax1.grid(True)
-
-        # 2. 繪製獲利分布
-        profits = []
-        for code in df['代號'].unique():
-            stock_df = df[df['代號'] == code]
-            metrics = calculate_performance_metrics(code)
-            profits.append((code, metrics['total_return']))
-
-        profits.sort(key=lambda x: x[1], reverse=True)
-        codes, values = zip(*profits)
-        ax2.bar(codes, values)
-        ax2.set_title('各股獲利分布')
-        plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
-
-        # 3. 繪製交易量
-        monthly_trades = df.groupby(
-            df['交易日期'].dt.strftime('%Y-%m'))['代號'].count()
-        ax3.bar(range(len(monthly_trades)), monthly_trades.values)
-        ax3.set_title('月度交易量')
-        ax3.set_xticks(range(len(monthly_trades)))
-        ax3.set_xticklabels(monthly_trades.index, rotation=45)
-
-        # 4. 繪製累計報酬
-        cumulative_return = []
-        current_return = 0
-        for _, row in df.sort_values('交易日期').iterrows():
-            if row['買/賣/股利'] == '買':
-                current_return -= (row['買入價格'] * row['買入股數'] +
-                                   float(row['手續費'] if pd.notna(row['手續費']) else 20))
-            elif row['買/賣/股利'] == '賣':
-                current_return += (row['賣出價格'] * row['賣出股數'] -
-                                   float(row['手續費'] if pd.notna(row['手續費']) else 20) -
-                                   float(row['交易稅'] if pd.notna(row['交易稅']) else 0))
-            cumulative_return.append((row['交易日期'], current_return))
-
-        dates, returns = zip(*cumulative_return)
-        ax4.plot(dates, returns, marker='o')
-        ax4.set_title('累計報酬')
-        ax4.grid(True)
-        plt.setp(ax4.xaxis.get_majorticklabels(), rotation=45)
-
-    # 調整布局
-    fig.tight_layout()
-
-    # 創建畫布
-    canvas = FigureCanvasTkAgg(fig, master=frame)
-    canvas.draw()
-
-    # 將畫布放置到框架中
-    canvas.get_tk_widget().pack(fill='both', expand=True)
-
-    return canvas
-
-
-def update_charts():
-    """更新圖表顯示"""
-    # 清除原有圖表
-    for widget in chart_frame.winfo_children():
-        widget.destroy()
-
-    # 創建新圖表
-    create_charts(chart_frame)
-
-
-def get_institutional_data(stock_code):
-    """獲取三大法人買賣超資料"""
-    try:
-        # 移除股票代碼中的 .TW 或 .TWO
-        stock_code = ''.join(filter(str.isdigit, stock_code))
-
-        # 設定日期範圍（最近5個交易日）
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=10)  # 多取幾天以確保有5個交易日
-
-        # 證交所API網址
-        url = "https://www.twse.com.tw/rwd/zh/fund/T86?date={}&selectType=ALL&response=json"
-
-        data = {
-            'dates': [],
-            'foreign': [],
-            'trust': [],
-            'dealer': []
-        }
-
-        # 獲取每日資料
-        current_date = start_date
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y%m%d')
-            response = requests.get(url.format(date_str))
-
-            if response.status_code == 200:
-                json_data = response.json()
-                if json_data.get('data'):
-                    for row in json_data['data']:
-                        if row[0] == stock_code:
-                            data['dates'].append(current_date)
-                            data['foreign'].append(
-                                int(row[4].replace(',', '')))  # 外資買賣超
-                            data['trust'].append(
-                                int(row[7].replace(',', '')))    # 投信買賣超
-                            data['dealer'].append(
-                                int(row[10].replace(',', '')))  # 自營商買賣超
-
-            current_date += timedelta(days=1)
-            time.sleep(0.5)  # 避免請求過於頻繁
-
-        return data
-    except Exception as e:
-        print(f"獲取三大法人資料時出錯：{str(e)}")
-        return None
-
-
-def get_margin_trading_data(stock_code):
-    """獲取融資融券餘額資料"""
-    try:
-        # 移除股票代碼中的 .TW 或 .TWO
-        stock_code = ''.join(filter(str.isdigit, stock_code))
-
-        # 證交所融資融券API
-        url = "https://www.twse.com.tw/rwd/zh/marginTrading/MI_MARGN?date={}&selectType=ALL&response=json"
-
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=10)
-
-        data = {
-            'dates': [],
-            'margin_balance': [],
-            'short_balance': []
-        }
-
-        current_date = start_date
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y%m%d')
-            response = requests.get(url.format(date_str))
-
-            if response.status_code == 200:
-                json_data = response.json()
-                if json_data.get('data'):
-                    for row in json_data['data']:
-                        if row[0] == stock_code:
-                            data['dates'].append(current_date)
-                            data['margin_balance'].append(
-                                int(row[5].replace(',', '')))  # 融資餘額
-                            data['short_balance'].append(
-                                int(row[8].replace(',', '')))   # 融券餘額
-
-            current_date += timedelta(days=1)
-            time.sleep(0.5)
-
-        return data
-    except Exception as e:
-        print(f"獲取融資融券資料時出錯：{str(e)}")
-        return None
-
-
-def get_shareholding_distribution(stock_code):
-    """獲取股權分散資料"""
+    # 所有定時更新共用一個排程器，抓取在背景執行緒進行
+    refresh_scheduler = RefreshScheduler(
+        root_window.after, root_window.after_cancel,
+        lambda task, on_done, on_error: run_in_background(root_window, task, on_done, on_error))
     try:
-        # 移除股票代碼中的 .TW 或 .TWO
-        stock_code = ''.join(filter(str.isdigit, stock_code))
-
-        # 證交所股權分散表API
-        url = f"https://www.tdcc.com.tw/smWeb/QryStockAjax.do"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
-        }
-
-        # 取得最近一週的資料
-        today = datetime.now()
-        friday = today - timedelta(days=(today.weekday() - 4) % 7)
-        date_str = friday.strftime('%Y%m%d')
-
-        data = {
-            'scaDates': date_str,
-            'scaDate': date_str,
-            'SqlMethod': 'StockNo',
-            'StockNo': stock_code,
-            'radioStockNo': stock_code
-        }
-
-        response = requests.post(url, data=data, headers=headers)
-
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            table = soup.find('table', {'class': 'table_2'})
-
-            if table:
-                rows = table.find_all('tr')[1:]  # 跳過表頭
-                total_shares = 0
-                distribution = {
-                    '1-999': 0,
-                    '1,000-5,000': 0,
-                    '5,001-10,000': 0,
-                    '10,001-50,000': 0,
-                    '50,001-100,000': 0,
-                    '100,001-500,000': 0,
-                    '500,001-1,000,000': 0,
-                    '1,000,001以上': 0
-                }
-
-                for row in rows:
-                    cols = row.find_all('td')
-                    if len(cols) >= 4:
-                        shares = int(cols[3].text.replace(',', ''))
-                        total_shares += shares
-
-                        # 根據持股數量分類
-                        level = cols[1].text.strip()
-                        distribution[level] = shares
-
-                return distribution
-
-        return None
+        start_realtime_quotes()
     except Exception as e:
-        print(f"獲取股權分散資料時出錯：{str(e)}")
-        return None
-
-
-def update_chip_data(stock_code):
-    """更新籌碼資料"""
-    try:
-        # 獲取三大法人資料
-        inst_data = get_institutional_data(stock_code)
-        # 獲取融資融券資料
-        margin_data = get_margin_trading_data(stock_code)
-        # 獲取股權分散資料
-        dist_data = get_shareholding_distribution(stock_code)
-
-        if not any([inst_data, margin_data, dist_data]):
-            print("無法獲取籌碼資料")
-            return
-
-        # 清除現有圖表
-        for widget in chart_frame.winfo_children():
-            widget.destroy()
+        print(f"啟動即時報價時出錯：{str(e)}")
+    return root_window
 
-        # 創建新圖表
-        fig = Figure(figsize=(10, 8))
-
-        # 設置全局字型
-        plt.rcParams['font.size'] = 10
-
-        # 三大法人買賣超圖
-        ax1 = fig.add_subplot(311)
-        if inst_data:
-            dates = inst_data['dates']
-            ax1.bar(dates, inst_data['foreign'],
-                    label='外資', color='red', alpha=0.7)
-            ax1.bar(dates, inst_data['trust'], bottom=inst_data['foreign'],
-                    label='投信', color='green', alpha=0.7)
-            ax1.bar(dates, inst_data['dealer'],
-                    bottom=[
-                        f+t for f, t in zip(inst_data['foreign'], inst_data['trust'])],
-                    label='自營商', color='blue', alpha=0.7)
-
-        ax1.set_title('三大法人買賣超')
-        ax1.legend()
-        ax1.grid(True)
-
-        # 融資融券圖
-        ax2 = fig.add_subplot(312)
-        if margin_data:
-            dates = margin_data['dates']
-            ax2.plot(dates, margin_data['margin_balance'],
-                     label='融資餘額', color='red', marker='o')
-            ax2.plot(dates, margin_data['short_balance'],
-                     label='融券餘額', color='green', marker='o')
-
-        ax2.set_title('融資融券餘額')
-        ax2.legend()
-        ax2.grid(True)
-
-        # 股權分散圖
-        ax3 = fig.add_subplot(313)
-        if dist_data:
-            labels = list(dist_data.keys())
-            sizes = list(dist_data.values())
-            ax3.pie(sizes, labels=labels, autopct='%1.1f%%',
-                    colors=['red', 'green', 'blue', 'gray', 'orange', 'purple', 'yellow', 'pink'])
-            ax3.set_title('股權分散')
-
-        # 調整布局
-        fig.tight_layout()
-
-        # 創建畫布並顯示
-        canvas = FigureCanvasTkAgg(fig, master=chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill='both', expand=True)
-
-        # 更新左側籌碼資訊
-        if inst_data and margin_data:
-            # 計算三大法人最新持股比例
-            total_inst = sum([inst_data['foreign'].iloc[-1],
-                              inst_data['trust'].iloc[-1],
-                              inst_data['dealer'].iloc[-1]])
-
-            labels['foreign_holding'].config(
-                text=f"{inst_data['foreign'].iloc[-1]/total_inst*100:.2f}%")
-            labels['trust_holding'].config(
-                text=f"{inst_data['trust'].iloc[-1]/total_inst*100:.2f}%")
-            labels['dealer_holding'].config(
-                text=f"{inst_data['dealer'].iloc[-1]/total_inst*100:.2f}%")
-            labels['margin_balance'].config(
-                text=f"{margin_data['margin_balance'].iloc[-1]:,}")
-            labels['short_balance'].config(
-                text=f"{margin_data['short_balance'].iloc[-1]:,}")
 
-            # 計算當沖比率（假設值）
-            labels['day_trade_ratio'].config(text="5.23%")
+def initialize_gui():
+    """初始化圖形界面"""
+    root_window = build_gui()
 
-    except Exception as e:
-        print(f"更新籌碼資料時出錯：{str(e)}")
+    # 啟動主循環
+    root_window.mainloop()
 
 
 # 啟動應用程序
 if __name__ == "__main__":
-    initialize_gui()
+    if len(sys.argv) > 1:
+        # 帶參數時以命令列批次模式執行（不開啟視窗），例如 python main.py holdings --format csv
+        sys.exit(run_cli(sys.argv[1:]))
+    else:
+        initialize_gui()
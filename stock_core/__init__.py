@@ -0,0 +1,31 @@
+"""股票交易核心函式庫：交易紀錄、手續費、持股損益、技術指標與台股資料抓取
+
+不依賴 tkinter 與 main.py，批次工作、服務與基準測試可直接匯入；
+pandas、matplotlib 等重量級套件在第一次使用時才載入。
+圖表（charts）、報表（reports）、選股（screener）與回測（backtest）請匯入對應子模組。
+"""
+from .indicators import (calculate_bollinger_bands, calculate_kd, calculate_macd,
+                         calculate_obv, calculate_rsi, calculate_williams_r, compute_indicator,
+                         rolling_extrema, rolling_high_low)
+from .ledger import (TRADE_COLUMNS, build_performance_report, build_stock_history,
+                     calculate_fees, calculate_fees_array, calculate_performance_metrics,
+                     get_stock_holdings, load_original_trades)
+from .market import (TIMEFRAMES, format_stock_code, get_bars, get_foreign_net_buy,
+                     get_institutional_data, get_margin_trading_data,
+                     get_shareholding_distribution, get_t86_table, load_chip_data,
+                     load_daily_bars, load_stock_universe)
+
+__all__ = [
+    # 技術指標
+    'calculate_bollinger_bands', 'calculate_kd', 'calculate_macd', 'calculate_obv',
+    'calculate_rsi', 'calculate_williams_r', 'compute_indicator', 'rolling_extrema',
+    'rolling_high_low',
+    # 交易紀錄
+    'TRADE_COLUMNS', 'build_performance_report', 'build_stock_history',
+    'calculate_fees', 'calculate_fees_array', 'calculate_performance_metrics',
+    'get_stock_holdings', 'load_original_trades',
+    # 台股資料
+    'TIMEFRAMES', 'format_stock_code', 'get_bars', 'get_foreign_net_buy',
+    'get_institutional_data', 'get_margin_trading_data', 'get_shareholding_distribution',
+    'get_t86_table', 'load_chip_data', 'load_daily_bars', 'load_stock_universe',
+]
@@ -0,0 +1,335 @@
+"""策略回測與參數最佳化"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .indicators import calculate_bollinger_bands, calculate_kd, calculate_macd
+from .lazy import LazyImport
+from .ledger import TRADE_COLUMNS, calculate_fees_array, calculate_performance_metrics
+from .market import OHLCV_COLUMNS, load_daily_bars
+
+pd = LazyImport(globals(), 'pd', 'pandas')
+
+
+# 策略回測設定
+BACKTEST_SHARES = 1000  # 每次進場股數（一張）
+
+
+def load_price_panel(stock_codes, period="10y", refresh=False):
+    """由日K快取組成價格面板：欄位名稱 -> DataFrame（日期 × 股票）"""
+    frames = {}
+    for code in stock_codes:
+        try:
+            df = load_daily_bars(code, period, refresh=refresh)
+        except Exception as e:
+            print(f"讀取 {code} 日K時出錯：{str(e)}")
+            continue
+        if not df.empty:
+            frames[str(code)] = df
+
+    if not frames:
+        return {}
+    return {column: pd.concat({code: df[column] for code, df in frames.items()},
+                              axis=1).sort_index()
+            for column in OHLCV_COLUMNS}
+
+
+def _cross_above(a, b):
+    """a 由下往上穿越 b"""
+    return (a > b) & (a.shift(1) <= b.shift(1))
+
+
+def kd_signals(panel, n=9, m1=3, m2=3):
+    """KD 交叉：K 上穿 D 進場、K 下穿 D 出場"""
+    k, d = calculate_kd(panel, n, m1, m2)
+    return _cross_above(k, d), _cross_above(d, k)
+
+
+def macd_signals(panel, fast=12, slow=26, signal=9):
+    """MACD 交叉：MACD 上穿訊號線進場、下穿出場"""
+    macd, signal_line, _ = calculate_macd(panel, fast, slow, signal)
+    return _cross_above(macd, signal_line), _cross_above(signal_line, macd)
+
+
+def bollinger_signals(panel, period=20, std_dev=2):
+    """布林通道：收盤跌破下軌進場、站回中軌出場"""
+    middle, upper, lower = calculate_bollinger_bands(panel, period, std_dev)
+    close = panel['Close']
+    return _cross_above(lower, close), _cross_above(close, middle)
+
+
+# 策略名稱 -> (訊號函式, 預設參數)
+STRATEGIES = {
+    "KD交叉": (kd_signals, {"n": 9, "m1": 3, "m2": 3}),
+    "MACD交叉": (macd_signals, {"fast": 12, "slow": 26, "signal": 9}),
+    "布林通道": (bollinger_signals, {"period": 20, "std_dev": 2})
+}
+
+
+def run_backtest(panel, entries, exits, shares=BACKTEST_SHARES, stop_loss=0.2,
+                 take_profit=0.2, close_at_end=True, names=None):
+    """向量化回測：收盤產生訊號、次日開盤成交，盤中觸及停損/停利價即出場
+
+    所有股票同時以陣列運算逐日推進，回傳與交易紀錄檔相同欄位的 DataFrame，
+    可直接交給 calculate_performance_metrics 計算績效。
+    """
+    close_df = panel['Close']
+    dates = close_df.index
+    codes = close_df.columns
+    open_ = panel['Open'].reindex_like(close_df).to_numpy(dtype='float64')
+    high = panel['High'].reindex_like(close_df).to_numpy(dtype='float64')
+    low = panel['Low'].reindex_like(close_df).to_numpy(dtype='float64')
+    close = close_df.to_numpy(dtype='float64')
+    entry_sig = entries.reindex_like(close_df).fillna(False).to_numpy(dtype=bool)
+    exit_sig = exits.reindex_like(close_df).fillna(False).to_numpy(dtype=bool)
+
+    n_codes = close.shape[1]
+    in_pos = np.zeros(n_codes, dtype=bool)
+    entry_price = np.full(n_codes, np.nan)
+    entry_idx = np.zeros(n_codes, dtype=np.int64)
+    trades = []  # (股票索引, 進場日索引, 出場日索引, 進場價, 出場價)
+
+    def record_exits(mask, t, prices):
+        for j in np.nonzero(mask)[0]:
+            trades.append((j, entry_idx[j], t, entry_price[j], prices[j]))
+
+    for t in range(1, len(dates)):
+        tradable = ~np.isnan(open_[t])
+        flat = ~in_pos
+
+        # 前一日出場訊號：今日開盤賣出
+        sell = in_pos & exit_sig[t - 1] & tradable
+        record_exits(sell, t, open_[t])
+        in_pos &= ~sell
+
+        # 前一日進場訊號：今日開盤買進（當日已出場者不再進場）
+        buy = flat & entry_sig[t - 1] & tradable
+        entry_price[buy] = open_[t][buy]
+        entry_idx[buy] = t
+        in_pos |= buy
+
+        # 停損優先於停利；跳空時以開盤價成交
+        stop_price = entry_price * (1 - stop_loss)
+        take_price = entry_price * (1 + take_profit)
+        hit_stop = in_pos & (low[t] <= stop_price)
+        hit_take = in_pos & ~hit_stop & (high[t] >= take_price)
+        record_exits(hit_stop, t, np.fmin(open_[t], stop_price))
+        record_exits(hit_take, t, np.fmax(open_[t], take_price))
+        in_pos &= ~(hit_stop | hit_take)
+
+    # 期末以最後收盤價平倉
+    if close_at_end and in_pos.any():
+        last_close = close_df.ffill().to_numpy(dtype='float64')[-1]
+        record_exits(in_pos, len(dates) - 1, last_close)
+
+    return _backtest_trades_to_ledger(trades, dates, codes, close, shares, names)
+
+
+def _backtest_trades_to_ledger(trades, dates, codes, close, shares, names=None):
+    """將回測成交轉為交易紀錄欄位格式（每筆來回交易拆成買、賣兩列）"""
+    if not trades:
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+
+    records = np.array(trades, dtype='float64')
+    code_idx = records[:, 0].astype(np.int64)
+    buy_idx = records[:, 1].astype(np.int64)
+    sell_idx = records[:, 2].astype(np.int64)
+    buy_price = records[:, 3]
+    sell_price = records[:, 4]
+
+    buy_fee, _ = calculate_fees_array(buy_price, shares, True)
+    sell_fee, sell_tax = calculate_fees_array(sell_price, shares, False)
+    cost = buy_price * shares + buy_fee
+    income = sell_price * shares - sell_fee - sell_tax
+
+    code_values = np.asarray(codes)[code_idx]
+    names = names or {}
+    name_values = [names.get(code, code) for code in code_values]
+    date_strings = np.asarray(dates.strftime('%Y/%m/%d'))
+    zeros = np.zeros(len(records))
+
+    buys = pd.DataFrame({
+        "交易日期": date_strings[buy_idx],
+        "買/賣/股利": "買",
+        "代號": code_values,
+        "股票": name_values,
+        "交易類別": "回測",
+        "買入股數": shares,
+        "買入價格": buy_price,
+        "賣出股數": zeros,
+        "賣出價格": zeros,
+        "現價": close[buy_idx, code_idx],
+        "手續費": buy_fee,
+        "交易稅": zeros,
+        "交易成本": buy_fee,
+        "支出": -cost,
+        "收入": zeros,
+        "價差": close[buy_idx, code_idx] - buy_price,
+        "ROR": np.nan,
+        "持有時間": zeros,
+        "_sell": 0
+    })
+    sells = pd.DataFrame({
+        "交易日期": date_strings[sell_idx],
+        "買/賣/股利": "賣",
+        "代號": code_values,
+        "股票": name_values,
+        "交易類別": "回測",
+        "買入股數": zeros,
+        "買入價格": zeros,
+        "賣出股數": shares,
+        "賣出價格": sell_price,
+        "現價": close[sell_idx, code_idx],
+        "手續費": sell_fee,
+        "交易稅": sell_tax,
+        "交易成本": sell_fee + sell_tax,
+        "支出": zeros,
+        "收入": income,
+        "價差": sell_price - buy_price,
+        "ROR": (income - cost) / cost * 100,
+        "持有時間": (dates[sell_idx] - dates[buy_idx]).days,
+        "_sell": 1
+    })
+
+    # 同一檔股票同日先買後賣（進場當日即觸及停損/停利）
+    ledger = pd.concat([buys, sells], ignore_index=True)
+    ledger = ledger.sort_values(["交易日期", "代號", "_sell"], kind='mergesort')
+    return ledger.drop(columns="_sell").reset_index(drop=True)
+
+
+def backtest_strategy(stock_codes, strategy="KD交叉", params=None, period="10y",
+                      stop_loss=0.2, take_profit=0.2, shares=BACKTEST_SHARES, panel=None):
+    """以指定策略回測多檔股票，回傳 (交易紀錄, 績效指標)"""
+    panel = panel or load_price_panel(stock_codes, period)
+    if not panel:
+        return pd.DataFrame(columns=TRADE_COLUMNS), {}
+
+    signal_func, defaults = STRATEGIES[strategy]
+    entries, exits = signal_func(panel, **{**defaults, **(params or {})})
+    trades = run_backtest(panel, entries, exits, shares, stop_loss, take_profit)
+    return trades, calculate_performance_metrics(trades=trades)
+
+
+# 參數最佳化：子程序透過共享記憶體讀取價格面板
+_sweep_panel = None
+_sweep_shm = None
+
+# 參數最佳化結果保留的績效欄位
+SWEEP_METRICS = ['total_return', 'roi', 'win_rate', 'profit_factor', 'total_trades']
+
+
+def parameter_grid(space):
+    """展開網格參數：{參數: [候選值, ...]} -> [{參數: 值}, ...]"""
+    names = list(space)
+    return [dict(zip(names, values))
+            for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_parameters(space, n_samples, seed=None):
+    """隨機抽樣參數：值為清單時隨機挑選，為 (下限, 上限) 時均勻抽樣（整數上下限則抽整數）"""
+    rng = np.random.default_rng(seed)
+    samples = []
+    for _ in range(n_samples):
+        params = {}
+        for name, values in space.items():
+            if isinstance(values, tuple) and len(values) == 2:
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    params[name] = int(rng.integers(low, high + 1))
+                else:
+                    params[name] = float(rng.uniform(low, high))
+            else:
+                params[name] = values[rng.integers(len(values))]
+        samples.append(params)
+    return samples
+
+
+def _share_panel(panel):
+    """將價格面板複製到共享記憶體，回傳 (SharedMemory, 子程序重建所需資訊)"""
+    close = panel['Close']
+    columns = OHLCV_COLUMNS
+    shape = (len(columns),) + close.shape
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+    array = np.ndarray(shape, dtype='float64', buffer=shm.buf)
+    for i, column in enumerate(columns):
+        array[i] = panel[column].reindex_like(close).to_numpy(dtype='float64')
+    spec = (shm.name, shape, close.index.to_numpy(), list(close.columns))
+    return shm, spec
+
+
+def _attach_panel(spec):
+    """子程序初始化：連上共享記憶體並以零複製方式包裝成 DataFrame"""
+    global _sweep_panel, _sweep_shm
+    name, shape, index, columns = spec
+    _sweep_shm = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype='float64', buffer=_sweep_shm.buf)
+    array.flags.writeable = False
+    index = pd.DatetimeIndex(index)
+    _sweep_panel = {column: pd.DataFrame(array[i], index=index, columns=columns, copy=False)
+                    for i, column in enumerate(OHLCV_COLUMNS)}
+
+
+def _sweep_task(args):
+    """在子程序中以一組參數回測"""
+    strategy, params, stop_loss, take_profit, shares = args
+    signal_func, defaults = STRATEGIES[strategy]
+    try:
+        entries, exits = signal_func(_sweep_panel, **{**defaults, **params})
+        trades = run_backtest(_sweep_panel, entries, exits, shares, stop_loss, take_profit)
+        metrics = calculate_performance_metrics(trades=trades)
+    except Exception as e:
+        print(f"參數 {params} 回測時出錯：{str(e)}")
+        metrics = {}
+    return {**params, **{key: metrics.get(key, 0) for key in SWEEP_METRICS}}
+
+
+def run_parameter_sweep(panel, strategy, space, mode="grid", n_samples=100, seed=None,
+                        stop_loss=0.2, take_profit=0.2, shares=BACKTEST_SHARES,
+                        workers=None, progress=None):
+    """以程序池平行回測多組參數，回傳依總報酬排序的結果表
+
+    space 為 {參數: 候選值清單}（隨機模式也可用 (下限, 上限)）；
+    價格面板只放進共享記憶體一次，各子程序直接讀取，不需逐筆序列化 DataFrame。
+    """
+    if mode == "grid":
+        combos = parameter_grid(space)
+    else:
+        combos = random_parameters(space, n_samples, seed)
+    tasks = [(strategy, params, stop_loss, take_profit, shares) for params in combos]
+    workers = workers or os.cpu_count() or 1
+
+    shm, spec = _share_panel(panel)
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_panel,
+                                 initargs=(spec,)) as executor:
+            chunksize = max(1, len(tasks) // (workers * 8))
+            for row in executor.map(_sweep_task, tasks, chunksize=chunksize):
+                results.append(row)
+                if progress:
+                    progress(len(results), len(tasks))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    result_df = pd.DataFrame(results, columns=list(space) + SWEEP_METRICS)
+    return result_df.sort_values('total_return', ascending=False, ignore_index=True)
+
+
+def parse_parameter_space(text):
+    """解析參數範圍字串：「起:迄:間距」為區間，「a,b,c」為清單"""
+    def number(value):
+        return float(value) if '.' in value else int(value)
+
+    text = text.strip()
+    if ':' in text:
+        parts = [number(p) for p in text.split(':')]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1
+        if all(isinstance(p, int) for p in (start, stop, step)):
+            return list(range(start, stop + 1, step))
+        return np.arange(start, stop + step / 2, step).round(6).tolist()
+    return [number(p) for p in text.split(',') if p.strip()]
@@ -0,0 +1,114 @@
+"""基準指數比較：加權指數（^TWII）與 0050 日K存於日K快取，計算滾動 Beta、Alpha、追蹤誤差與資訊比率
+
+滾動統計以累積和相減求得各視窗的和與平方和，多個視窗共用同一次累積和，不逐日執行 Python。
+"""
+import numpy as np
+
+from .lazy import LazyImport
+from .market import load_daily_bars, period_since
+
+pd = LazyImport(globals(), 'pd', 'pandas')
+
+# 下拉選單顯示名稱 -> 基準代碼
+BENCHMARKS = {
+    "加權指數": "^TWII",
+    "元大台灣50": "0050"
+}
+DEFAULT_BENCHMARK = "^TWII"
+ROLLING_WINDOWS = (20, 60, 120, 252)  # 約一個月、一季、半年、一年
+RELATIVE_METRICS = ['beta', 'alpha', 'tracking_error', 'information_ratio']
+TRADING_DAYS = 252
+
+
+def load_benchmark(symbol=DEFAULT_BENCHMARK, start=None):
+    """讀取基準收盤價（Series），無法取得時回傳空 Series
+
+    基準只有一檔，讀取時先嘗試補上最新K棒，無法連網時改用本地快取。
+    """
+    period = period_since(start) if start is not None else "1y"
+    for refresh in (True, False):
+        try:
+            df = load_daily_bars(symbol, period, refresh=refresh)
+            return df['Close'] if not df.empty else pd.Series(dtype='float64')
+        except Exception as e:
+            print(f"讀取基準 {symbol} 時出錯：{str(e)}")
+    return pd.Series(dtype='float64')
+
+
+def align_returns(closes, benchmark, index):
+    """將收盤價面板與基準收盤價對齊到 index 後計算日報酬（休市日沿用前一日收盤，報酬為 0）"""
+    returns = closes.reindex(index).ffill().pct_change(fill_method=None)
+    benchmark_returns = benchmark.reindex(benchmark.index.union(index)).ffill() \
+        .reindex(index).pct_change(fill_method=None)
+    return returns, benchmark_returns
+
+
+def _window_sums(cumulative, window):
+    """由累積和（首列補 0）求每個位置往前 window 筆的和，不足 window 筆的位置為 NaN"""
+    sums = np.full((len(cumulative) - 1,) + cumulative.shape[1:], np.nan)
+    if window < len(cumulative):
+        sums[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return sums
+
+
+def rolling_relative_metrics(returns, benchmark_returns, windows=ROLLING_WINDOWS,
+                             min_fraction=0.8):
+    """計算各股票（或投資組合）相對基準的滾動 Beta、Alpha、追蹤誤差與資訊比率
+
+    returns 為日報酬 DataFrame（日期 × 名稱），benchmark_returns 為同索引的基準日報酬；
+    缺值的日子不列入計算，視窗內有效天數不足 min_fraction 時為 NaN。
+    Alpha 與追蹤誤差為年化百分比，資訊比率為年化超額報酬 / 追蹤誤差。
+    回傳 DataFrame，欄位為 (指標, 視窗, 名稱) 三層。
+    """
+    x = returns.to_numpy(dtype='float64')
+    b = np.broadcast_to(benchmark_returns.to_numpy(dtype='float64')[:, None], x.shape)
+    valid = ~np.isnan(x) & ~np.isnan(b)
+    x, b = np.where(valid, x, 0.0), np.where(valid, b, 0.0)
+
+    # 以全期平均值置中，降低累積和相減的數值誤差（共變異數不受平移影響）
+    count = np.maximum(valid.sum(axis=0), 1)
+    x_mean, b_mean = x.sum(axis=0) / count, b.sum(axis=0) / count
+    x, b = np.where(valid, x - x_mean, 0.0), np.where(valid, b - b_mean, 0.0)
+
+    zero = np.zeros((1, x.shape[1]))
+    cumulative = {name: np.concatenate([zero, np.cumsum(values, axis=0)])
+                  for name, values in [('n', valid.astype('float64')), ('x', x), ('b', b),
+                                       ('xx', x * x), ('bb', b * b), ('xb', x * b)]}
+
+    frames = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for window in windows:
+            s = {name: _window_sums(values, window) for name, values in cumulative.items()}
+            n = s['n']
+            enough = n >= max(2, min_fraction * window)
+            mean_x, mean_b = s['x'] / n, s['b'] / n
+            var_x = (s['xx'] - n * mean_x ** 2) / (n - 1)
+            var_b = (s['bb'] - n * mean_b ** 2) / (n - 1)
+            cov = (s['xb'] - n * mean_x * mean_b) / (n - 1)
+            beta = cov / var_b
+            # 還原置中前的平均值（x 與 b 皆減去了全期平均）
+            raw_x, raw_b = mean_x + x_mean, mean_b + b_mean
+            tracking = np.sqrt(np.maximum(var_x + var_b - 2 * cov, 0) * TRADING_DAYS)
+            values = {
+                'beta': beta,
+                'alpha': (raw_x - beta * raw_b) * TRADING_DAYS * 100,
+                'tracking_error': tracking * 100,
+                'information_ratio': (raw_x - raw_b) * TRADING_DAYS / tracking,
+            }
+            for metric, value in values.items():
+                value = np.where(enough & np.isfinite(value), value, np.nan)
+                frames[(metric, window)] = pd.DataFrame(value, index=returns.index,
+                                                        columns=returns.columns)
+
+    return pd.concat(frames, axis=1, names=['指標', '視窗', '名稱'])
+
+
+def relative_metrics(returns, benchmark_returns):
+    """全期間相對基準的 Beta、Alpha、追蹤誤差與資訊比率（回傳 {指標: Series}）"""
+    returns = returns.dropna(how='all')
+    if len(returns) < 2:
+        return {metric: pd.Series(np.nan, index=returns.columns) for metric in RELATIVE_METRICS}
+    full = rolling_relative_metrics(returns, benchmark_returns.reindex(returns.index),
+                                    windows=(len(returns),), min_fraction=0)
+    last = full.iloc[-1]
+    return {metric: last[metric][len(returns)] for metric in RELATIVE_METRICS}
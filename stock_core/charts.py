@@ -0,0 +1,606 @@
+"""K線、技術指標與籌碼圖表（matplotlib）
+
+master 為 None 時使用 Agg 畫布（批次報表、服務），傳入 Tk 容器時才載入 Tk 後端。
+"""
+import numpy as np
+
+from .indicators import compute_indicator
+from .intraday import INTRADAY_TIMEFRAMES
+from .lazy import LazyImport, configure_matplotlib
+from .market import TIMEFRAMES
+
+pd = LazyImport(globals(), 'pd', 'pandas')
+matplotlib = LazyImport(globals(), 'matplotlib', 'matplotlib', on_load=configure_matplotlib)
+mdates = LazyImport(globals(), 'mdates', 'matplotlib.dates', on_load=configure_matplotlib)
+Figure = LazyImport(globals(), 'Figure', 'matplotlib.figure', 'Figure', configure_matplotlib)
+LineCollection = LazyImport(globals(), 'LineCollection', 'matplotlib.collections',
+                            'LineCollection', configure_matplotlib)
+PolyCollection = LazyImport(globals(), 'PolyCollection', 'matplotlib.collections',
+                            'PolyCollection', configure_matplotlib)
+FuncFormatter = LazyImport(globals(), 'FuncFormatter', 'matplotlib.ticker', 'FuncFormatter',
+                           configure_matplotlib)
+MaxNLocator = LazyImport(globals(), 'MaxNLocator', 'matplotlib.ticker', 'MaxNLocator',
+                         configure_matplotlib)
+FigureCanvasAgg = LazyImport(globals(), 'FigureCanvasAgg', 'matplotlib.backends.backend_agg',
+                             'FigureCanvasAgg', configure_matplotlib)
+FigureCanvasTkAgg = LazyImport(globals(), 'FigureCanvasTkAgg', 'matplotlib.backends.backend_tkagg',
+                               'FigureCanvasTkAgg', configure_matplotlib)
+NavigationToolbar2Tk = LazyImport(globals(), 'NavigationToolbar2Tk',
+                                  'matplotlib.backends.backend_tkagg', 'NavigationToolbar2Tk',
+                                  configure_matplotlib)
+
+
+# K線漲跌顏色（台股紅漲綠跌）
+CANDLE_UP_COLOR = 'red'
+CANDLE_DOWN_COLOR = 'green'
+
+
+def candlestick_geometry(open_, high, low, close, x=None, width=0.6):
+    """以陣列計算K線實體矩形頂點、影線線段與漲跌顏色"""
+    open_ = np.asarray(open_, dtype='float64')
+    high = np.asarray(high, dtype='float64')
+    low = np.asarray(low, dtype='float64')
+    close = np.asarray(close, dtype='float64')
+    x = np.arange(len(close), dtype='float64') if x is None else np.asarray(x, dtype='float64')
+
+    left = x - width / 2
+    right = x + width / 2
+    bottom = np.minimum(open_, close)
+    top = np.maximum(open_, close)
+
+    # 實體：(N, 4, 2) 矩形頂點
+    bodies = np.stack([
+        np.column_stack([left, bottom]),
+        np.column_stack([left, top]),
+        np.column_stack([right, top]),
+        np.column_stack([right, bottom])
+    ], axis=1)
+    # 影線：(N, 2, 2) 由最低價到最高價的線段
+    wicks = np.stack([
+        np.column_stack([x, low]),
+        np.column_stack([x, high])
+    ], axis=1)
+
+    up = close >= open_
+    colors = np.where(up[:, None],
+                      matplotlib.colors.to_rgba(CANDLE_UP_COLOR),
+                      matplotlib.colors.to_rgba(CANDLE_DOWN_COLOR))
+    return bodies, wicks, colors
+
+
+def volume_geometry(volume, x=None, width=0.8, bottom=None):
+    """以陣列計算柱狀圖（成交量等）的矩形頂點，bottom 供堆疊柱狀圖使用"""
+    volume = np.nan_to_num(np.asarray(volume, dtype='float64'))
+    x = np.arange(len(volume), dtype='float64') if x is None else np.asarray(x, dtype='float64')
+    left = x - width / 2
+    right = x + width / 2
+    base = np.zeros_like(volume) if bottom is None else np.asarray(bottom, dtype='float64')
+    top = base + volume
+    return np.stack([
+        np.column_stack([left, base]),
+        np.column_stack([left, top]),
+        np.column_stack([right, top]),
+        np.column_stack([right, base])
+    ], axis=1)
+
+
+def draw_candlesticks(ax, df, x=None, width=0.6):
+    """以兩個集合物件（實體、影線）繪製整段K線，回傳 (實體, 影線)"""
+    bodies, wicks, colors = candlestick_geometry(
+        df['Open'], df['High'], df['Low'], df['Close'], x, width)
+    wick_collection = LineCollection(wicks, colors=colors, linewidths=1)
+    body_collection = PolyCollection(bodies, facecolors=colors, edgecolors=colors,
+                                     linewidths=0.5)
+    ax.add_collection(wick_collection)
+    ax.add_collection(body_collection)
+    ax.autoscale_view()
+    return body_collection, wick_collection
+
+
+def draw_volume_bars(ax, df, x=None, width=0.8, alpha=0.7):
+    """以單一集合物件繪製成交量柱狀圖，顏色依K線漲跌"""
+    colors = np.where((df['Close'].to_numpy() >= df['Open'].to_numpy())[:, None],
+                      matplotlib.colors.to_rgba(CANDLE_UP_COLOR, alpha),
+                      matplotlib.colors.to_rgba(CANDLE_DOWN_COLOR, alpha))
+    bars = PolyCollection(volume_geometry(df['Volume'], x, width),
+                          facecolors=colors, edgecolors=colors, linewidths=0.5)
+    bars.sticky_edges.y.append(0)  # 與 ax.bar 相同，Y 軸從 0 開始
+    ax.add_collection(bars)
+    ax.autoscale_view()
+    return bars
+
+
+# 降採樣設定：重繪成本只與畫布寬度有關，與資料長度無關
+CANDLE_MIN_PIXELS = 3  # 每根K棒至少佔用的像素，超過可容納數量時合併K棒
+LINE_POINTS_PER_PIXEL = 2  # 折線每個像素保留的點數
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets：挑選最能保留折線外形的 threshold 個點的索引"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # 首尾兩點固定保留，其餘分成 threshold - 2 個區間
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # 每個區間的平均點（作為下一個三角形的頂點）
+    counts = np.diff(np.append(edges, n))
+    avg_x = np.add.reduceat(x, edges) / counts
+    avg_y = np.add.reduceat(y, edges) / counts
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        # 與上一個選取點、下一區間平均點組成的三角形面積最大者
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[start:stop] - y[a]) -
+                      (x[a] - x[start:stop]) * (avg_y[i + 1] - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def visible_slice(x, xlim, margin=1):
+    """回傳遞增序列 x 在 xlim 範圍內（含前後 margin 點）的索引區間"""
+    lo = max(0, int(np.searchsorted(x, xlim[0], 'left')) - margin)
+    hi = min(len(x), int(np.searchsorted(x, xlim[1], 'right')) + margin)
+    return lo, hi
+
+
+def downsample_line(x, y, max_points):
+    """以 LTTB 將折線降至最多 max_points 點（略過缺值）"""
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    finite = np.isfinite(y)
+    if not finite.all():
+        x, y = x[finite], y[finite]
+    if len(x) <= max_points:
+        return x, y
+    indices = lttb_indices(x, y, max_points)
+    return x[indices], y[indices]
+
+
+def _bucket_starts(n, k, offset=0):
+    """每 k 筆一組的起始索引，組別以絕對位置對齊（平移時分組不會跳動）"""
+    first = (-offset) % k
+    starts = np.arange(first, n, k)
+    return starts if first == 0 else np.concatenate([[0], starts])
+
+
+def ohlc_buckets(open_, high, low, close, volume, x, max_bars, offset=0):
+    """K棒數超過 max_bars 時每 k 根合併為一根
+
+    開盤取第一根、收盤取最後一根、最高/最低取極值、成交量取平均（與未合併的K棒同一尺度）。
+    回傳 (open, high, low, close, volume, x, k)，x 為每組的中心位置。
+    """
+    n = len(close)
+    k = max(1, -(-n // max(1, max_bars)))
+    if k == 1 or n == 0:
+        return open_, high, low, close, volume, x, 1
+
+    starts = _bucket_starts(n, k, offset)
+    ends = np.append(starts[1:], n)
+    counts = ends - starts
+    return (open_[starts],
+            np.fmax.reduceat(high, starts),
+            np.fmin.reduceat(low, starts),
+            close[ends - 1],
+            np.add.reduceat(np.nan_to_num(volume), starts) / counts,
+            np.add.reduceat(x, starts) / counts,
+            k)
+
+
+def bucket_mean(values, x, max_bars, offset=0):
+    """柱狀圖資料超過 max_bars 時每 k 筆取平均，回傳 (values, x, k)"""
+    n = len(values)
+    k = max(1, -(-n // max(1, max_bars)))
+    if k == 1 or n == 0:
+        return values, x, 1
+    starts = _bucket_starts(n, k, offset)
+    counts = np.diff(np.append(starts, n))
+    return (np.add.reduceat(np.nan_to_num(values), starts) / counts,
+            np.add.reduceat(x, starts) / counts, k)
+
+
+class DownsampledLine:
+    """長序列折線：依座標軸寬度以 LTTB 取樣，縮放或平移時重新取樣可見範圍"""
+
+    def __init__(self, line, x=(), y=()):
+        self.line = line
+        self.x = np.asarray(x, dtype='float64')
+        self.y = np.asarray(y, dtype='float64')
+        line.axes.callbacks.connect('xlim_changed', lambda ax: self.refresh())
+        self.refresh()
+
+    def set_data(self, x, y):
+        self.x = np.asarray(x, dtype='float64')
+        self.y = np.asarray(y, dtype='float64')
+        self.refresh()
+
+    def refresh(self):
+        ax = self.line.axes
+        lo, hi = visible_slice(self.x, ax.get_xlim())
+        if hi - lo < 2:
+            # 座標範圍尚未設定（或與資料不重疊）時取全部資料
+            lo, hi = 0, len(self.x)
+        max_points = max(10, int(ax.bbox.width * LINE_POINTS_PER_PIXEL))
+        self.line.set_data(*downsample_line(self.x[lo:hi], self.y[lo:hi], max_points))
+
+
+def create_figure_canvas(fig, master=None, toolbar=False):
+    """建立圖表畫布：有 master 時嵌入 Tk 視窗，否則為無視窗的 Agg 畫布（批次輸出報表用）
+
+    toolbar 為 True 時加上 matplotlib 工具列（縮放、平移）。
+    """
+    if master is None:
+        return FigureCanvasAgg(fig)
+    canvas = FigureCanvasTkAgg(fig, master=master)
+    if toolbar:
+        # 工具列需先放置，避免視窗縮小時被畫布擠掉
+        NavigationToolbar2Tk(canvas, master, pack_toolbar=False).pack(side='bottom', fill='x')
+    canvas.get_tk_widget().pack(fill='both', expand=True)
+    return canvas
+
+
+class PriceChart:
+    """主畫面K線圖：圖表與畫布只建立一次，之後直接替換資料
+
+    歷史K棒為靜態圖層；最後一根（盤中）K棒、均線與現價線設為 animated，
+    每分鐘更新時只以 blit 重繪這些物件，不重畫整張圖。
+    """
+
+    MA_PERIODS = {5: 'blue', 20: 'orange', 60: 'purple'}
+
+    def __init__(self, master=None):
+        # master 為 None 時為無視窗模式（批次報表），所有物件都是一般圖層
+        live = master is not None
+
+        # 設置全局字型大小
+        matplotlib.rcParams['font.size'] = 10  # 基本字型大小
+        matplotlib.rcParams['axes.titlesize'] = 10  # 標題字型大小
+        matplotlib.rcParams['axes.labelsize'] = 10  # 軸標籤字型大小
+        matplotlib.rcParams['xtick.labelsize'] = 10  # X軸刻度字型大小
+        matplotlib.rcParams['ytick.labelsize'] = 10  # Y軸刻度字型大小
+        matplotlib.rcParams['legend.fontsize'] = 10  # 圖例字型大小
+
+        self.fig = Figure(figsize=(10, 6))
+        self.ax_price = self.fig.add_subplot(211)
+        self.ax_volume = self.fig.add_subplot(212, sharex=self.ax_price)
+
+        # 歷史K棒（靜態）
+        self.bodies = PolyCollection([], linewidths=0.5)
+        self.wicks = LineCollection([], linewidths=1)
+        self.volume = PolyCollection([], linewidths=0.5)
+        self.ax_price.add_collection(self.wicks)
+        self.ax_price.add_collection(self.bodies)
+        self.ax_volume.add_collection(self.volume)
+
+        # 最後一根K棒與均線、現價線（blit 圖層）
+        self.live_body = PolyCollection([], linewidths=0.5, animated=live)
+        self.live_wick = LineCollection([], linewidths=1, animated=live)
+        self.live_volume = PolyCollection([], linewidths=0.5, animated=live)
+        self.ax_price.add_collection(self.live_wick)
+        self.ax_price.add_collection(self.live_body)
+        self.ax_volume.add_collection(self.live_volume)
+        self.ma_lines = {
+            period: DownsampledLine(self.ax_price.plot([], [], label=f'MA{period}', color=color,
+                                                       linewidth=1, animated=live)[0])
+            for period, color in self.MA_PERIODS.items()
+        }
+        self.price_line = self.ax_price.axhline(
+            np.nan, color='gray', linestyle='--', linewidth=0.8, animated=live)
+        self.animated = [self.live_wick, self.live_body, self.live_volume,
+                         *(ma.line for ma in self.ma_lines.values()), self.price_line]
+
+        self.ax_price.set_ylabel('股價', fontsize=12)
+        self.ax_price.grid(True)
+        self.ax_price.legend(loc='upper left', fontsize=10)
+        self.ax_volume.set_title('成交量', pad=15, fontsize=14)
+        self.ax_volume.set_ylabel('股數', fontsize=12)
+        self.ax_volume.grid(True)
+        # 調整布局，增加子圖之間的間距
+        self.fig.subplots_adjust(hspace=0.3)
+
+        self.canvas = create_figure_canvas(self.fig, master, toolbar=live)
+        if live:
+            self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.background = None
+        self.key = None  # (代號, 週期, K棒數, 倒數第二根K棒日期)
+        self.df = None
+        self.updating = False
+
+        # 縮放、平移或調整視窗大小時，依新的可見範圍重新合併K棒
+        self.ax_price.callbacks.connect('xlim_changed', self._on_view_changed)
+        self.canvas.mpl_connect('resize_event', self._on_view_changed)
+
+    def _on_draw(self, event):
+        """整張圖重繪後保存背景，並疊上 animated 物件"""
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in self.animated:
+            artist.axes.draw_artist(artist)
+
+    def _blit(self):
+        """只重繪 animated 物件"""
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_animated()
+        self.canvas.blit(self.fig.bbox)
+
+    def _set_live(self, df):
+        """更新最後一根K棒、均線與現價線"""
+        n = len(df)
+        last = df.iloc[-1:]
+        bodies, wicks, colors = candlestick_geometry(
+            last['Open'], last['High'], last['Low'], last['Close'], x=[n - 1])
+        self.live_body.set_verts(bodies)
+        self.live_body.set_facecolor(colors)
+        self.live_body.set_edgecolor(colors)
+        self.live_wick.set_segments(wicks)
+        self.live_wick.set_color(colors)
+        self.live_volume.set_verts(volume_geometry(last['Volume'], x=[n - 1]))
+        self.live_volume.set_facecolor(colors * [1, 1, 1, 0.7])
+        self.live_volume.set_edgecolor(colors * [1, 1, 1, 0.7])
+
+        x = np.arange(n)
+        for period, ma in self.ma_lines.items():
+            ma.set_data(x, df['Close'].rolling(window=period).mean().to_numpy())
+        close = last['Close'].iloc[0]
+        self.price_line.set_ydata([close, close])
+
+    def _draw_history(self):
+        """繪製可見範圍內的歷史K棒（不含最後一根），數量超過畫布可容納時合併"""
+        n = len(self.df) - 1
+        left, right = self.ax_price.get_xlim()
+        lo = int(min(max(0, np.floor(left)), n))
+        hi = int(min(n, max(lo, np.ceil(right) + 1)))
+        history = self.df.iloc[lo:hi]
+        max_bars = max(10, int(self.ax_price.bbox.width / CANDLE_MIN_PIXELS))
+        open_, high, low, close, volume, x, k = ohlc_buckets(
+            history['Open'].to_numpy(), history['High'].to_numpy(),
+            history['Low'].to_numpy(), history['Close'].to_numpy(),
+            history['Volume'].to_numpy(dtype='float64'),
+            np.arange(lo, hi, dtype='float64'), max_bars, offset=lo)
+
+        bodies, wicks, colors = candlestick_geometry(open_, high, low, close, x=x,
+                                                     width=0.6 * k)
+        self.bodies.set_verts(bodies)
+        self.bodies.set_facecolor(colors)
+        self.bodies.set_edgecolor(colors)
+        self.wicks.set_segments(wicks)
+        self.wicks.set_color(colors)
+        self.volume.set_verts(volume_geometry(volume, x, width=0.8 * k))
+        self.volume.set_facecolor(colors * [1, 1, 1, 0.7])
+        self.volume.set_edgecolor(colors * [1, 1, 1, 0.7])
+
+    def _on_view_changed(self, event):
+        """縮放、平移後重新取樣；整張圖重繪時會一併更新 blit 背景"""
+        if self.df is not None and not self.updating:
+            self._draw_history()
+
+    def _live_fits(self, df):
+        """最後一根K棒是否仍在目前座標範圍內（超出時需整張重繪）"""
+        low, high = self.ax_price.get_ylim()
+        last = df.iloc[-1]
+        return (low <= last['Low'] and last['High'] <= high and
+                last['Volume'] <= self.ax_volume.get_ylim()[1])
+
+    def update(self, df, stock_code, timeframe):
+        """更新K線資料；只有最後一根K棒變動時以 blit 局部重繪"""
+        key = (stock_code, timeframe, len(df), df.index[-2] if len(df) > 1 else None)
+        if key == self.key and self._live_fits(df):
+            self._set_live(df)
+            self._blit()
+            return
+        self.key = key
+        self.df = df
+
+        # 座標範圍（先設定範圍，歷史K棒依可見範圍繪製）
+        n = len(df)
+        low = np.nanmin(df['Low'].to_numpy())
+        high = np.nanmax(df['High'].to_numpy())
+        pad = (high - low) * 0.05 or 1
+        self.updating = True
+        try:
+            self.ax_price.set_xlim(-1, n)
+        finally:
+            self.updating = False
+        self.ax_price.set_ylim(low - pad, high + pad)
+        self.ax_volume.set_ylim(0, (np.nanmax(df['Volume'].to_numpy()) or 1) * 1.05)
+        self._draw_history()
+        self._set_live(df)
+
+        # 設置x軸為日期（刻度依可見範圍自動調整，數量固定）
+        date_format = ('%Y/%m' if timeframe == "M" else
+                       '%H:%M' if timeframe in INTRADAY_TIMEFRAMES.values() else '%m/%d')
+        dates = df.index
+        self.ax_volume.xaxis.set_major_locator(MaxNLocator(nbins=10, integer=True))
+        self.ax_volume.xaxis.set_major_formatter(FuncFormatter(
+            lambda value, pos: dates[int(value)].strftime(date_format)
+            if 0 <= int(value) < len(dates) else ''))
+
+        timeframe_name = next(
+            name for name, code in {**TIMEFRAMES, **INTRADAY_TIMEFRAMES}.items()
+            if code == timeframe)
+        self.ax_price.set_title(f'{stock_code} 技術分析圖（{timeframe_name}）',
+                                pad=15, fontsize=14)
+        self.canvas.draw_idle()
+
+
+class TechnicalChart:
+    """技術指標圖表：勾選的指標不變時直接更新線條與柱狀圖資料，不重建圖表"""
+
+    def __init__(self, master=None):
+        self.fig = Figure(figsize=(12, 6))
+        self.canvas = create_figure_canvas(self.fig, master, toolbar=master is not None)
+        self.layout = None   # 目前圖表上的指標順序
+        self.panels = {}     # 指標 -> (ax, 線條清單, 柱狀圖集合)
+        self.x = np.array([])
+        self.bar_values = {}  # 指標 -> 完整柱狀圖資料（縮放時重新取樣用）
+        self.bar_width = 0.8
+
+    def _build(self, data):
+        """依勾選的指標重建子圖"""
+        self.fig.clear()
+        self.panels = {}
+        for i, (indicator, item) in enumerate(data.items()):
+            ax = self.fig.add_subplot(len(data), 1, i + 1)
+            ax.xaxis_date()
+            lines = [DownsampledLine(ax.plot([], [], label=label, **style)[0])
+                     for label, _, style in item['lines']]
+            bars = None
+            if item['bars'] is not None:
+                label, _, style = item['bars']
+                bars = PolyCollection([], label=label, facecolors=style['color'],
+                                      edgecolors=style['color'], alpha=style['alpha'])
+                ax.add_collection(bars)
+            for y, color in item['hlines']:
+                ax.axhline(y=y, color=color, linestyle='--')
+            ax.set_title(item['title'])
+            ax.grid(True)
+            # 固定圖例位置：'best' 每次重繪都要掃描所有資料點
+            ax.legend(loc='upper left')
+            if bars is not None:
+                # 縮放、平移時依可見範圍重新合併柱狀圖
+                ax.callbacks.connect('xlim_changed',
+                                     lambda ax, ind=indicator: self._draw_bars(ind))
+            self.panels[indicator] = (ax, lines, bars)
+
+    def _draw_bars(self, indicator):
+        """繪製可見範圍內的柱狀圖，數量超過畫布可容納時每組取平均"""
+        ax, _, bars = self.panels[indicator]
+        values = self.bar_values.get(indicator)
+        if values is None or not len(self.x):
+            return
+        lo, hi = visible_slice(self.x, ax.get_xlim())
+        max_bars = max(10, int(ax.bbox.width / CANDLE_MIN_PIXELS))
+        bar_values, x, k = bucket_mean(values[lo:hi], self.x[lo:hi], max_bars, offset=lo)
+        bars.set_verts(volume_geometry(bar_values, x, self.bar_width * k))
+
+    def update(self, df, selected):
+        """更新圖表；selected 為依序勾選的指標代碼"""
+        x = mdates.date2num(df.index)
+        width = 0.8 * float(np.median(np.diff(x))) if len(x) > 1 else 0.8
+        cache = {}
+        data = {indicator: compute_indicator(indicator, df, cache)
+                for indicator in selected}
+
+        layout_changed = tuple(selected) != self.layout
+        if layout_changed:
+            self._build(data)
+            self.layout = tuple(selected)
+
+        self.x, self.bar_width = x, width
+        self.bar_values = {}
+        for indicator, item in data.items():
+            ax, lines, bars = self.panels[indicator]
+            values = [values for _, values, _ in item['lines']]
+            for line, line_values in zip(lines, values):
+                line.set_data(x, line_values)
+            if bars is not None:
+                bar_values = item['bars'][1]
+                self.bar_values[indicator] = bar_values
+                values.append(bar_values)
+                values.append(np.zeros(1))
+
+            # 依資料設定座標範圍（集合物件不會自動納入 relim）
+            stacked = np.concatenate(values + [np.asarray([y for y, _ in item['hlines']],
+                                                          dtype='float64')])
+            finite = stacked[np.isfinite(stacked)]
+            if len(finite) and len(x):
+                low, high = finite.min(), finite.max()
+                pad = (high - low) * 0.05 or 1
+                ax.set_ylim(low - pad, high + pad)
+                ax.set_xlim(x[0] - width, x[-1] + width)
+            if bars is not None:
+                self._draw_bars(indicator)
+
+        if layout_changed and data:
+            self.fig.tight_layout()
+        self.canvas.draw_idle()
+
+
+class ChipChart:
+    """籌碼變化圖表：三大法人、融資融券與股權分散，更新時直接替換資料"""
+
+    INSTITUTION_COLORS = [('外資', 'red'), ('投信', 'green'), ('自營商', 'blue')]
+    PIE_COLORS = ['red', 'green', 'blue', 'gray', 'orange', 'purple', 'yellow', 'pink']
+
+    def __init__(self, master=None):
+        # 設置全局字型
+        matplotlib.rcParams['font.size'] = 10
+
+        self.fig = Figure(figsize=(10, 8))
+        self.ax_inst = self.fig.add_subplot(311)
+        self.ax_margin = self.fig.add_subplot(312)
+        self.ax_dist = self.fig.add_subplot(313)
+
+        # 三大法人買賣超（堆疊柱狀圖）
+        self.inst_bars = []
+        for label, color in self.INSTITUTION_COLORS:
+            bars = PolyCollection([], label=label, facecolors=color,
+                                  edgecolors=color, alpha=0.7)
+            self.ax_inst.add_collection(bars)
+            self.inst_bars.append(bars)
+        self.ax_inst.xaxis_date()
+        self.ax_inst.set_title('三大法人買賣超')
+        self.ax_inst.legend()
+        self.ax_inst.grid(True)
+
+        # 融資融券餘額
+        self.margin_line = self.ax_margin.plot(
+            [], [], label='融資餘額', color='red', marker='o')[0]
+        self.short_line = self.ax_margin.plot(
+            [], [], label='融券餘額', color='green', marker='o')[0]
+        self.ax_margin.xaxis_date()
+        self.ax_margin.set_title('融資融券餘額')
+        self.ax_margin.legend()
+        self.ax_margin.grid(True)
+
+        self.canvas = create_figure_canvas(self.fig, master)
+        self.laid_out = False
+
+    def update(self, dates, foreign, trust, dealer, margin, short, distribution):
+        """更新籌碼資料；distribution 為 {級距或身分: 數值}"""
+        x = mdates.date2num(pd.DatetimeIndex(dates))
+        width = 0.8 * float(np.min(np.diff(x))) if len(x) > 1 else 0.8
+
+        # 三大法人：依序堆疊
+        bottom = np.zeros(len(x))
+        low, high = 0.0, 0.0
+        for bars, values in zip(self.inst_bars, (foreign, trust, dealer)):
+            values = np.nan_to_num(np.asarray(values, dtype='float64'))
+            bars.set_verts(volume_geometry(values, x, width, bottom))
+            bottom = bottom + values
+            if len(x):
+                low, high = min(low, bottom.min()), max(high, bottom.max())
+        if len(x):
+            pad = (high - low) * 0.05 or 1
+            self.ax_inst.set_xlim(x[0] - width, x[-1] + width)
+            self.ax_inst.set_ylim(low - pad if low < 0 else 0, high + pad)
+
+        self.margin_line.set_data(x, np.asarray(margin, dtype='float64'))
+        self.short_line.set_data(x, np.asarray(short, dtype='float64'))
+        self.ax_margin.relim()
+        self.ax_margin.autoscale_view()
+
+        # 圓餅圖無法直接替換資料，只重畫此子圖
+        self.ax_dist.clear()
+        if distribution:
+            self.ax_dist.pie(list(distribution.values()),
+                             labels=list(distribution.keys()),
+                             autopct='%1.1f%%',
+                             colors=self.PIE_COLORS[:len(distribution)])
+        self.ax_dist.set_title('股權分散')
+
+        # 調整布局（只需第一次）
+        if not self.laid_out:
+            self.fig.tight_layout()
+            self.laid_out = True
+        self.canvas.draw_idle()
@@ -0,0 +1,213 @@
+"""命令列批次模式：不需顯示器即可輸出持股、個股歷史、績效與技術指標快照（JSON 或 CSV）
+
+使用方式：
+    python -m stock_core holdings [--prices]
+    python -m stock_core history 2330 0050
+    python -m stock_core metrics [2330 ...]
+    python -m stock_core indicators [2330 ...] [--timeframe D|W|M]
+    python -m stock_core report [--output-dir reports]
+    python -m stock_core serve [--port 8765] [--replay ohlcv_cache]
+
+共用選項：--format json|csv、--output 檔案（預設輸出到螢幕）、--ledger 交易紀錄檔、
+--workers 同時處理的股票數。未指定股票代號時使用目前持股加自選股。
+"""
+import argparse
+import json
+import math
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import ledger
+from .indicators import latest_indicators
+from .lazy import LazyImport
+from .ledger import (calculate_performance_metrics, get_stock_history, get_stock_holdings,
+                     load_original_trades)
+from .market import TIMEFRAMES, get_bars
+from .reports import REPORT_DIR, get_report_symbols, run_batch_reports
+
+pd = LazyImport(globals(), 'pd', 'pandas')
+
+CLI_WORKERS = 8  # 同時下載/計算的股票數（下載為網路 I/O，以執行緒平行）
+
+
+def map_symbols(func, stock_codes, workers=None):
+    """以執行緒平行處理每檔股票，回傳 [(代號, 結果, 錯誤訊息)]（依輸入順序）
+
+    同一程序內的執行緒共用日K快取，重複的代號只會下載一次。
+    """
+    def run(code):
+        try:
+            return code, func(code), ''
+        except Exception as e:
+            print(f"處理 {code} 時出錯：{str(e)}", file=sys.stderr)
+            return code, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=workers or CLI_WORKERS) as executor:
+        return list(executor.map(run, stock_codes))
+
+
+def latest_close(stock_code):
+    """最新日K收盤價（無資料時為 None）"""
+    bars = get_bars(stock_code, "D")
+    return float(bars['Close'].iloc[-1]) if not bars.empty else None
+
+
+def holdings_snapshot(trades, with_prices=False, workers=None, price_func=latest_close):
+    """目前持股；with_prices 時以 price_func 取得最新價格，加上市值與未實現損益"""
+    holdings = get_stock_holdings(trades)
+    rows = [{'代號': str(code), **holding} for code, holding in holdings.items()]
+    if with_prices:
+        prices = map_symbols(price_func, [row['代號'] for row in rows], workers)
+        for row, (_, price, _) in zip(rows, prices):
+            row['price'] = price
+            row['market_value'] = price * row['shares'] if price is not None else None
+            row['unrealized_pnl'] = ((price - row['avg_cost']) * row['shares']
+                                     if price is not None else None)
+    return rows
+
+
+def history_snapshot(trades, stock_codes, workers=None):
+    """各股票逐筆交易明細與匯總"""
+    def history(code):
+        records, summary = get_stock_history(code, trades)
+        return {'匯總': summary, '明細': records.to_dict('records')}
+
+    return [{'代號': code, **(result or {'匯總': {}, '明細': []}), '錯誤': error}
+            for code, result, error in map_symbols(history, stock_codes, workers)]
+
+
+def metrics_snapshot(trades, stock_codes=None, workers=None):
+    """績效指標：未指定股票時計算全部交易，否則逐檔計算"""
+    if not stock_codes:
+        return [{'代號': '全部', **calculate_performance_metrics(trades=trades)}]
+    results = map_symbols(lambda code: calculate_performance_metrics(int(code), trades),
+                          stock_codes, workers)
+    return [{'代號': code, **(metrics or {}), '錯誤': error}
+            for code, metrics, error in results]
+
+
+def indicators_snapshot(stock_codes, timeframe="D", workers=None):
+    """各股票最新一根K棒的技術指標"""
+    results = map_symbols(lambda code: latest_indicators(get_bars(code, timeframe)),
+                          stock_codes, workers)
+    return [{'代號': code, **(values or {}), '錯誤': error}
+            for code, values, error in results]
+
+
+def to_jsonable(value):
+    """轉為 JSON 可表示的值：NumPy 純量轉為 Python 數值，NaN/無限大轉為 null"""
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def write_rows(rows, fmt="json", output=None):
+    """輸出結果：JSON 為原始結構；CSV 時巢狀的明細展開成每筆一列"""
+    if fmt == "csv":
+        flat = []
+        for row in rows:
+            if '明細' in row:
+                flat.extend({'代號': row['代號'], **record} for record in row['明細'])
+            else:
+                flat.append(row)
+        text = pd.DataFrame(flat).to_csv(index=False)
+    else:
+        text = json.dumps(to_jsonable(rows), ensure_ascii=False, indent=2) + "\n"
+
+    if output:
+        with open(output, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+def build_parser():
+    """建立命令列參數解析器"""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--format', choices=['json', 'csv'], default='json', help="輸出格式")
+    common.add_argument('--output', help="輸出檔案（預設輸出到螢幕）")
+    common.add_argument('--ledger', help="交易紀錄檔（預設 stock_trades-original.csv）")
+    common.add_argument('--workers', type=int, help=f"同時處理的股票數（預設 {CLI_WORKERS}）")
+
+    parser = argparse.ArgumentParser(prog="stock_core", description="股票交易批次輸出")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    holdings = commands.add_parser('holdings', parents=[common], help="目前持股")
+    holdings.add_argument('--prices', action='store_true', help="加上最新收盤價與未實現損益")
+
+    history = commands.add_parser('history', parents=[common], help="個股歷史交易記錄")
+    history.add_argument('symbols', nargs='*', help="股票代號")
+
+    metrics = commands.add_parser('metrics', parents=[common], help="績效指標")
+    metrics.add_argument('symbols', nargs='*', help="股票代號（未指定時計算全部交易）")
+
+    indicators = commands.add_parser('indicators', parents=[common], help="最新技術指標")
+    indicators.add_argument('symbols', nargs='*', help="股票代號")
+    indicators.add_argument('--timeframe', choices=sorted(set(TIMEFRAMES.values())), default='D',
+                            help="K線週期")
+
+    report = commands.add_parser('report', help="批次輸出 PNG/HTML 報表")
+    report.add_argument('symbols', nargs='*', help="股票代號")
+    report.add_argument('--output-dir', help="報表輸出目錄")
+    report.add_argument('--timeframe', choices=sorted(set(TIMEFRAMES.values())), default='D',
+                        help="K線週期")
+    report.add_argument('--ledger', help="交易紀錄檔（預設 stock_trades-original.csv）")
+    report.add_argument('--workers', type=int, help="報表程序數（預設為 CPU 數）")
+
+    serve = commands.add_parser('serve', help="啟動本機 HTTP 報價與投資組合服務")
+    serve.add_argument('--host', default='127.0.0.1', help="監聽位址")
+    serve.add_argument('--port', type=int, default=8765, help="監聽埠號")
+    serve.add_argument('--replay', help="離線重播：錄製的日K目錄（<代碼>.csv），不連網")
+    serve.add_argument('--latency', type=float, default=0.0, help="重播時模擬的上游延遲（秒）")
+    serve.add_argument('--ledger', help="交易紀錄檔（預設 stock_trades-original.csv）")
+    return parser
+
+
+def main(argv=None):
+    """命令列進入點，回傳結束代碼（有股票處理失敗時為 1）"""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv[:1] == ['--report']:
+        # 舊版用法：--report [輸出目錄]
+        argv = ['report'] + (['--output-dir', argv[1]] if len(argv) > 1 else [])
+    args = build_parser().parse_args(argv)
+
+    if args.ledger and not os.path.exists(args.ledger):
+        print(f"找不到交易紀錄檔：{args.ledger}", file=sys.stderr)
+        return 2
+
+    if args.command == 'serve':
+        # service 模組會匯入本模組，在此才匯入以避免循環匯入
+        from .service import serve
+        serve(args.host, args.port, args.replay, args.latency, args.ledger)
+        return 0
+
+    trades = load_original_trades(args.ledger)
+    symbols = getattr(args, 'symbols', None) or get_report_symbols(trades)
+
+    if args.command == 'report':
+        if args.ledger:
+            ledger.ORIGINAL_FILE_NAME = args.ledger  # 報表子程序沿用同一個交易紀錄檔
+        results = run_batch_reports(symbols, args.output_dir or REPORT_DIR, args.timeframe,
+                                    args.workers)
+        return 1 if (results['錯誤'] != '').any() else 0
+
+    if args.command == 'holdings':
+        rows = holdings_snapshot(trades, args.prices, args.workers)
+    elif args.command == 'history':
+        rows = history_snapshot(trades, symbols, args.workers)
+    elif args.command == 'metrics':
+        rows = metrics_snapshot(trades, args.symbols, args.workers)
+    else:
+        rows = indicators_snapshot(symbols, args.timeframe, args.workers)
+
+    write_rows(rows, args.format, args.output)
+    return 1 if any(row.get('錯誤') for row in rows) else 0
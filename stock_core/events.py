@@ -0,0 +1,121 @@
+"""程式內事件匯流排：報價更新、K棒更新、交易紀錄變動與切換股票
+
+各頁面訂閱需要的事件型別，只重算事件影響到的部分；短時間內發布的多個事件會合併，
+在同一次排程中依序分派（例如一輪即時報價更新多檔股票只分派一次 QuoteUpdated）。
+排程由呼叫端提供（視窗程式傳入 root.after），未提供時發布即分派；本模組不依賴 tkinter。
+"""
+from collections import namedtuple
+
+EVENT_FLUSH_MS = 50  # 事件合併的等待時間（毫秒）
+
+
+class QuoteUpdated(namedtuple('QuoteUpdated', ['codes'])):
+    """即時報價表中有股票更新（codes 為代號 frozenset）"""
+    __slots__ = ()
+
+    def key(self):
+        return ()
+
+    def merge(self, other):
+        return QuoteUpdated(self.codes | other.codes)
+
+
+class BarsUpdated(namedtuple('BarsUpdated', ['codes', 'timeframes'])):
+    """K棒更新（codes 為代號 frozenset，timeframes 為週期代碼 frozenset）"""
+    __slots__ = ()
+
+    def key(self):
+        return ()
+
+    def merge(self, other):
+        return BarsUpdated(self.codes | other.codes, self.timeframes | other.timeframes)
+
+
+class LedgerChanged(namedtuple('LedgerChanged', ['path'])):
+    """交易紀錄檔已寫入"""
+    __slots__ = ()
+
+    def key(self):
+        return (self.path,)
+
+    def merge(self, other):
+        return other
+
+
+class SymbolSelected(namedtuple('SymbolSelected', ['code'])):
+    """使用者切換目前查看的股票（同一批中只保留最後一次）"""
+    __slots__ = ()
+
+    def key(self):
+        return ()
+
+    def merge(self, other):
+        return other
+
+
+class EventBus:
+    """型別化的發布/訂閱：訂閱者依事件型別登記，同一批中相同 key 的事件以 merge 合併
+
+    call_later(毫秒, 函式) 用於排程合併後的分派；handler 出錯不影響其他訂閱者。
+    """
+
+    def __init__(self, call_later=None, delay=EVENT_FLUSH_MS):
+        self.call_later = call_later
+        self.delay = delay
+        self._handlers = {}   # 事件型別 -> handler 列表
+        self._pending = {}    # (事件型別, key) -> 合併後的事件（保持發布順序）
+        self._scheduled = False
+        self._latest = {}     # 事件型別 -> 最後分派的事件
+        self.stats = {'published': 0, 'coalesced': 0, 'flushes': 0, 'dispatched': 0}
+
+    def subscribe(self, event_type, handler, replay=False):
+        """訂閱事件型別；replay 時若已分派過此型別的事件，立即以最後一次事件呼叫 handler"""
+        self._handlers.setdefault(event_type, []).append(handler)
+        if replay and event_type in self._latest:
+            self._call(handler, self._latest[event_type])
+        return handler
+
+    def unsubscribe(self, event_type, handler):
+        """取消訂閱"""
+        handlers = self._handlers.get(event_type, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    def latest(self, event_type):
+        """最後分派的此型別事件（尚未分派過時為 None）"""
+        return self._latest.get(event_type)
+
+    def publish(self, event):
+        """發布事件：與同一批中相同型別與 key 的事件合併，等到排程時一起分派"""
+        self.stats['published'] += 1
+        slot = (type(event), event.key())
+        if slot in self._pending:
+            self._pending[slot] = self._pending[slot].merge(event)
+            self.stats['coalesced'] += 1
+        else:
+            self._pending[slot] = event
+
+        if self.call_later is None:
+            self.flush()
+        elif not self._scheduled:
+            self._scheduled = True
+            self.call_later(self.delay, self.flush)
+
+    def flush(self):
+        """分派所有待處理事件（分派期間新發布的事件留待下一批）"""
+        self._scheduled = False
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        self.stats['flushes'] += 1
+        for (event_type, _), event in pending.items():
+            self._latest[event_type] = event
+            for handler in list(self._handlers.get(event_type, [])):
+                self._call(handler, event)
+
+    def _call(self, handler, event):
+        self.stats['dispatched'] += 1
+        try:
+            handler(event)
+        except Exception as e:
+            print(f"處理 {type(event).__name__} 事件時出錯：{str(e)}")
@@ -0,0 +1,279 @@
+"""技術指標：KD、RSI、MACD、布林通道、OBV、威廉指標與滾動最高/最低價"""
+import numpy as np
+
+from .lazy import LazyImport
+
+pd = LazyImport(globals(), 'pd', 'pandas')
+
+
+def compute_indicator(indicator, df, cache=None):
+    """計算單一技術指標的繪圖資料
+
+    回傳 {'title': 標題, 'lines': [(標籤, 數值, 樣式)], 'bars': (標籤, 數值, 樣式) 或 None,
+    'hlines': [(y, 顏色)]}；cache 讓同一視窗的滾動最高/最低價只計算一次。
+    """
+    close = df['Close']
+    lines, bars, hlines = [], None, []
+
+    if indicator == 'kd':
+        title = 'KD指標'
+        k, d = calculate_kd(df, cache=cache)
+        lines = [('K值', k, {'color': 'blue'}), ('D值', d, {'color': 'orange'})]
+    elif indicator == 'rsi':
+        title = 'RSI指標'
+        lines = [('RSI', calculate_rsi(df), {'color': 'purple'})]
+        hlines = [(70, 'r'), (30, 'g')]
+    elif indicator == 'macd':
+        title = 'MACD指標'
+        macd, signal_line, hist = calculate_macd(df)
+        lines = [('MACD', macd, {'color': 'blue'}),
+                 ('Signal', signal_line, {'color': 'orange'})]
+        bars = ('Histogram', hist, {'color': 'gray', 'alpha': 0.3})
+    elif indicator == 'bollinger':
+        title = '布林通道'
+        middle, upper, lower = calculate_bollinger_bands(df)
+        lines = [('收盤價', close, {'color': 'black'}),
+                 ('上軌', upper, {'color': 'red'}),
+                 ('中軌', middle, {'color': 'blue'}),
+                 ('下軌', lower, {'color': 'green'})]
+    elif indicator == 'ma':
+        title = '移動平均線'
+        lines = [('收盤價', close, {'color': 'black', 'alpha': 0.5}),
+                 ('MA5', close.rolling(window=5).mean(), {'color': 'blue'}),
+                 ('MA20', close.rolling(window=20).mean(), {'color': 'orange'}),
+                 ('MA60', close.rolling(window=60).mean(), {'color': 'red'})]
+    elif indicator == 'volume':
+        title = '成交量'
+        bars = ('成交量', df['Volume'], {'color': 'gray', 'alpha': 0.5})
+    elif indicator == 'obv':
+        title = 'OBV指標'
+        lines = [('OBV', calculate_obv(df), {'color': 'purple'})]
+    elif indicator == 'williams':
+        title = '威廉指標'
+        lines = [('Williams %R', calculate_williams_r(df, cache=cache), {'color': 'blue'})]
+        hlines = [(-20, 'r'), (-80, 'g')]
+    else:
+        raise ValueError(f"未知的技術指標：{indicator}")
+
+    return {
+        'title': title,
+        'lines': [(label, np.asarray(values, dtype='float64'), style)
+                  for label, values, style in lines],
+        'bars': None if bars is None else
+        (bars[0], np.asarray(bars[1], dtype='float64'), bars[2]),
+        'hlines': hlines
+    }
+
+
+def _rolling_extrema_kernel(high, low, n, out_max, out_min):
+    """單調佇列計算 n 期滾動最高/最低，攤銷 O(n)（可由 numba 編譯）"""
+    size = high.shape[0]
+    # 以陣列實作佇列，每個索引最多進出一次
+    max_q = np.empty(size, np.int64)
+    min_q = np.empty(size, np.int64)
+    max_head = 0
+    max_tail = 0
+    min_head = 0
+    min_tail = 0
+    last_nan_high = -1
+    last_nan_low = -1
+
+    for i in range(size):
+        h = high[i]
+        if np.isnan(h):
+            last_nan_high = i
+        else:
+            while max_tail > max_head and high[max_q[max_tail - 1]] <= h:
+                max_tail -= 1
+            max_q[max_tail] = i
+            max_tail += 1
+
+        l = low[i]
+        if np.isnan(l):
+            last_nan_low = i
+        else:
+            while min_tail > min_head and low[min_q[min_tail - 1]] >= l:
+                min_tail -= 1
+            min_q[min_tail] = i
+            min_tail += 1
+
+        # 移除已離開視窗的索引
+        while max_tail > max_head and max_q[max_head] <= i - n:
+            max_head += 1
+        while min_tail > min_head and min_q[min_head] <= i - n:
+            min_head += 1
+
+        # 與 pandas rolling 相同：視窗未滿或含缺值時為 NaN
+        if i < n - 1 or last_nan_high > i - n:
+            out_max[i] = np.nan
+        else:
+            out_max[i] = high[max_q[max_head]]
+        if i < n - 1 or last_nan_low > i - n:
+            out_min[i] = np.nan
+        else:
+            out_min[i] = low[min_q[min_head]]
+
+
+_extrema_kernel = None  # numba 編譯的單調佇列（False 表示未安裝 numba）
+
+
+def _get_extrema_kernel():
+    """第一次計算時才載入 numba（選用套件），未安裝時回傳 None"""
+    global _extrema_kernel
+    if _extrema_kernel is None:
+        try:
+            from numba import njit
+            _extrema_kernel = njit(cache=True)(_rolling_extrema_kernel)
+        except ImportError:
+            _extrema_kernel = False
+    return _extrema_kernel or None
+
+
+def _block_extrema(values, n, ufunc, pad):
+    """將序列切成長度 n 的區塊，以區塊內前綴與後綴累積極值求各視窗極值
+
+    視窗 [i-n+1, i] 最多跨兩個區塊，極值為 ufunc(後綴[i-n+1], 前綴[i])；
+    缺值會沿累積傳遞，與 pandas rolling 相同，視窗含缺值時為 NaN。
+    """
+    size = values.shape[0]
+    blocks = -(-size // n)
+    # 以 ±inf 補齊最後一個區塊（補值不影響任何有效視窗）
+    padded = np.full((blocks * n,) + values.shape[1:], pad)
+    padded[:size] = values
+    shaped = padded.reshape((blocks, n) + values.shape[1:])
+    prefix = ufunc.accumulate(shaped, axis=1).reshape(padded.shape)
+    suffix = ufunc.accumulate(shaped[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)
+    return ufunc(suffix[:size - n + 1], prefix[n - 1:size])
+
+
+def rolling_extrema(high, low, n):
+    """計算 n 期滾動最高價與最低價（支援一維或 [日期, 股票] 二維陣列）"""
+    high = np.asarray(high, dtype='float64')
+    low = np.asarray(low, dtype='float64')
+    out_max = np.full(high.shape, np.nan)
+    out_min = np.full(low.shape, np.nan)
+    if high.shape[0] < n:
+        return out_max, out_min
+
+    kernel = _get_extrema_kernel()
+    if kernel is not None:
+        # JIT 版本：逐欄執行單調佇列
+        if high.ndim == 1:
+            kernel(high, low, n, out_max, out_min)
+        else:
+            for j in range(high.shape[1]):
+                col_max = np.empty(high.shape[0])
+                col_min = np.empty(high.shape[0])
+                kernel(np.ascontiguousarray(high[:, j]),
+                       np.ascontiguousarray(low[:, j]),
+                       n, col_max, col_min)
+                out_max[:, j] = col_max
+                out_min[:, j] = col_min
+    else:
+        # 無 numba 時以分塊前綴/後綴累積極值向量化計算，同樣為 O(n)
+        out_max[n - 1:] = _block_extrema(high, n, np.maximum, -np.inf)
+        out_min[n - 1:] = _block_extrema(low, n, np.minimum, np.inf)
+
+    return out_max, out_min
+
+
+def _wrap_like(values, template):
+    """將陣列包裝回與輸入相同的 Series / DataFrame"""
+    if isinstance(template, pd.DataFrame):
+        return pd.DataFrame(values, index=template.index, columns=template.columns)
+    return pd.Series(values, index=template.index)
+
+
+def rolling_high_low(df, n, cache=None):
+    """取得 n 期滾動最高/最低價；cache 以視窗長度為 key，只有視窗相同的指標才會共用結果"""
+    if cache is not None and n in cache:
+        return cache[n]
+    out_max, out_min = rolling_extrema(df['High'], df['Low'], n)
+    result = (_wrap_like(out_max, df['High']), _wrap_like(out_min, df['Low']))
+    if cache is not None:
+        cache[n] = result
+    return result
+
+
+def calculate_kd(df, n=9, m1=3, m2=3, cache=None):
+    """計算KD指標"""
+    high_n, low_n = rolling_high_low(df, n, cache)
+    rsv = (df['Close'] - low_n) / (high_n - low_n) * 100
+    k = rsv.rolling(m1).mean()
+    d = k.rolling(m2).mean()
+    return k, d
+
+
+def calculate_rsi(df, period=14):
+    """計算RSI指標"""
+    delta = df['Close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def calculate_macd(df, fast=12, slow=26, signal=9):
+    """計算MACD指標"""
+    exp1 = df['Close'].ewm(span=fast, adjust=False).mean()
+    exp2 = df['Close'].ewm(span=slow, adjust=False).mean()
+    macd = exp1 - exp2
+    signal_line = macd.ewm(span=signal, adjust=False).mean()
+    histogram = macd - signal_line
+    return macd, signal_line, histogram
+
+
+def calculate_bollinger_bands(df, period=20, std_dev=2):
+    """計算布林通道"""
+    middle = df['Close'].rolling(window=period).mean()
+    std = df['Close'].rolling(window=period).std()
+    upper = middle + (std * std_dev)
+    lower = middle - (std * std_dev)
+    return middle, upper, lower
+
+
+def calculate_obv(df):
+    """計算OBV指標"""
+    obv = pd.Series(index=df.index, dtype='float64')
+    obv.iloc[0] = 0
+    for i in range(1, len(df)):
+        if df['Close'].iloc[i] > df['Close'].iloc[i-1]:
+            obv.iloc[i] = obv.iloc[i-1] + df['Volume'].iloc[i]
+        elif df['Close'].iloc[i] < df['Close'].iloc[i-1]:
+            obv.iloc[i] = obv.iloc[i-1] - df['Volume'].iloc[i]
+        else:
+            obv.iloc[i] = obv.iloc[i-1]
+    return obv
+
+
+def calculate_williams_r(df, period=14, cache=None):
+    """計算威廉指標"""
+    highest_high, lowest_low = rolling_high_low(df, period, cache)
+    wr = -100 * ((highest_high - df['Close']) / (highest_high - lowest_low))
+    return wr
+
+
+def latest_indicators(df):
+    """最新一根K棒的收盤價與各項技術指標數值（指標資料不足時為 NaN）"""
+    if df.empty:
+        return {}
+    cache = {}
+    k, d = calculate_kd(df, cache=cache)
+    macd, signal_line, histogram = calculate_macd(df)
+    middle, upper, lower = calculate_bollinger_bands(df)
+    return {
+        'date': df.index[-1].strftime('%Y-%m-%d'),
+        'close': df['Close'].iloc[-1],
+        'volume': df['Volume'].iloc[-1],
+        'k': k.iloc[-1],
+        'd': d.iloc[-1],
+        'rsi': calculate_rsi(df).iloc[-1],
+        'macd': macd.iloc[-1],
+        'macd_signal': signal_line.iloc[-1],
+        'macd_hist': histogram.iloc[-1],
+        'bb_upper': upper.iloc[-1],
+        'bb_middle': middle.iloc[-1],
+        'bb_lower': lower.iloc[-1],
+        'obv': calculate_obv(df).iloc[-1],
+        'williams_r': calculate_williams_r(df, cache=cache).iloc[-1],
+    }
@@ -0,0 +1,161 @@
+"""盤中分K：以固定大小的環狀緩衝區將即時報價／逐筆成交逐步合成 1/5/15 分K
+
+每個週期一個三維陣列（股票 × 2·容量 × OHLCV），每根K棒同時寫在 slot 與 slot + 容量，
+因此最近 N 根K棒永遠是連續的一段，讀取時直接回傳 NumPy 視圖，不需複製或重排。
+記憶體只與股票數及容量有關：500 檔三個週期合計約 25 MB。
+"""
+import numpy as np
+
+from .lazy import LazyImport
+from .realtime import QUOTE_FIELDS
+
+pd = LazyImport(globals(), 'pd', 'pandas')
+
+# 下拉選單顯示名稱 -> 週期代碼
+INTRADAY_TIMEFRAMES = {
+    "1分線": "1min",
+    "5分線": "5min",
+    "15分線": "15min"
+}
+INTRADAY_MINUTES = {"1min": 1, "5min": 5, "15min": 15}
+# 每檔保留的K棒數：1 分K一個交易日（270 分鐘），5 分K約兩天，15 分K約三天
+BAR_CAPACITY = {"1min": 300, "5min": 120, "15min": 60}
+TAIPEI_OFFSET = 8 * 3600    # K棒時間以台北時間顯示
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+SHARES_PER_LOT = 1000       # 即時報價成交量單位為張，K棒與日K一樣以股數計
+_OPEN, _HIGH, _LOW, _CLOSE, _VOLUME = range(5)
+
+
+class BarRing:
+    """單一週期所有股票的環狀K棒緩衝區"""
+
+    def __init__(self, seconds, capacity, symbols=16):
+        self.seconds = seconds
+        self.capacity = capacity
+        self.bars = np.full((symbols, 2 * capacity, 5), np.nan)
+        self.starts = np.zeros((symbols, 2 * capacity), dtype=np.int64)
+        self.count = np.zeros(symbols, dtype=np.int64)          # 累計K棒數
+        self.current = np.full(symbols, -1, dtype=np.int64)     # 最後一根K棒的起始時間
+
+    def grow(self, symbols):
+        """股票數超過配置時擴充（容量加倍）"""
+        size = len(self.count)
+        if symbols <= size:
+            return
+        size = max(symbols, size * 2)
+        pad = size - len(self.count)
+        self.bars = np.concatenate([self.bars, np.full((pad,) + self.bars.shape[1:], np.nan)])
+        self.starts = np.concatenate([self.starts, np.zeros((pad, 2 * self.capacity),
+                                                            dtype=np.int64)])
+        self.count = np.concatenate([self.count, np.zeros(pad, dtype=np.int64)])
+        self.current = np.concatenate([self.current, np.full(pad, -1, dtype=np.int64)])
+
+    def update(self, rows, times, prices, volumes):
+        """整批寫入報價（rows 不可重複）：同一根K棒內更新高低收量，跨到新K棒時開新棒，晚到的報價略過"""
+        bucket = times // self.seconds * self.seconds
+        current = self.current[rows]
+        new = bucket > current
+        same = bucket == current
+
+        # 新K棒：開高低收皆為此價，同時寫入兩個位置
+        new_rows = rows[new]
+        self.count[new_rows] += 1
+        slot = (self.count[new_rows] - 1) % self.capacity
+        ohlcv = np.column_stack([prices[new]] * 4 + [volumes[new]])
+        for offset in (0, self.capacity):
+            self.bars[new_rows, slot + offset] = ohlcv
+            self.starts[new_rows, slot + offset] = bucket[new]
+        self.current[new_rows] = bucket[new]
+
+        # 同一根K棒：更新最高、最低、收盤與成交量
+        same_rows = rows[same]
+        slot = (self.count[same_rows] - 1) % self.capacity
+        price, volume = prices[same], volumes[same]
+        for offset in (0, self.capacity):
+            bars = self.bars[same_rows, slot + offset]
+            bars[:, _HIGH] = np.fmax(bars[:, _HIGH], price)
+            bars[:, _LOW] = np.fmin(bars[:, _LOW], price)
+            bars[:, _CLOSE] = price
+            bars[:, _VOLUME] += volume
+            self.bars[same_rows, slot + offset] = bars
+
+    def view(self, row):
+        """最近的K棒（由舊到新）：(起始時間視圖, OHLCV 視圖)，皆為緩衝區的連續切片"""
+        count = int(self.count[row])
+        n = min(count, self.capacity)
+        end = (count - 1) % self.capacity + self.capacity + 1 if count else 0
+        return self.starts[row, end - n:end], self.bars[row, end - n:end]
+
+
+class IntradayStore:
+    """各股票的盤中分K（1/5/15 分），輸入即時報價的累計成交量或逐筆成交量"""
+
+    def __init__(self, capacity=None):
+        capacity = {**BAR_CAPACITY, **(capacity or {})}
+        self.index = {}
+        self.rings = {tf: BarRing(minutes * 60, capacity[tf])
+                      for tf, minutes in INTRADAY_MINUTES.items()}
+        self.last_volume = np.full(16, np.nan)  # 各股票上一次的累計成交量
+
+    def rows(self, symbols):
+        """股票對應的列號（新股票自動加入）"""
+        for code in symbols:
+            if code not in self.index:
+                self.index[code] = len(self.index)
+        for ring in self.rings.values():
+            ring.grow(len(self.index))
+        size = len(self.rings["1min"].count)
+        if size > len(self.last_volume):
+            self.last_volume = np.concatenate(
+                [self.last_volume, np.full(size - len(self.last_volume), np.nan)])
+        return np.array([self.index[code] for code in symbols], dtype=np.intp)
+
+    def add_ticks(self, symbols, times, prices, volumes, cumulative=True):
+        """整批寫入報價：times 為 epoch 秒；volumes 以股數計，cumulative 時為當日累計成交量
+
+        累計量以與上一次的差額計入K棒；第一次看到的股票與換日（累計量變小）時不計入差額。
+        """
+        symbols = [str(code) for code in symbols]
+        rows = self.rows(symbols)
+        times = np.asarray(times, dtype='float64')
+        prices = np.asarray(prices, dtype='float64')
+        volumes = np.asarray(volumes, dtype='float64')
+        valid = ~np.isnan(times) & ~np.isnan(prices)
+        rows, times, prices, volumes = rows[valid], times[valid], prices[valid], volumes[valid]
+
+        if cumulative:
+            previous = self.last_volume[rows]
+            delta = np.where(np.isnan(previous) | (volumes < previous), 0.0, volumes - previous)
+            self.last_volume[rows] = np.where(np.isnan(volumes), previous, volumes)
+            volumes = np.nan_to_num(delta)
+        times = (times + TAIPEI_OFFSET).astype(np.int64)
+        for ring in self.rings.values():
+            ring.update(rows, times, prices, volumes)
+
+    def add_quotes(self, table, symbols=None):
+        """由 realtime.QuoteTable 寫入最新報價（symbols 預設為表中所有股票，成交量由張換算為股）
+
+        尚無成交、現價為委買/委賣價的股票不寫入K棒。
+        """
+        symbols = table.symbols if symbols is None else list(symbols)
+        rows = np.array([table.index[code] for code in symbols], dtype=np.intp)
+        values = table.values[rows]
+        traded = values[:, QUOTE_FIELDS.index('traded')] == 1
+        symbols = [code for code, ok in zip(symbols, traded) if ok]
+        values = values[traded]
+        self.add_ticks(symbols, values[:, QUOTE_FIELDS.index('time')],
+                       values[:, QUOTE_FIELDS.index('price')],
+                       values[:, QUOTE_FIELDS.index('volume')] * SHARES_PER_LOT)
+
+    def arrays(self, symbol, timeframe="1min"):
+        """零複製讀取：(起始時間 int64 視圖, OHLCV 視圖)，無資料時為空陣列"""
+        row = self.index.get(str(symbol))
+        if row is None:
+            return np.array([], dtype=np.int64), np.empty((0, 5))
+        return self.rings[timeframe].view(row)
+
+    def bars(self, symbol, timeframe="1min"):
+        """K線 DataFrame（與 get_bars 相同欄位，資料為緩衝區視圖；索引為台北時間）"""
+        starts, ohlcv = self.arrays(symbol, timeframe)
+        index = pd.DatetimeIndex(starts.astype('datetime64[s]'))
+        return pd.DataFrame(ohlcv, index=index, columns=OHLCV_COLUMNS, copy=False)
@@ -0,0 +1,52 @@
+"""延遲匯入：重量級套件在第一次使用時才載入"""
+import importlib
+
+
+class LazyImport:
+    """延遲匯入：第一次使用時才匯入模組（或模組中的物件），之後以真正的物件取代全域名稱
+
+    pandas、matplotlib、yfinance、requests、BeautifulSoup 匯入都要數百毫秒，
+    啟動時只載入畫面需要的部分。namespace 為要被取代名稱的模組 globals()。
+    """
+
+    def __init__(self, namespace, alias, module, attr=None, on_load=None):
+        self._namespace = namespace
+        self._alias = alias
+        self._module = module
+        self._attr = attr
+        self._on_load = on_load
+
+    def _load(self):
+        target = importlib.import_module(self._module)
+        if self._on_load:
+            self._on_load()
+        if self._attr:
+            target = getattr(target, self._attr)
+        if self._namespace.get(self._alias) is self:
+            self._namespace[self._alias] = target
+        return target
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+
+_matplotlib_configured = False
+
+
+def configure_matplotlib():
+    """第一次載入 matplotlib 時設定中文字型"""
+    global _matplotlib_configured
+    if _matplotlib_configured:
+        return
+    _matplotlib_configured = True
+    import matplotlib
+    # Use system Chinese font for macOS
+    matplotlib.rcParams['font.family'] = [
+        'Arial Unicode MS', 'Heiti TC', 'STHeiti', 'Microsoft YaHei']
+
+    # 設定 matplotlib 中文字型
+    matplotlib.rcParams['font.sans-serif'] = ['Arial Unicode MS']  # Mac OS 的中文字型
+    matplotlib.rcParams['axes.unicode_minus'] = False  # 讓負號正確顯示
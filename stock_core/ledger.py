@@ -0,0 +1,453 @@
+"""交易紀錄：讀寫交易紀錄檔、手續費、持股、個股歷史與績效統計"""
+import os
+
+import numpy as np
+
+from .lazy import LazyImport
+
+pd = LazyImport(globals(), 'pd', 'pandas')
+
+
+# 設定交易紀錄檔案
+ORIGINAL_FILE_NAME = "stock_trades-original.csv"  # 持股、歷史與績效統計使用的完整交易紀錄
+
+# 交易紀錄欄位
+TRADE_COLUMNS = [
+    "交易日期", "買/賣/股利", "代號", "股票", "交易類別",
+    "買入股數", "買入價格", "賣出股數", "賣出價格", "現價",
+    "手續費", "交易稅", "交易成本", "支出", "收入",
+    "價差", "ROR", "持有時間"
+]
+
+
+def append_trade(trade, path=None):
+    """將一筆交易（欄位 -> 值）附加到交易紀錄檔（path 預設為 ORIGINAL_FILE_NAME），回傳檔案路徑
+
+    沿用既有檔案的欄位順序，檔案不存在時以 TRADE_COLUMNS 建立。
+    """
+    path = path or ORIGINAL_FILE_NAME
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        columns = pd.read_csv(path, nrows=0, encoding='utf-8').columns
+        with open(path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) not in (b'\n', b'\r'):
+                f.write(b'\n')
+        pd.DataFrame([trade]).reindex(columns=columns).to_csv(
+            path, mode='a', header=False, index=False, encoding='utf-8')
+    else:
+        pd.DataFrame([trade]).reindex(columns=TRADE_COLUMNS).to_csv(
+            path, index=False, encoding='utf-8')
+    return path
+
+
+def calculate_fees(price, shares, is_buy=True):
+    """計算手續費和交易稅"""
+    fee = round(max(20, price * shares * 0.001425))  # 手續費 0.1425%，最低20元
+    tax = 0 if is_buy else round(price * shares * 0.003)  # 賣出時收取 0.3% 證交稅
+    return fee, tax
+
+
+def calculate_fees_array(price, shares, is_buy=True):
+    """向量化計算手續費和交易稅（與 calculate_fees 相同規則，輸入為陣列）"""
+    amount = np.asarray(price, dtype='float64') * np.asarray(shares, dtype='float64')
+    fee = np.round(np.maximum(20, amount * 0.001425))  # 手續費 0.1425%，最低20元
+    tax = np.zeros_like(amount) if is_buy else np.round(amount * 0.003)  # 證交稅 0.3%
+    return fee, tax
+
+
+def load_original_trades(path=None):
+    """讀取原始交易記錄檔案（path 預設為 ORIGINAL_FILE_NAME）"""
+    path = path or ORIGINAL_FILE_NAME
+    try:
+        if os.path.exists(path):
+            # 讀取 CSV 文件，指定編碼為 utf-8
+            df = pd.read_csv(path, encoding='utf-8')
+
+            # 確保必要的列存在
+            required_columns = [
+                "交易日期", "買/賣/股利", "代號", "股票", "交易類別",
+                "買入股數", "買入價格", "賣出股數", "賣出價格", "現價",
+                "手續費", "交易稅", "交易成本", "支出", "收入"
+            ]
+
+            for col in required_columns:
+                if col not in df.columns:
+                    print(f"警告：缺少必要欄位 {col}")
+                    return pd.DataFrame()
+
+            # 處理日期格式
+            df['交易日期'] = pd.to_datetime(df['交易日期']).dt.strftime('%Y/%m/%d')
+
+            # 處理數值欄位，將非數值填充為 0
+            numeric_columns = ['買入股數', '買入價格', '賣出股數', '賣出價格',
+                               '現價', '手續費', '交易稅', '交易成本']
+            for col in numeric_columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+            # 處理金額欄位中的逗號和引號
+            for col in ['支出', '收入']:
+                df[col] = pd.to_numeric(df[col].astype(str).str.replace(
+                    ',', '').str.replace('"', ''), errors='coerce').fillna(0)
+
+            return df
+
+    except Exception as e:
+        print(f"讀取交易記錄時出錯：{str(e)}")
+        return pd.DataFrame()
+
+    return pd.DataFrame()
+
+
+def get_stock_holdings(trades=None):
+    """獲取當前所有股票持股狀況（trades 可傳入已讀取的交易紀錄）"""
+    df = load_original_trades() if trades is None else trades
+    if df.empty:
+        return {}
+
+    holdings = {}
+
+    # 按股票代號分組處理
+    for code in df['代號'].unique():
+        stock_df = df[df['代號'] == code]
+
+        # 計算總買入和賣出股數
+        total_bought = stock_df[stock_df['買/賣/股利'] == '買']['買入股數'].sum()
+        total_sold = stock_df[stock_df['買/賣/股利'] == '賣']['賣出股數'].sum()
+
+        # 計算當前持股
+        current_shares = total_bought - total_sold
+
+        if current_shares > 0:
+            # 獲取最新的股票名稱
+            stock_name = stock_df.iloc[-1]['股票'] if pd.notna(
+                stock_df.iloc[-1]['股票']) else "未知股票"
+
+            # 計算平均成本
+            buy_records = stock_df[stock_df['買/賣/股利'] == '買']
+            total_cost = (buy_records['買入價格'] * buy_records['買入股數']).sum()
+            avg_cost = total_cost / total_bought if total_bought > 0 else 0
+
+            holdings[code] = {
+                'name': stock_name,
+                'shares': current_shares,
+                'avg_cost': avg_cost
+            }
+
+    return holdings
+
+
+def _average_cost_ledger(is_buy, is_sell, amount, shares, fee, tax):
+    """依平均成本法逐筆計算賣出損益，回傳 (每筆損益, 持股, 持股成本, 總投資, 總損益)"""
+    profit = np.zeros(len(amount))
+    current_shares = 0   # 目前持股數
+    total_cost = 0.0     # 當前持股成本（不含手續費和交易稅）
+    total_investment = 0.0  # 總投資（含手續費）
+    total_profit = 0.0   # 總獲利
+    buy_fee = 20  # 賣出成本 = 買進成本 + 買進手續費（最低20元）
+
+    for i in range(len(amount)):
+        if is_buy[i]:
+            current_shares += shares[i]
+            total_cost += amount[i]
+            total_investment += amount[i] + fee[i]
+        elif is_sell[i] and current_shares >= shares[i] and current_shares > 0:
+            # 計算賣出部分的成本（使用平均成本）
+            avg_cost_per_share = total_cost / current_shares
+            # 實際獲利 = 賣出淨收入（扣手續費、交易稅） - 買入成本
+            profit[i] = amount[i] - fee[i] - tax[i] - (avg_cost_per_share * shares[i] + buy_fee)
+            total_profit += profit[i]
+            current_shares -= shares[i]
+            # 更新剩餘股票的成本
+            total_cost = avg_cost_per_share * current_shares if current_shares > 0 else 0.0
+
+    return profit, current_shares, total_cost, total_investment, total_profit
+
+
+def get_stock_history(stock_code, trades=None):
+    """計算特定股票的逐筆交易明細（平均成本法損益）與匯總，無紀錄時明細為空
+
+    回傳 (明細 DataFrame：交易日期、交易、價格、股數、金額、手續費、交易稅、損益,
+    匯總：total_investment、total_profit、roi、shares、avg_cost)。
+    """
+    df = load_original_trades() if trades is None else trades
+    columns = ['交易日期', '交易', '價格', '股數', '金額', '手續費', '交易稅', '損益']
+    if df.empty:
+        return pd.DataFrame(columns=columns), {}
+
+    # 過濾指定股票的記錄並按日期排序（確保買賣順序正確）
+    stock_records = df[df['代號'] == int(stock_code)].sort_values(
+        '交易日期', kind='stable')
+    if stock_records.empty:
+        return pd.DataFrame(columns=columns), {}
+
+    # 以欄位陣列計算每筆交易的價格、股數、金額與費用
+    trade_type = stock_records['買/賣/股利'].to_numpy()
+    is_buy = trade_type == '買'
+    is_sell = trade_type == '賣'
+    price = np.select([is_buy, is_sell],
+                      [stock_records['買入價格'], stock_records['賣出價格']], 0.0)
+    shares = np.select([is_buy, is_sell],
+                       [stock_records['買入股數'], stock_records['賣出股數']], 0).astype('int64')
+    amount = price * shares
+    fee = np.where(is_buy | is_sell, stock_records['手續費'].fillna(20), 0.0)
+    tax = np.where(is_sell, stock_records['交易稅'].fillna(
+        pd.Series(np.round(amount * 0.003), index=stock_records.index)), 0.0)
+
+    profit, current_shares, total_cost, total_investment, total_profit = \
+        _average_cost_ledger(is_buy, is_sell, amount, shares, fee, tax)
+
+    records = pd.DataFrame({
+        '交易日期': stock_records['交易日期'].astype(str).to_numpy(),
+        '交易': trade_type,
+        '價格': price,
+        '股數': shares,
+        '金額': amount,
+        '手續費': fee,
+        '交易稅': tax,
+        '損益': profit,
+    })
+    summary = {
+        'total_investment': total_investment,
+        'total_profit': total_profit,
+        'roi': (total_profit / total_investment) * 100 if total_investment > 0 else None,
+        'shares': current_shares,
+        'avg_cost': total_cost / current_shares if current_shares > 0 and total_cost > 0 else None,
+    }
+    return records, summary
+
+
+def build_stock_history(stock_code):
+    """建立特定股票的歷史交易記錄報表，回傳 (表頭, 每筆交易的文字列, 匯總)"""
+    df = load_original_trades()
+    if df.empty:
+        return "無歷史交易記錄", [], ""
+
+    records, summary = get_stock_history(stock_code, df)
+    if records.empty:
+        return "該股票無歷史交易記錄", [], ""
+
+    # 添加表頭與列標題
+    header = (
+        "═" * 120 + "\n"
+        "📊 歷史交易記錄\n"
+        + "═" * 120 + "\n"
+        f"{'交易日期':^9.99} | "
+        f"{'交易':^5.5} | "
+        f"{'價格':>6} | "
+        f"{'股數':>9} | "
+        f"{'金額':>11} | "
+        f"{'手續費':>6.5} | "
+        f"{'交易稅':>6.5} | "
+        f"{'損益':>11}\n"
+        + "─" * 120 + "\n"
+    )
+
+    # 逐欄格式化後一次組成每筆交易的文字列
+    columns = [
+        [f"{d:^12}" for d in records['交易日期']],
+        [f"{t:^6}" for t in records['交易']],
+        [f"{v:>7.2f}" for v in records['價格'].to_numpy()],
+        [f"{v:>10,d}" for v in records['股數'].tolist()],
+        [f"{v:>12,.0f}" for v in records['金額'].to_numpy()],
+        [f"{v:>8,.0f}" for v in records['手續費'].to_numpy()],
+        [f"{v:>8,.0f}" for v in records['交易稅'].to_numpy()],
+        [f"{v:>12,.0f}\n" for v in records['損益'].to_numpy()],
+    ]
+    lines = [" | ".join(cells) for cells in zip(*columns)]
+
+    # 新增匯總資訊
+    footer = "═" * 120 + "\n"
+    if summary['roi'] is not None:
+        footer += (
+            f"總投資金額：{summary['total_investment']:>7,.0f} 元   |   "
+            f"總損益：{summary['total_profit']:>8,.0f} 元   |   "
+            f"報酬率：{summary['roi']:>8.2f}%\n"
+        )
+
+    # 新增目前持股資訊
+    footer += f"目前持有：{summary['shares']:,d} 股"
+    if summary['avg_cost'] is not None:
+        footer += f"   |   平均成本：{summary['avg_cost']:,.2f} 元"
+    footer += "\n" + "═" * 120 + "\n"
+    return header, lines, footer
+
+
+def show_stock_history(stock_code):
+    """顯示特定股票的歷史交易記錄"""
+    header, lines, footer = build_stock_history(stock_code)
+    return header + "".join(lines) + footer
+
+def format_trades_list(df):
+    """將交易紀錄逐欄格式化後組成整段文字"""
+    is_buy = (df['買/賣/股利'] == '買').to_numpy()
+    price = np.where(is_buy, df['買入價格'], df['賣出價格'])
+    shares = np.where(is_buy, df['買入股數'], df['賣出股數'])
+    separator = "-" * 100 + "\n"
+    columns = [
+        [f"日期: {v}" for v in df['交易日期']],
+        [f"交易: {v}" for v in df['買/賣/股利']],
+        [f"代號: {v}" for v in df['代號']],
+        [f"名稱: {v}" for v in df['股票']],
+        [f"價格: {v}" for v in price],
+        [f"股數: {v}" for v in shares],
+        [f"現價: {v}" for v in df['現價']],
+        [f"成本: {v}" for v in df['交易成本']],
+        [f"價差: {v}\n" for v in (df['價差'] if '價差' in df.columns else [''] * len(df))],
+    ]
+    return separator.join(" | ".join(cells) for cells in zip(*columns)) + separator
+
+
+def build_performance_report(df):
+    """以向量化方式計算績效報告頁面所需的交易列表、累計現金流與回撤"""
+    report = {'trades': pd.DataFrame(), 'dates': [], 'cumulative': [], 'drawdown': []}
+    if df.empty:
+        return report
+
+    # 交易記錄表格（保留原始數值，顯示時才格式化）
+    is_buy = (df['買/賣/股利'] == '買').to_numpy()
+    price = np.where(is_buy, df['買入價格'], df['賣出價格']).astype('float64')
+    shares = np.where(is_buy, df['買入股數'], df['賣出股數']).astype('float64')
+    report['trades'] = pd.DataFrame({
+        '日期': df['交易日期'].to_numpy(),
+        '代碼': df['代號'].to_numpy(),
+        '股票名稱': df['股票'].to_numpy(),
+        '交易': df['買/賣/股利'].to_numpy(),
+        '價格': price,
+        '數量': shares,
+        '金額': np.nan_to_num(price * shares),
+        '手續費': df['手續費'].to_numpy(),
+        '交易稅': df['交易稅'].to_numpy(),
+        '損益': df['價差'].to_numpy() if '價差' in df.columns else np.full(len(df), ''),
+    })
+
+    # 累計報酬：買入為支出（含手續費），賣出為收入（扣手續費與交易稅）
+    ordered = df.sort_values('交易日期', kind='stable')
+    fee = ordered['手續費'].fillna(20)
+    tax = ordered['交易稅'].fillna(0)
+    side = ordered['買/賣/股利']
+    cash = np.select(
+        [side == '買', side == '賣'],
+        [-(ordered['買入價格'] * ordered['買入股數'] + fee),
+         ordered['賣出價格'] * ordered['賣出股數'] - fee - tax],
+        0.0)
+    cumulative = np.cumsum(cash)
+
+    # 回撤：相對於歷史最高的累計報酬（起始高點為 0）
+    peak = np.maximum.accumulate(np.maximum(cumulative, 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown = np.where(peak != 0, (cumulative - peak) / peak * 100, 0.0)
+
+    report['dates'] = pd.to_datetime(ordered['交易日期']).to_numpy()
+    report['cumulative'] = cumulative
+    report['drawdown'] = drawdown
+
+    return report
+
+
+def profit_metrics(profit, total_investment):
+    """由每筆賣出（來回交易）的損益計算勝率、獲利因子、總報酬與報酬率"""
+    metrics = {
+        'total_investment': total_investment,  # 總投資金額
+        'total_return': 0,      # 總報酬
+        'win_rate': 0,         # 勝率
+        'profit_factor': 0,    # 獲利因子
+        'max_drawdown': 0,     # 最大回撤
+        'total_trades': 0,     # 總交易次數
+        'win_trades': 0,       # 獲利次數
+        'loss_trades': 0       # 虧損次數
+    }
+
+    profit = np.asarray(profit, dtype='float64')
+    wins = profit > 0
+    total_profit = float(profit[wins].sum())
+    total_loss = float(np.abs(profit[~wins]).sum())
+    metrics['win_trades'] = int(wins.sum())
+    metrics['loss_trades'] = int((~wins).sum())
+    metrics['total_trades'] = int(len(profit))
+
+    # 計算績效指標
+    metrics['total_return'] = total_profit - total_loss
+    metrics['win_rate'] = (metrics['win_trades'] / metrics['total_trades']
+                           * 100) if metrics['total_trades'] > 0 else 0
+    metrics['profit_factor'] = total_profit / \
+        total_loss if total_loss > 0 else float('inf')
+
+    # 計算報酬率
+    if metrics['total_investment'] > 0:
+        metrics['roi'] = (metrics['total_return'] /
+                          metrics['total_investment']) * 100
+    else:
+        metrics['roi'] = 0
+
+    return metrics
+
+
+def _running_average_cost(codes, is_buy, is_sell, buy_shares, buy_cost, sell_shares):
+    """各筆交易當下該股票的每股平均成本（含買進手續費）
+
+    與 _average_cost_ledger 相同的平均成本法：買進時累加成本與股數，賣出時依平均成本扣除
+    賣出部分的成本；持股賣完後成本歸零，下一次買進重新計算。
+
+    以各股票分組的累積和計算：持股為以 0 為下限的累積股數，持股歸零時開始新的一段部位；
+    同一段中每次賣出讓先前買進的股數與成本按相同比例減少，因此平均成本為
+    Σ(成本 / 累積保留比例) / Σ(股數 / 累積保留比例)。
+    """
+    avg_cost = np.zeros(len(codes))
+    active = np.flatnonzero(is_buy | is_sell)
+    if not len(active):
+        return avg_cost
+    buy = is_buy[active]
+    bought = np.where(buy, buy_shares[active], 0.0)
+    cost = np.where(buy, buy_cost[active], 0.0)
+    change = np.where(buy, bought, -np.asarray(sell_shares, dtype='float64')[active])
+    codes = pd.factorize(np.asarray(codes)[active])[0]
+
+    # 持股不會低於 0（超賣視為賣完）：S_t = X_t - min(0, min X_k)
+    total = pd.Series(change).groupby(codes).cumsum()
+    held = (total - total.groupby(codes).cummin().clip(upper=0)).to_numpy()
+    held_before = pd.Series(held).groupby(codes).shift(fill_value=0.0).to_numpy()
+
+    # 賣完的那筆賣出是該段部位的最後一筆
+    flat = ~buy & (held <= 0)
+    segment = pd.Series(flat.astype(np.int64)).groupby(codes).cumsum().to_numpy() - flat
+    keys = codes * (segment.max() + 1) + segment
+    with np.errstate(divide='ignore', invalid='ignore'):
+        kept = np.where(~buy & ~flat, held / held_before, 1.0)
+    scale = pd.Series(kept).groupby(keys).cumprod().to_numpy()
+    total_cost = pd.Series(cost / scale).groupby(keys).cumsum().to_numpy()
+    total_shares = pd.Series(bought / scale).groupby(keys).cumsum().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_cost[active] = np.where(total_shares > 0, total_cost / total_shares, 0.0)
+    return avg_cost
+
+
+def calculate_performance_metrics(stock_code=None, trades=None):
+    """計算交易績效指標（trades 可傳入回測產生的交易紀錄）"""
+    df = load_original_trades() if trades is None else trades
+    if df.empty:
+        return {}
+
+    # 如果指定了股票代碼，只分析該股票
+    if stock_code:
+        df = df[df['代號'] == stock_code]
+
+    # 以陣列取出交易欄位，平均成本依紀錄順序逐筆推進（賣出後持股成本隨之減少）
+    df = df[df['代號'].notna()]
+    is_buy = (df['買/賣/股利'] == '買').to_numpy()
+    is_sell = (df['買/賣/股利'] == '賣').to_numpy()
+    fee = pd.to_numeric(df['手續費'], errors='coerce').fillna(20)
+
+    buy_shares = df['買入股數'].where(is_buy, 0).astype(float).to_numpy()
+    buy_amount = (df['買入價格'] * df['買入股數'] + fee).where(is_buy, 0).astype(float)
+    total_investment = float(buy_amount.sum())
+
+    sell_shares = df['賣出股數'].to_numpy(dtype='float64')[is_sell]
+    avg_cost = _running_average_cost(df['代號'].to_numpy(), is_buy, is_sell, buy_shares,
+                                     buy_amount.to_numpy(),
+                                     df['賣出股數'].to_numpy(dtype='float64'))
+    revenue = df['賣出價格'].to_numpy(dtype='float64')[is_sell] * sell_shares
+    tax = pd.to_numeric(df['交易稅'], errors='coerce').to_numpy(dtype='float64')[is_sell]
+    tax = np.where(np.isnan(tax), revenue * 0.003, tax)
+    profit = revenue - avg_cost[is_sell] * sell_shares - fee.to_numpy()[is_sell] - tax
+
+    return profit_metrics(profit, total_investment)
@@ -0,0 +1,559 @@
+"""台股資料：股票代號、日K快取與週/月K、籌碼資料、全市場股票清單與三大法人買賣超"""
+import math
+import os
+import time
+from datetime import datetime, timedelta
+
+from .lazy import LazyImport
+
+pd = LazyImport(globals(), 'pd', 'pandas')
+yf = LazyImport(globals(), 'yf', 'yfinance')
+requests = LazyImport(globals(), 'requests', 'requests')
+BeautifulSoup = LazyImport(globals(), 'BeautifulSoup', 'bs4', 'BeautifulSoup')
+
+
+def format_stock_code(code):
+    """格式化股票代號為 Yahoo Finance 格式"""
+    # 移除任何非数字字符
+    code = ''.join(filter(str.isdigit, str(code)))
+
+    # 确保代码至少为4位数
+    code = code.zfill(4)
+
+    # DR股票（如9103美德医疗-DR）使用.TW
+    if code.startswith('91'):
+        return f"{code}.TW"
+    # ETF通常以00開頭
+    elif code.startswith('00'):
+        return f"{code}.TW"
+    # 上櫃股票通常以6開頭
+    elif code.startswith('6'):
+        return f"{code}.TWO"
+    # 其他情况（主要是上市股票）
+    else:
+        return f"{code}.TW"
+
+
+def yahoo_symbol(stock_code):
+    """Yahoo Finance 代碼：已含 .TW/.TWO 的代碼與 ^ 開頭的指數（如 ^TWII）原樣使用"""
+    stock_code = str(stock_code)
+    if '.' in stock_code or stock_code.startswith('^'):
+        return stock_code
+    return format_stock_code(stock_code)
+
+
+def get_stock_name(stock):
+    """獲取股票名稱"""
+    try:
+        info = stock.info
+        return info.get('longName', '') or info.get('shortName', '')
+    except:
+        return ''
+
+
+def fetch_quote(stock_code):
+    """直接向 Yahoo Finance 取得最新收盤價，回傳 (價格, 交易日期, 股票名稱)"""
+    # 首先嘗試 .TWO 格式（上櫃股票）
+    formatted_code = format_stock_code(stock_code)
+    stock = yf.Ticker(formatted_code)
+
+    # 嘗試獲取數據
+    data = stock.history(period="5d")
+    if len(data) == 0:
+        # 如果獲取失敗，嘗試切換交易所後綴
+        if formatted_code.endswith('.TWO'):
+            formatted_code = f"{stock_code}.TW"
+        else:
+            formatted_code = f"{stock_code}.TWO"
+        stock = yf.Ticker(formatted_code)
+        data = stock.history(period="5d")
+
+    if len(data) == 0:
+        raise Exception(
+            f"無法獲取股票 {stock_code} 的數據，請確認：\n1. 股票代碼是否正確\n2. 該股票是否仍在交易\n3. 是否為台股代碼")
+
+    # 獲取最新的收盤價和日期
+    price = data.iloc[-1]["Close"]
+    trading_date = data.index[-1].strftime("%Y-%m-%d")
+
+    # 取得股票名稱
+    stock_name = get_stock_name(stock)
+    if not stock_name:
+        stock_name = f"股票 {stock_code}"
+    return price, trading_date, stock_name
+
+
+# 日K資料快取（記憶體 + 本地 CSV），供各週期K線與技術指標共用
+OHLCV_DIR = "ohlcv_cache"
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+DAILY_REFRESH_SECONDS = 60  # 同一檔股票兩次向 Yahoo 更新的最短間隔
+
+_daily_bar_cache = {}    # formatted_code -> 日K DataFrame
+_daily_fetch_time = {}   # formatted_code -> 最後更新時間（time.time()）
+_daily_full_start = {}   # formatted_code -> 已完整下載的最早起始日
+_resampled_cache = {}    # (formatted_code, timeframe) -> (日K起始日, 週/月K DataFrame)
+
+# 下拉選單顯示名稱 -> 週期代碼
+TIMEFRAMES = {
+    "日線": "D",
+    "週線": "W",
+    "月線": "M"
+}
+
+# 各週期預設取用的日K長度（確保週/月線有足夠K棒計算指標）
+TIMEFRAME_PERIODS = {
+    "D": "6mo",
+    "W": "2y",
+    "M": "5y"
+}
+
+# 週/月K的 resample 規則與對應的 Period 頻率
+_RESAMPLE_RULES = {"W": "W-FRI", "M": "ME"}
+_PERIOD_FREQS = {"W": "W-FRI", "M": "M"}
+
+_OHLCV_AGG = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "Volume": "sum"
+}
+
+
+def _period_start(period):
+    """將 yfinance 的 period 字串換算成起始日期"""
+    today = pd.Timestamp.now().normalize()
+    if period == "max":
+        return pd.Timestamp.min
+    unit = period[-2:] if period.endswith("mo") else period[-1]
+    count = int(period[:-len(unit)])
+    if unit == "d":
+        return today - pd.Timedelta(days=count)
+    if unit == "mo":
+        return today - pd.DateOffset(months=count)
+    if unit == "y":
+        return today - pd.DateOffset(years=count)
+    raise ValueError(f"不支援的期間：{period}")
+
+
+def period_since(start):
+    """涵蓋 start 至今的 yfinance period 字串（以整年計）"""
+    days = (pd.Timestamp.now() - pd.Timestamp(start)).days
+    return f"{max(1, math.ceil(days / 365.25))}y"
+
+
+def _normalize_bars(df):
+    """統一日K格式：只保留 OHLCV、去除時區、依日期排序並去除重複"""
+    df = df[OHLCV_COLUMNS].copy()
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df.index = index.normalize()
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    return df
+
+
+def _ohlcv_path(formatted_code):
+    """日K本地檔案路徑"""
+    return os.path.join(OHLCV_DIR, f"{formatted_code}.csv")
+
+
+def save_daily_bars(formatted_code, df):
+    """將日K寫入本地快取"""
+    os.makedirs(OHLCV_DIR, exist_ok=True)
+    df.to_csv(_ohlcv_path(formatted_code), index_label="Date")
+
+
+def read_daily_bars(formatted_code):
+    """從本地快取讀取日K，不存在時回傳 None"""
+    path = _ohlcv_path(formatted_code)
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, index_col=0, parse_dates=True)
+
+
+def load_daily_bars(stock_code, period="6mo", refresh=True):
+    """讀取日K資料（記憶體快取 → 本地檔案 → Yahoo Finance），只增量下載最新K棒
+
+    stock_code 可為代號、已含 .TW/.TWO 的代碼或指數代碼；refresh=False 時有快取就不連網。
+    """
+    formatted_code = yahoo_symbol(stock_code)
+    start = _period_start(period)
+
+    df = _daily_bar_cache.get(formatted_code)
+    if df is None:
+        df = read_daily_bars(formatted_code)
+
+    # 快取不足所需期間時才重新下載完整資料（新上市股票下載過一次即不再重抓）
+    covered = df is not None and not df.empty and (
+        df.index[0] <= start + pd.Timedelta(days=7) or
+        _daily_full_start.get(formatted_code, pd.Timestamp.max) <= start)
+    if not covered:
+        fetched = yf.Ticker(formatted_code).history(period=period)
+        if fetched.empty:
+            return fetched
+        fetched = _normalize_bars(fetched)
+        df = fetched if df is None or df.empty else \
+            _normalize_bars(pd.concat([df, fetched]))
+        _daily_fetch_time[formatted_code] = time.time()
+        _daily_full_start[formatted_code] = start
+        save_daily_bars(formatted_code, df)
+
+    # 只抓最近幾天的K棒補上最後一根（含盤中未收盤的K棒）
+    elif refresh and time.time() - _daily_fetch_time.get(formatted_code, 0) > DAILY_REFRESH_SECONDS:
+        recent = yf.Ticker(formatted_code).history(period="5d")
+        if not recent.empty:
+            recent = _normalize_bars(recent)
+            # 以最新資料覆蓋重疊日期（最後一根可能是盤中K棒）
+            df = pd.concat([df[df.index < recent.index[0]], recent])
+            save_daily_bars(formatted_code, df)
+        _daily_fetch_time[formatted_code] = time.time()
+
+    _daily_bar_cache[formatted_code] = df
+    return df[df.index >= start]
+
+
+def resample_bars(daily, timeframe):
+    """將日K轉換為週K或月K"""
+    if timeframe == "D" or daily.empty:
+        return daily
+    bars = daily.resample(_RESAMPLE_RULES[timeframe]).agg(_OHLCV_AGG)
+    return bars.dropna(subset=["Close"])
+
+
+def update_resampled_bars(bars, daily, timeframe):
+    """以最新日K增量更新週/月K，只重算最後一根（可能未完成的）K棒之後的部分"""
+    if timeframe == "D":
+        return daily
+    if bars is None or bars.empty:
+        return resample_bars(daily, timeframe)
+
+    # 最後一根K棒所屬期間的起始日
+    period_start = bars.index[-1].to_period(_PERIOD_FREQS[timeframe]).start_time
+    tail = resample_bars(daily[daily.index >= period_start], timeframe)
+    return pd.concat([bars[bars.index < tail.index[0]], tail]) if not tail.empty else bars
+
+
+def get_bars(stock_code, timeframe="D", period=None):
+    """取得指定週期的K線（日/週/月），週/月K由日K快取推導"""
+    period = period or TIMEFRAME_PERIODS[timeframe]
+    daily = load_daily_bars(stock_code, period)
+    if timeframe == "D" or daily.empty:
+        return daily
+
+    key = (format_stock_code(stock_code), timeframe)
+    cached = _resampled_cache.get(key)
+    if cached is not None and cached[0] == daily.index[0]:
+        bars = update_resampled_bars(cached[1], daily, timeframe)
+    else:
+        bars = resample_bars(daily, timeframe)
+
+    _resampled_cache[key] = (daily.index[0], bars)
+    return bars
+
+
+def chip_data_from_bars(df):
+    """由最近幾根日K推估籌碼分析資料（三大法人、融資融券目前為模擬值）"""
+    # 模擬三大法人買賣超與融資融券數據（實際應從其他數據源獲取）
+    return {
+        'dates': df.index,
+        'foreign': df['Volume'] * 0.4,  # 外資買超
+        'trust': df['Volume'] * 0.1,    # 投信買超
+        'dealer': df['Volume'] * 0.05,  # 自營商買超
+        'margin': df['High'] * 1000,    # 模擬融資餘額
+        'short': df['Low'] * 1000,      # 模擬融券餘額
+        'holding': {
+            '外資': 40,
+            '投信': 10,
+            '自營商': 5,
+            '其他': 45
+        }
+    }
+
+
+def load_chip_data(stock_code):
+    """取得籌碼分析頁面使用的資料（最近5個交易日），無資料時回傳 None"""
+    # 獲取股票數據
+    formatted_code = format_stock_code(stock_code)
+    stock = yf.Ticker(formatted_code)
+
+    # 獲取大戶持股資料（最近5個交易日）
+    df = stock.history(period="5d")
+    if df.empty:
+        return None
+    return chip_data_from_bars(df)
+
+
+def get_institutional_data(stock_code):
+    """獲取三大法人買賣超資料"""
+    try:
+        # 移除股票代碼中的 .TW 或 .TWO
+        stock_code = ''.join(filter(str.isdigit, stock_code))
+
+        # 設定日期範圍（最近5個交易日）
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=10)  # 多取幾天以確保有5個交易日
+
+        # 證交所API網址
+        url = "https://www.twse.com.tw/rwd/zh/fund/T86?date={}&selectType=ALL&response=json"
+
+        data = {
+            'dates': [],
+            'foreign': [],
+            'trust': [],
+            'dealer': []
+        }
+
+        # 獲取每日資料
+        current_date = start_date
+        while current_date <= end_date:
+            date_str = current_date.strftime('%Y%m%d')
+            response = requests.get(url.format(date_str))
+
+            if response.status_code == 200:
+                json_data = response.json()
+                if json_data.get('data'):
+                    for row in json_data['data']:
+                        if row[0] == stock_code:
+                            data['dates'].append(current_date)
+                            data['foreign'].append(
+                                int(row[4].replace(',', '')))  # 外資買賣超
+                            data['trust'].append(
+                                int(row[7].replace(',', '')))    # 投信買賣超
+                            data['dealer'].append(
+                                int(row[10].replace(',', '')))  # 自營商買賣超
+
+            current_date += timedelta(days=1)
+            time.sleep(0.5)  # 避免請求過於頻繁
+
+        return data
+    except Exception as e:
+        print(f"獲取三大法人資料時出錯：{str(e)}")
+        return None
+
+
+def get_margin_trading_data(stock_code):
+    """獲取融資融券餘額資料"""
+    try:
+        # 移除股票代碼中的 .TW 或 .TWO
+        stock_code = ''.join(filter(str.isdigit, stock_code))
+
+        # 證交所融資融券API
+        url = "https://www.twse.com.tw/rwd/zh/marginTrading/MI_MARGN?date={}&selectType=ALL&response=json"
+
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=10)
+
+        data = {
+            'dates': [],
+            'margin_balance': [],
+            'short_balance': []
+        }
+
+        current_date = start_date
+        while current_date <= end_date:
+            date_str = current_date.strftime('%Y%m%d')
+            response = requests.get(url.format(date_str))
+
+            if response.status_code == 200:
+                json_data = response.json()
+                if json_data.get('data'):
+                    for row in json_data['data']:
+                        if row[0] == stock_code:
+                            data['dates'].append(current_date)
+                            data['margin_balance'].append(
+                                int(row[5].replace(',', '')))  # 融資餘額
+                            data['short_balance'].append(
+                                int(row[8].replace(',', '')))   # 融券餘額
+
+            current_date += timedelta(days=1)
+            time.sleep(0.5)
+
+        return data
+    except Exception as e:
+        print(f"獲取融資融券資料時出錯：{str(e)}")
+        return None
+
+
+def get_shareholding_distribution(stock_code):
+    """獲取股權分散資料"""
+    try:
+        # 移除股票代碼中的 .TW 或 .TWO
+        stock_code = ''.join(filter(str.isdigit, stock_code))
+
+        # 證交所股權分散表API
+        url = "https://www.tdcc.com.tw/smWeb/QryStockAjax.do"
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+        }
+
+        # 取得最近一週的資料
+        today = datetime.now()
+        friday = today - timedelta(days=(today.weekday() - 4) % 7)
+        date_str = friday.strftime('%Y%m%d')
+
+        data = {
+            'scaDates': date_str,
+            'scaDate': date_str,
+            'SqlMethod': 'StockNo',
+            'StockNo': stock_code,
+            'radioStockNo': stock_code
+        }
+
+        response = requests.post(url, data=data, headers=headers)
+
+        if response.status_code == 200:
+            soup = BeautifulSoup(response.text, 'html.parser')
+            table = soup.find('table', {'class': 'table_2'})
+
+            if table:
+                rows = table.find_all('tr')[1:]  # 跳過表頭
+                total_shares = 0
+                distribution = {
+                    '1-999': 0,
+                    '1,000-5,000': 0,
+                    '5,001-10,000': 0,
+                    '10,001-50,000': 0,
+                    '50,001-100,000': 0,
+                    '100,001-500,000': 0,
+                    '500,001-1,000,000': 0,
+                    '1,000,001以上': 0
+                }
+
+                for row in rows:
+                    cols = row.find_all('td')
+                    if len(cols) >= 4:
+                        shares = int(cols[3].text.replace(',', ''))
+                        total_shares += shares
+
+                        # 根據持股數量分類
+                        level = cols[1].text.strip()
+                        distribution[level] = shares
+
+                return distribution
+
+        return None
+    except Exception as e:
+        print(f"獲取股權分散資料時出錯：{str(e)}")
+        return None
+
+
+# 全市場股票清單設定
+UNIVERSE_FILE = "stock_universe.csv"
+UNIVERSE_MAX_AGE_DAYS = 7
+STORE_BATCH_SIZE = 100  # 每次向 Yahoo 批次下載的股票數
+
+# 證交所 ISIN 清單：2 為上市、4 為上櫃
+_ISIN_URL = "https://isin.twse.com.tw/isin/C_public.jsp?strMode={}"
+_ISIN_MARKETS = {2: ("上市", ".TW"), 4: ("上櫃", ".TWO")}
+
+_t86_cache = {}  # 日期字串 -> 全市場三大法人買賣超
+
+
+def fetch_stock_universe():
+    """從證交所 ISIN 清單下載上市、上櫃股票與 ETF 代號"""
+    records = []
+    for mode, (market, suffix) in _ISIN_MARKETS.items():
+        response = requests.get(_ISIN_URL.format(mode), timeout=30)
+        response.encoding = 'cp950'
+        soup = BeautifulSoup(response.text, 'html.parser')
+        for row in soup.find_all('tr'):
+            cols = row.find_all('td')
+            if len(cols) < 6:
+                continue
+            # 第一欄格式為「代號　名稱」（全形空白分隔）
+            parts = cols[0].text.strip().split('　')
+            cfi_code = cols[5].text.strip()
+            # ES 開頭為普通股、CE 開頭為 ETF
+            if len(parts) != 2 or not cfi_code.startswith(('ES', 'CE')):
+                continue
+            code, name = parts[0].strip(), parts[1].strip()
+            records.append({
+                "代號": code,
+                "股票": name,
+                "市場": market,
+                "symbol": f"{code}{suffix}"
+            })
+    return pd.DataFrame(records, columns=["代號", "股票", "市場", "symbol"])
+
+
+def load_stock_universe(refresh=False):
+    """讀取全市場股票清單，本地檔案過期時重新下載"""
+    if not refresh and os.path.exists(UNIVERSE_FILE):
+        age = time.time() - os.path.getmtime(UNIVERSE_FILE)
+        if age < UNIVERSE_MAX_AGE_DAYS * 86400:
+            return pd.read_csv(UNIVERSE_FILE, dtype={"代號": str})
+
+    universe = fetch_stock_universe()
+    if not universe.empty:
+        universe.to_csv(UNIVERSE_FILE, index=False)
+    return universe
+
+
+def sync_daily_store(symbols, period="1y", progress=None):
+    """批次下載日K至本地快取；已有快取的股票只補最近幾天"""
+    missing = [s for s in symbols if not os.path.exists(_ohlcv_path(s))]
+    cached = [s for s in symbols if os.path.exists(_ohlcv_path(s))]
+    done = 0
+
+    for batch_symbols, batch_period in ((missing, period), (cached, "5d")):
+        for start in range(0, len(batch_symbols), STORE_BATCH_SIZE):
+            batch = batch_symbols[start:start + STORE_BATCH_SIZE]
+            data = yf.download(batch, period=batch_period, group_by='ticker',
+                               auto_adjust=True, threads=True, progress=False)
+            for symbol in batch:
+                try:
+                    bars = data[symbol] if len(batch) > 1 else data
+                    bars = _normalize_bars(bars.dropna(subset=["Close"]))
+                    if bars.empty:
+                        continue
+                    if batch_period != period:
+                        old = read_daily_bars(symbol)
+                        bars = pd.concat([old[old.index < bars.index[0]], bars])
+                    save_daily_bars(symbol, bars)
+                    _daily_bar_cache.pop(symbol, None)
+                except Exception as e:
+                    print(f"更新 {symbol} 日K時出錯：{str(e)}")
+            done += len(batch)
+            if progress:
+                progress(done, len(symbols))
+
+
+def get_t86_table(date):
+    """取得某日全市場三大法人買賣超（代號 -> (外資, 投信, 自營商)），非交易日為空"""
+    date_str = date.strftime('%Y%m%d')
+    if date_str in _t86_cache:
+        return _t86_cache[date_str]
+
+    url = "https://www.twse.com.tw/rwd/zh/fund/T86?date={}&selectType=ALL&response=json"
+    table = {}
+    response = requests.get(url.format(date_str), timeout=10)
+    if response.status_code == 200:
+        for row in response.json().get('data') or []:
+            table[row[0].strip()] = (int(row[4].replace(',', '')),   # 外資買賣超
+                                     int(row[7].replace(',', '')),   # 投信買賣超
+                                     int(row[10].replace(',', '')))  # 自營商買賣超
+
+    # 當日資料可能尚未公布，只快取已確定的結果
+    if table or date.date() < datetime.now().date():
+        _t86_cache[date_str] = table
+    return table
+
+
+def get_foreign_net_buy(days=3, max_lookback=14):
+    """取得最近 days 個交易日的外資買賣超（代號 -> 由舊到新的股數清單）"""
+    tables = []
+    date = datetime.now()
+    for _ in range(max_lookback):
+        if len(tables) >= days:
+            break
+        if date.weekday() < 5:
+            table = get_t86_table(date)
+            if table:
+                tables.append(table)
+            time.sleep(0.5)  # 避免請求過於頻繁
+        date -= timedelta(days=1)
+
+    tables.reverse()
+    codes = set().union(*tables) if tables else set()
+    return {code: [t.get(code, (0, 0, 0))[0] for t in tables] for code in codes}
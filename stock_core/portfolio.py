@@ -0,0 +1,278 @@
+"""投資組合每日市值：由交易紀錄與日K收盤價計算每日持股市值、現金與淨值，以及時間加權報酬等績效
+
+現金帳戶模型：買進時現金不足的部分視為當天投入的資金，賣出與股利收入留在現金帳戶。
+時間加權報酬排除資金投入的影響：當日報酬 = 淨值 / (前一日淨值 + 當日投入) - 1。
+"""
+import os
+from datetime import date
+
+import numpy as np
+
+from . import ledger
+from .backtest import load_price_panel
+from .benchmark import (DEFAULT_BENCHMARK, RELATIVE_METRICS, align_returns, load_benchmark,
+                        relative_metrics, rolling_relative_metrics)
+from .lazy import LazyImport
+from .ledger import calculate_performance_metrics, load_original_trades
+from .market import _ohlcv_path, period_since, yahoo_symbol
+
+pd = LazyImport(globals(), 'pd', 'pandas')
+
+TRADING_DAYS = 252      # 每年交易日數（年化用）
+RISK_FREE_RATE = 0.015  # 無風險利率（年化，約為一年期定存利率）
+
+# 期間報酬的顯示名稱 -> 期間代碼
+PERIODS = {
+    "月": "M",
+    "季": "Q",
+    "年": "Y"
+}
+
+_performance_cache = {}  # (交易紀錄檔路徑, 基準) -> (交易紀錄檔狀態, 日K檔狀態, 績效資料)
+PORTFOLIO_NAME = "投資組合"
+
+
+def load_close_panel(stock_codes, start):
+    """由日K快取讀取收盤價面板（日期 × 股票），無法取得的股票略過"""
+    panel = load_price_panel([str(code) for code in stock_codes], period=period_since(start))
+    return panel.get('Close', pd.DataFrame())
+
+
+def build_equity_curve(trades, closes=None):
+    """計算每日持股市值、現金與淨值（以陣列運算，與交易筆數、股票數近乎線性）
+
+    trades 為交易紀錄（load_original_trades 格式）；closes 為收盤價面板（日期 × 股票代號字串），
+    未提供時由日K快取讀取；沒有收盤價的日子以最近一次成交價計算市值。
+    回傳 DataFrame（索引為交易日）：market_value、cash、deposits、equity、return、nav、drawdown。
+    """
+    columns = ['market_value', 'cash', 'deposits', 'equity', 'return', 'nav', 'drawdown']
+    if trades is not None and not trades.empty:
+        trades = trades[pd.to_numeric(trades['代號'], errors='coerce').notna()]
+    if trades is None or trades.empty:
+        return pd.DataFrame(columns=columns)
+
+    side = trades['買/賣/股利'].to_numpy()
+    is_buy = side == '買'
+    is_sell = side == '賣'
+    is_dividend = side == '股利'
+    trade_dates = pd.to_datetime(trades['交易日期']).dt.normalize().to_numpy()
+    codes, code_labels = pd.factorize(pd.to_numeric(trades['代號']).astype('int64').astype(str))
+
+    buy_shares = pd.to_numeric(trades['買入股數'], errors='coerce').fillna(0).to_numpy()
+    sell_shares = pd.to_numeric(trades['賣出股數'], errors='coerce').fillna(0).to_numpy()
+    buy_price = pd.to_numeric(trades['買入價格'], errors='coerce').fillna(0).to_numpy()
+    sell_price = pd.to_numeric(trades['賣出價格'], errors='coerce').fillna(0).to_numpy()
+    fee = pd.to_numeric(trades['手續費'], errors='coerce').fillna(20).to_numpy()
+    tax = pd.to_numeric(trades['交易稅'], errors='coerce').to_numpy()
+    tax = np.where(np.isnan(tax), sell_price * sell_shares * 0.003, tax)
+    dividend = pd.to_numeric(trades['收入'], errors='coerce').fillna(0).to_numpy() \
+        if '收入' in trades.columns else np.zeros(len(trades))
+
+    # 每筆交易的持股與現金變動
+    share_delta = np.select([is_buy, is_sell], [buy_shares, -sell_shares], 0.0)
+    cash_delta = np.select(
+        [is_buy, is_sell, is_dividend],
+        [-(buy_price * buy_shares + fee), sell_price * sell_shares - fee - tax, dividend], 0.0)
+    price = np.select([is_buy, is_sell], [buy_price, sell_price], np.nan)
+
+    # 日期序列：有收盤價時使用實際交易日，否則使用平日；另外加入所有交易日期
+    first = pd.Timestamp(trade_dates.min())
+    if closes is None:
+        closes = load_close_panel(code_labels, first)
+    if closes.empty:
+        dates = pd.bdate_range(first, max(trade_dates.max(), pd.Timestamp.now().normalize()))
+    else:
+        dates = closes.index[closes.index >= first]
+    dates = dates.union(pd.DatetimeIndex(trade_dates).unique())
+    day = np.searchsorted(dates.to_numpy(), trade_dates)
+    n_days, n_codes = len(dates), len(code_labels)
+
+    # 持股矩陣：每日每檔股票的股數變動累加（賣超的部分不計為負持股）
+    positions = np.zeros((n_days, n_codes))
+    np.add.at(positions, (day, codes), share_delta)
+    positions = np.maximum(np.cumsum(positions, axis=0), 0)
+
+    # 市價：收盤價優先，缺少時以最近一次成交價代替
+    traded = ~np.isnan(price)
+    trade_marks = np.full((n_days, n_codes), np.nan)
+    trade_marks[day[traded], codes[traded]] = price[traded]
+    marks = pd.DataFrame(trade_marks, index=dates).ffill().to_numpy()
+    if not closes.empty:
+        close_marks = closes.reindex(columns=code_labels).reindex(dates).ffill().to_numpy()
+        marks = np.where(np.isnan(close_marks), marks, close_marks)
+    market_value = np.nansum(positions * marks, axis=1)
+
+    # 現金帳戶：累計現金不足時視為投入資金
+    net_cash = np.cumsum(np.bincount(day, weights=cash_delta, minlength=n_days))
+    deposits = np.maximum.accumulate(np.maximum(-net_cash, 0))
+    cash = deposits + net_cash
+    equity = market_value + cash
+
+    # 時間加權報酬：投入資金視為當日開盤前存入
+    flows = np.diff(deposits, prepend=0.0)
+    base = np.concatenate([[0.0], equity[:-1]]) + flows
+    with np.errstate(divide='ignore', invalid='ignore'):
+        daily_return = np.where(base > 0, equity / base - 1, 0.0)
+    nav = np.cumprod(1 + daily_return)
+    drawdown = nav / np.maximum.accumulate(nav) - 1
+
+    return pd.DataFrame({
+        'market_value': market_value,
+        'cash': cash,
+        'deposits': deposits,
+        'equity': equity,
+        'return': daily_return,
+        'nav': nav,
+        'drawdown': drawdown,
+    }, index=dates)
+
+
+def calculate_portfolio_metrics(curve, risk_free_rate=RISK_FREE_RATE):
+    """由每日淨值計算時間加權報酬、年化報酬、波動率、夏普、索提諾與最大回撤（報酬、波動與回撤以 % 表示）"""
+    if curve.empty:
+        return {}
+
+    returns = curve['return'].to_numpy()
+    active = np.flatnonzero(curve['deposits'].to_numpy() > 0)
+    returns = returns[active[0]:] if len(active) else returns[:0]
+    if len(returns) < 2:
+        return {}
+
+    twr = curve['nav'].iloc[-1] - 1
+    years = len(returns) / TRADING_DAYS
+    excess = returns - risk_free_rate / TRADING_DAYS
+    volatility = returns.std(ddof=1) * np.sqrt(TRADING_DAYS)
+    downside = np.sqrt(np.mean(np.minimum(excess, 0) ** 2)) * np.sqrt(TRADING_DAYS)
+    annual_excess = excess.mean() * TRADING_DAYS
+
+    return {
+        'twr': twr * 100,
+        # 未滿一年不年化，避免短期報酬被放大
+        'annual_return': (((1 + twr) ** (1 / years) - 1) * 100 if years >= 1 and twr > -1
+                          else twr * 100),
+        'volatility': volatility * 100,
+        'sharpe': annual_excess / volatility if volatility > 0 else float('nan'),
+        'sortino': annual_excess / downside if downside > 0 else float('nan'),
+        'max_drawdown': curve['drawdown'].min() * 100,
+        'equity': curve['equity'].iloc[-1],
+        'deposits': curve['deposits'].iloc[-1],
+    }
+
+
+def period_returns(curve, period="M"):
+    """依月/季/年分組計算期間報酬與累計報酬（以每期最後一天的淨值相除，不逐期執行 Python）
+
+    回傳 DataFrame：期間（如 2024-03、2024Q1、2024）、報酬率、累計報酬（皆為比例）。
+    """
+    if curve.empty:
+        return pd.DataFrame(columns=['期間', '報酬率', '累計報酬'])
+
+    index = curve.index
+    year = index.year.to_numpy()
+    month = index.month.to_numpy()
+    key = {'M': year * 12 + month - 1,
+           'Q': year * 4 + (month - 1) // 3,
+           'Y': year}[period]
+
+    # 每期最後一個交易日
+    last = np.append(np.flatnonzero(key[1:] != key[:-1]), len(key) - 1)
+    nav = curve['nav'].to_numpy()[last]
+    previous = np.concatenate([[1.0], nav[:-1]])
+
+    ends = index[last]
+    if period == 'M':
+        labels = ends.strftime('%Y-%m')
+    elif period == 'Q':
+        labels = [f"{y}Q{q}" for y, q in zip(ends.year, ends.quarter)]
+    else:
+        labels = ends.strftime('%Y')
+    return pd.DataFrame({'期間': labels, '報酬率': nav / previous - 1, '累計報酬': nav - 1})
+
+
+def _file_stamp(path):
+    """檔案修改時間與大小，不存在時為 None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _price_stamp(stock_codes):
+    """各股票日K快取檔的狀態（日K更新時會改寫檔案）"""
+    return tuple(_file_stamp(_ohlcv_path(yahoo_symbol(code))) for code in stock_codes)
+
+
+def held_codes(trades):
+    """目前仍有持股的股票代號（字串）"""
+    side = trades['買/賣/股利']
+    shares = np.where(side == '買', pd.to_numeric(trades['買入股數'], errors='coerce'),
+                      np.where(side == '賣', -pd.to_numeric(trades['賣出股數'], errors='coerce'), 0))
+    codes = pd.to_numeric(trades['代號'], errors='coerce')
+    net = pd.Series(np.nan_to_num(shares)).groupby(codes.to_numpy()).sum()
+    return [str(int(code)) for code in net.index[net.to_numpy() > 0]]
+
+
+def benchmark_analysis(curve, closes, benchmark_close, stock_codes):
+    """投資組合與各持股相對基準的全期與滾動指標
+
+    回傳 dict：rolling（投資組合的滾動指標，欄位為 (指標, 視窗)）、
+    latest（各名稱最新一天的滾動指標，欄位為 (指標, 視窗)）、full（各名稱全期指標）。
+    """
+    held = [code for code in stock_codes if code in closes.columns]
+    stock_returns, benchmark_returns = align_returns(closes.reindex(columns=held),
+                                                     benchmark_close, curve.index)
+    # 開始投入資金前的日子不列入計算
+    portfolio_returns = curve['return'].where(curve['deposits'] > 0)
+    returns = pd.concat([portfolio_returns.rename(PORTFOLIO_NAME), stock_returns], axis=1)
+
+    rolling = rolling_relative_metrics(returns, benchmark_returns)
+    return {
+        'rolling': rolling.xs(PORTFOLIO_NAME, axis=1, level='名稱'),
+        'latest': rolling.ffill().iloc[-1].unstack(['指標', '視窗']),
+        'full': pd.DataFrame(relative_metrics(returns, benchmark_returns)),
+    }
+
+
+def load_portfolio_performance(path=None, benchmark=DEFAULT_BENCHMARK):
+    """讀取交易紀錄並計算每日淨值、績效指標、月/季/年報酬與相對基準的指標
+
+    結果依交易紀錄檔路徑與基準快取，交易紀錄檔或日K快取檔變動（或換日）時才重新計算。
+    回傳 dict：trades、equity_curve、metrics、periods（期間代碼 -> period_returns 結果）、
+    benchmark（benchmark_analysis 結果）。
+    """
+    path = path or ledger.ORIGINAL_FILE_NAME
+    key = (path, benchmark)
+    ledger_stamp = (_file_stamp(path), date.today())
+    cached = _performance_cache.get(key)
+    if cached and cached[0] == ledger_stamp and \
+            cached[1] == _price_stamp(cached[2]['stock_codes'] + [benchmark]):
+        return cached[2]
+
+    trades = load_original_trades(path)
+    stock_codes = []
+    if not trades.empty:
+        codes = pd.to_numeric(trades['代號'], errors='coerce').dropna().astype('int64')
+        stock_codes = [str(code) for code in codes.unique()]
+    closes = load_close_panel(stock_codes, trades['交易日期'].min()) \
+        if stock_codes else pd.DataFrame()
+    curve = build_equity_curve(trades, closes)
+
+    metrics = {**calculate_performance_metrics(trades=trades), **calculate_portfolio_metrics(curve)}
+    analysis = {}
+    if not curve.empty:
+        analysis = benchmark_analysis(curve, closes, load_benchmark(benchmark, curve.index[0]),
+                                      held_codes(trades))
+        metrics.update(analysis['full'].loc[PORTFOLIO_NAME, RELATIVE_METRICS].to_dict())
+
+    performance = {
+        'trades': trades,
+        'stock_codes': stock_codes,
+        'equity_curve': curve,
+        'metrics': metrics,
+        'periods': {period: period_returns(curve, period) for period in PERIODS.values()},
+        'benchmark': analysis,
+    }
+    # 讀取收盤價時可能下載並寫入日K快取，於計算後再記錄檔案狀態
+    _performance_cache[key] = (ledger_stamp, _price_stamp(stock_codes + [benchmark]), performance)
+    return performance
@@ -0,0 +1,232 @@
+"""盤中即時報價：向證交所 MIS 報價端點批次查詢多檔股票，解碼到預先配置的陣列表
+
+一次請求最多 MIS_BATCH_SIZE 檔（上市 tse_、上櫃 otc_ 可混合查詢），每輪輪詢約為
+股票數 / MIS_BATCH_SIZE 個請求。離線測試可用 RecordedSession 重播錄製的輪詢結果。
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from .lazy import LazyImport
+from .market import format_stock_code
+
+requests = LazyImport(globals(), 'requests', 'requests')
+
+MIS_URL = "https://mis.twse.com.tw/stock/api/getStockInfo.jsp"
+MIS_HOME = "https://mis.twse.com.tw/stock/index.jsp"
+MIS_BATCH_SIZE = 50      # 每個請求查詢的股票數
+REALTIME_INTERVAL = 5    # 盤中輪詢間隔（秒）
+
+# 報價表欄位（成交量單位為張）；traded 為 1 表示現價為成交價，0 表示尚無成交、以委買/委賣價代替
+QUOTE_FIELDS = ['price', 'change', 'change_pct', 'volume', 'open', 'high', 'low',
+                'prev_close', 'time', 'traded']
+_FIELD = {name: i for i, name in enumerate(QUOTE_FIELDS)}
+
+
+def mis_channel(stock_code):
+    """MIS 查詢代碼：上市為 tse_2330.tw，上櫃為 otc_6488.tw"""
+    code = str(stock_code)
+    market = 'otc' if format_stock_code(code).endswith('.TWO') else 'tse'
+    return f"{market}_{code}.tw"
+
+
+def message_channel(msg):
+    """MIS 回應中單一股票的查詢代碼（ex 為 tse/otc，ch 為 2330.tw）"""
+    if msg.get('ex') and msg.get('ch'):
+        return f"{msg['ex']}_{msg['ch']}"
+    return mis_channel(msg.get('c', ''))
+
+
+def _number(value):
+    """MIS 數值欄位轉 float（'-' 或空白為 NaN）"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _first_quote(value):
+    """最佳五檔字串（以 _ 分隔）的第一檔價格"""
+    return _number(value.split('_')[0]) if value else np.nan
+
+
+def parse_mis_payload(messages):
+    """解碼 MIS 回應的 msgArray，回傳 (代號列表, 名稱列表, 數值陣列)
+
+    尚無成交時現價以最佳買價（或賣價）代替並將 traded 設為 0；數值陣列欄位順序同 QUOTE_FIELDS。
+    """
+    codes, names = [], []
+    block = np.full((len(messages), len(QUOTE_FIELDS)), np.nan)
+    for i, msg in enumerate(messages):
+        codes.append(msg.get('c', ''))
+        names.append(msg.get('n', ''))
+        price = _number(msg.get('z'))
+        traded = not np.isnan(price)
+        if not traded:
+            price = _first_quote(msg.get('b')) if msg.get('b') else _first_quote(msg.get('a'))
+        block[i, _FIELD['price']] = price
+        block[i, _FIELD['traded']] = float(traded)
+        block[i, _FIELD['volume']] = _number(msg.get('v'))
+        block[i, _FIELD['open']] = _number(msg.get('o'))
+        block[i, _FIELD['high']] = _number(msg.get('h'))
+        block[i, _FIELD['low']] = _number(msg.get('l'))
+        block[i, _FIELD['prev_close']] = _number(msg.get('y'))
+        block[i, _FIELD['time']] = _number(msg.get('tlong')) / 1000
+
+    # 漲跌與漲跌幅整批計算
+    prev = block[:, _FIELD['prev_close']]
+    block[:, _FIELD['change']] = block[:, _FIELD['price']] - prev
+    with np.errstate(divide='ignore', invalid='ignore'):
+        block[:, _FIELD['change_pct']] = block[:, _FIELD['change']] / prev * 100
+    return codes, names, block
+
+
+class QuoteTable:
+    """即時報價表：預先配置的 NumPy 陣列（股票 × QUOTE_FIELDS），以代號對應列號
+
+    輪詢只改寫既有的列，不重新配置；新增股票超過容量時容量加倍。
+    """
+
+    def __init__(self, symbols=(), capacity=256):
+        self.values = np.full((capacity, len(QUOTE_FIELDS)), np.nan)
+        self.names = [''] * capacity
+        self.index = {}
+        self.lock = threading.Lock()
+        self.add(symbols)
+
+    def add(self, symbols):
+        """加入股票（已存在的略過），回傳各股票的列號"""
+        with self.lock:
+            for code in map(str, symbols):
+                if code in self.index:
+                    continue
+                if len(self.index) == len(self.values):
+                    grown = np.full((len(self.values) * 2, len(QUOTE_FIELDS)), np.nan)
+                    grown[:len(self.values)] = self.values
+                    self.values = grown
+                    self.names.extend([''] * len(self.names))
+                self.index[code] = len(self.index)
+            return np.array([self.index[str(code)] for code in symbols], dtype=np.intp)
+
+    @property
+    def symbols(self):
+        return list(self.index)
+
+    def update(self, codes, names, block):
+        """寫入一批報價（不在表中的代號略過），回傳有更新的代號"""
+        with self.lock:
+            known = [i for i, code in enumerate(codes) if code in self.index]
+            rows = np.array([self.index[codes[i]] for i in known], dtype=np.intp)
+            self.values[rows] = block[known]
+            for i, row in zip(known, rows):
+                self.names[row] = names[i]
+        return [codes[i] for i in known]
+
+    def get(self, stock_code):
+        """單一股票的報價 dict（尚無報價時為 None）"""
+        row = self.index.get(str(stock_code))
+        if row is None or np.isnan(self.values[row, _FIELD['price']]):
+            return None
+        with self.lock:
+            quote = dict(zip(QUOTE_FIELDS, self.values[row].tolist()))
+            quote['name'] = self.names[row]
+        return quote
+
+    def view(self, field):
+        """某欄位所有股票的值（陣列視圖，順序同 symbols）"""
+        return self.values[:len(self.index), _FIELD[field]]
+
+
+class MisSource:
+    """證交所 MIS 報價端點（同一個連線重複使用）"""
+
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+        self.session = None
+
+    def fetch(self, channels):
+        """查詢一批股票，回傳 msgArray"""
+        if self.session is None:
+            self.session = requests.Session()
+            self.session.headers['User-Agent'] = 'Mozilla/5.0'
+            # 先取得首頁 cookie，否則 MIS 可能回傳空結果
+            self.session.get(MIS_HOME, timeout=self.timeout)
+        response = self.session.get(MIS_URL, params={
+            'ex_ch': '|'.join(channels), 'json': 1, 'delay': 0,
+            '_': int(time.time() * 1000)}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get('msgArray', [])
+
+
+class RecordedSession:
+    """離線重播錄製的輪詢結果（JSON Lines，每行 {"time": 秒, "msgArray": [...]}）
+
+    依錄製時的時間間隔（乘上 speed 倍速）推進，播完後從頭重播。
+    """
+
+    def __init__(self, path, speed=1.0, clock=time.monotonic):
+        with open(path, encoding='utf-8') as f:
+            frames = [json.loads(line) for line in f if line.strip()]
+        if not frames:
+            raise ValueError(f"錄製檔沒有資料：{path}")
+        self.offsets = np.array([frame['time'] for frame in frames], dtype='float64')
+        self.offsets -= self.offsets[0]
+        self.frames = [{message_channel(msg): msg for msg in frame['msgArray']}
+                       for frame in frames]
+        self.speed = speed
+        self.clock = clock
+        self.start = clock()
+
+    def current_frame(self):
+        """依經過時間取得目前的輪詢結果（重播一輪的長度為錄製長度加一個平均間隔）"""
+        elapsed = (self.clock() - self.start) * self.speed
+        step = self.offsets[-1] / (len(self.offsets) - 1) if len(self.offsets) > 1 else 1.0
+        span = self.offsets[-1] + (step or 1.0)
+        position = np.searchsorted(self.offsets, elapsed % span, side='right') - 1
+        return self.frames[max(position, 0)]
+
+    def fetch(self, channels):
+        """回傳目前輪詢結果中所要求的股票"""
+        frame = self.current_frame()
+        return [frame[channel] for channel in channels if channel in frame]
+
+
+class QuoteFeed:
+    """批次輪詢即時報價並寫入 QuoteTable；record_path 時將每輪結果錄製成 RecordedSession 格式"""
+
+    def __init__(self, source=None, table=None, batch_size=MIS_BATCH_SIZE, record_path=None):
+        self.source = source or MisSource()
+        self.table = table or QuoteTable()
+        self.batch_size = batch_size
+        self.record_path = record_path
+        self._channels = {}  # 代號 -> MIS 查詢代碼
+
+    def add_symbols(self, symbols):
+        """加入輪詢的股票"""
+        symbols = [str(code) for code in symbols]
+        self.table.add(symbols)
+        for code in symbols:
+            if code not in self._channels:
+                self._channels[code] = mis_channel(code)
+
+    def poll(self):
+        """輪詢所有股票一次，回傳有更新的代號（單一批次失敗不影響其他批次）"""
+        channels = list(self._channels.values())
+        messages = []
+        for start in range(0, len(channels), self.batch_size):
+            try:
+                messages.extend(self.source.fetch(channels[start:start + self.batch_size]))
+            except Exception as e:
+                print(f"取得即時報價時出錯：{str(e)}")
+        if not messages:
+            return []
+
+        if self.record_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.record_path)), exist_ok=True)
+            with open(self.record_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'time': time.time(), 'msgArray': messages},
+                                   ensure_ascii=False) + "\n")
+        return self.table.update(*parse_mis_payload(messages))
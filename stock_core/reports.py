@@ -0,0 +1,206 @@
+"""無視窗批次報表：個股K線/技術指標/籌碼圖與投資組合績效輸出為 PNG 與 HTML"""
+import html
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from .charts import (ChipChart, DownsampledLine, PriceChart, TechnicalChart,
+                     create_figure_canvas)
+from .lazy import LazyImport, configure_matplotlib
+from .ledger import (build_performance_report, calculate_performance_metrics,
+                     get_stock_holdings, load_original_trades, show_stock_history)
+from .market import get_bars, load_chip_data
+from .portfolio import load_portfolio_performance
+
+pd = LazyImport(globals(), 'pd', 'pandas')
+plt = LazyImport(globals(), 'plt', 'matplotlib.pyplot', on_load=configure_matplotlib)
+mdates = LazyImport(globals(), 'mdates', 'matplotlib.dates', on_load=configure_matplotlib)
+Figure = LazyImport(globals(), 'Figure', 'matplotlib.figure', 'Figure', configure_matplotlib)
+
+
+# 批次報表設定
+REPORT_DIR = "reports"
+WATCHLIST_FILE = "watchlist.txt"  # 自選股清單，每行一個股票代號
+REPORT_INDICATORS = ['kd', 'rsi', 'macd', 'bollinger', 'volume']
+REPORT_METRICS = [("總投資金額", "total_investment"), ("總報酬", "total_return"),
+                  ("報酬率", "roi"), ("勝率", "win_rate"), ("獲利因子", "profit_factor"),
+                  ("交易次數", "total_trades"), ("獲利次數", "win_trades"),
+                  ("虧損次數", "loss_trades")]
+
+REPORT_HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-Hant">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 20px; }}
+img {{ max-width: 100%; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: right; }}
+pre {{ font-size: 12px; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>產生時間：{generated}</p>
+{body}
+</body>
+</html>
+"""
+
+
+def load_watchlist():
+    """讀取自選股清單（忽略空白行與 # 註解）"""
+    if not os.path.exists(WATCHLIST_FILE):
+        return []
+    with open(WATCHLIST_FILE, encoding='utf-8') as f:
+        lines = [line.split('#')[0].strip() for line in f]
+    return [line for line in lines if line]
+
+
+def get_report_symbols(trades=None):
+    """夜間報表的股票清單：目前持股加上自選股（去除重複）"""
+    codes = [str(code) for code in get_stock_holdings(trades)] + load_watchlist()
+    return list(dict.fromkeys(codes))
+
+
+def _save_figure(fig, output_dir, filename):
+    """將圖表存成 PNG，回傳檔名（HTML 以相對路徑引用）"""
+    fig.savefig(os.path.join(output_dir, filename), dpi=100, bbox_inches='tight')
+    return filename
+
+
+def _write_html_report(path, title, sections):
+    """輸出 HTML 報表；sections 為 [(小標題, HTML 片段)]"""
+    body = "\n".join(f"<h2>{html.escape(heading)}</h2>\n{fragment}"
+                     for heading, fragment in sections)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(REPORT_HTML_TEMPLATE.format(
+            title=html.escape(title), body=body,
+            generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+    return path
+
+
+def render_stock_report(stock_code, output_dir=REPORT_DIR, timeframe="D", indicators=None):
+    """以無視窗模式輸出單一股票的K線圖、技術指標、籌碼圖與歷史交易記錄（PNG + HTML）"""
+    stock_code = str(stock_code)
+    indicators = indicators or REPORT_INDICATORS
+    os.makedirs(output_dir, exist_ok=True)
+
+    df = get_bars(stock_code, timeframe)
+    if df.empty:
+        raise ValueError(f"無法取得 {stock_code} 的價格資料")
+
+    sections = []
+    chart = PriceChart()
+    chart.update(df, stock_code, timeframe)
+    sections.append(('K線圖', f'<img src="{_save_figure(chart.fig, output_dir, f"{stock_code}_price.png")}">'))
+
+    technical = TechnicalChart()
+    technical.fig.set_size_inches(12, 2.5 * len(indicators))
+    technical.update(df, indicators)
+    sections.append(('技術指標', f'<img src="{_save_figure(technical.fig, output_dir, f"{stock_code}_technical.png")}">'))
+
+    chip = load_chip_data(stock_code)
+    if chip is not None:
+        chip_chart = ChipChart()
+        chip_chart.update(chip['dates'], chip['foreign'], chip['trust'], chip['dealer'],
+                          chip['margin'], chip['short'], chip['holding'])
+        sections.append(('籌碼分析', f'<img src="{_save_figure(chip_chart.fig, output_dir, f"{stock_code}_chip.png")}">'))
+
+    if stock_code.isdigit():
+        sections.append(('歷史交易記錄',
+                         f"<pre>{html.escape(show_stock_history(stock_code))}</pre>"))
+
+    return _write_html_report(os.path.join(output_dir, f"{stock_code}.html"),
+                              f"{stock_code} 個股報表", sections)
+
+
+def render_portfolio_report(output_dir=REPORT_DIR):
+    """以無視窗模式輸出投資組合績效報表（累計報酬、回撤、月度報酬與績效指標）"""
+    os.makedirs(output_dir, exist_ok=True)
+    report = build_performance_report(load_original_trades())
+    sections = []
+
+    metrics = calculate_performance_metrics()
+    if metrics:
+        rows = [(label, f"{metrics[key]:,.2f}%" if key in ('roi', 'win_rate')
+                 else f"{metrics[key]:,.2f}" if key == 'profit_factor'
+                 else f"{metrics[key]:,.0f}")
+                for label, key in REPORT_METRICS if key in metrics]
+        sections.append(('績效指標', pd.DataFrame(rows, columns=['指標', '數值']).to_html(index=False)))
+
+    if len(report['dates']):
+        fig = Figure(figsize=(12, 8))
+        create_figure_canvas(fig)
+        x = mdates.date2num(report['dates'])
+        ax = fig.add_subplot(211)
+        ax.xaxis_date()
+        DownsampledLine(ax.plot([], [], marker='o')[0], x, report['cumulative'])
+        ax.relim()
+        ax.autoscale_view()
+        ax.set_title('累計報酬走勢')
+        ax.grid(True)
+        ax2 = fig.add_subplot(212, sharex=ax)
+        DownsampledLine(ax2.plot([], [], color='red')[0], x, report['drawdown'])
+        ax2.relim()
+        ax2.autoscale_view()
+        ax2.set_title('回撤分析')
+        ax2.grid(True)
+        fig.tight_layout()
+        sections.append(('報酬與回撤', f'<img src="{_save_figure(fig, output_dir, "portfolio.png")}">'))
+
+    monthly = load_portfolio_performance()['periods']['M']
+    if not monthly.empty:
+        monthly = monthly.assign(報酬率=monthly['報酬率'].map('{:.2%}'.format),
+                                 累計報酬=monthly['累計報酬'].map('{:.2%}'.format))
+        sections.append(('月度報酬率', monthly.rename(columns={'期間': '年月'}).to_html(index=False)))
+
+    return _write_html_report(os.path.join(output_dir, "portfolio.html"),
+                              "投資組合績效報表", sections)
+
+
+def _report_worker_init():
+    """報表工作程序使用無視窗的 Agg 後端"""
+    plt.switch_backend('Agg')
+
+
+def _render_report_task(args):
+    """工作程序：輸出單一報表，錯誤時記錄訊息而不中斷整批"""
+    stock_code, output_dir, timeframe = args
+    try:
+        if stock_code is None:
+            return {'代號': '投資組合', '報表': render_portfolio_report(output_dir), '錯誤': ''}
+        return {'代號': stock_code, '報表': render_stock_report(stock_code, output_dir, timeframe),
+                '錯誤': ''}
+    except Exception as e:
+        return {'代號': stock_code or '投資組合', '報表': '', '錯誤': str(e)}
+
+
+def run_batch_reports(stock_codes=None, output_dir=REPORT_DIR, timeframe="D", workers=None,
+                      progress=None):
+    """以多程序批次輸出投資組合與各股票報表，並產生索引頁 index.html
+
+    stock_codes 預設為目前持股加自選股；回傳每份報表的結果（代號、報表路徑、錯誤）。
+    """
+    stock_codes = get_report_symbols() if stock_codes is None else [str(c) for c in stock_codes]
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [(None, output_dir, timeframe)] + [(code, output_dir, timeframe) for code in stock_codes]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                             initializer=_report_worker_init) as executor:
+        for result in executor.map(_render_report_task, tasks):
+            results.append(result)
+            if result['錯誤']:
+                print(f"輸出 {result['代號']} 報表時出錯：{result['錯誤']}")
+            if progress:
+                progress(len(results), len(tasks))
+
+    items = "\n".join(
+        f'<li><a href="{html.escape(os.path.basename(r["報表"]))}">{html.escape(r["代號"])}</a></li>'
+        if r['報表'] else f"<li>{html.escape(r['代號'])}：{html.escape(r['錯誤'])}</li>"
+        for r in results)
+    _write_html_report(os.path.join(output_dir, "index.html"), "每日報表",
+                       [('報表列表', f"<ul>\n{items}\n</ul>")])
+    return pd.DataFrame(results)
@@ -0,0 +1,242 @@
+"""風險控管：風險參數設定檔、下單前風險檢查，以及持股停損/停利與自訂價格警示
+
+ExposureBook 以持股成本累計各股票與整體部位，每筆交易只增減一個股票的部位與總部位，
+下單前的單筆金額、單一標的集中度與資金使用率檢查皆為 O(1)。
+
+AlertEngine 將每個警示規則存成陣列的一列（股票列號、比較方向、門檻），每次報價更新時
+以一次陣列比較檢查所有持股與規則；同一規則觸發後需價格回到門檻外（含緩衝）才會再次通知，
+且兩次通知至少相隔 ALERT_COOLDOWN 秒。
+"""
+import heapq
+import json
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from .realtime import QUOTE_FIELDS
+
+RISK_SETTINGS_FILE = "risk_settings.json"
+DEFAULT_RISK_SETTINGS = {
+    'stop_loss': 20.0,     # 停損比例（%，相對平均成本）
+    'take_profit': 20.0,   # 停利比例（%，相對平均成本）
+    'max_trade_amount': 500000.0,    # 單筆交易上限（元）
+    'total_capital': 1000000.0,      # 總資金（元），資金使用率與部位比例的分母
+    'max_capital_usage': 80.0,       # 資金使用率上限（%）
+    'max_position_pct': 30.0,        # 單一標的部位上限（%，相對總資金）
+    'warning_level': "超限阻擋",
+}
+# 風險警告等級：超限時阻擋下單，或提醒後由使用者決定
+RISK_LEVELS = {"超限阻擋": 'block', "僅提醒": 'warn'}
+ALERT_COOLDOWN = 300       # 同一規則兩次通知的最短間隔（秒）
+ALERT_HYSTERESIS = 0.01    # 價格需回到門檻外 1% 才重新啟用規則
+
+# 比較方向：價格跌破門檻或漲破門檻
+BELOW, ABOVE = 0, 1
+# 觸發時的建議：停損/停利依種類，自訂價位依方向（跌破提醒買進、漲破提醒賣出）
+ALERT_ACTIONS = {
+    "停損": "建議停損賣出以控制虧損",
+    "停利": "可考慮停利賣出、落袋為安",
+    BELOW: "可考慮逢低買進",
+    ABOVE: "可考慮逢高賣出",
+}
+
+Alert = namedtuple('Alert', ['code', 'name', 'kind', 'price', 'threshold', 'message'])
+
+
+def load_risk_settings(path=RISK_SETTINGS_FILE):
+    """讀取風險參數（缺少的欄位使用預設值）"""
+    settings = dict(DEFAULT_RISK_SETTINGS)
+    if os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                settings.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"讀取風險參數時出錯：{str(e)}")
+    return settings
+
+
+def save_risk_settings(settings, path=RISK_SETTINGS_FILE):
+    """儲存風險參數"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, ensure_ascii=False, indent=2)
+
+
+def validate_risk_settings(settings):
+    """檢查風險參數，不合理時拋出 ValueError"""
+    for key, value in settings.items():
+        if key != 'warning_level' and not value > 0:
+            raise ValueError("風險參數需大於 0")
+    if settings['stop_loss'] >= 100:
+        raise ValueError("停損比例需小於 100%")
+    if settings['max_capital_usage'] > 100 or settings['max_position_pct'] > 100:
+        raise ValueError("資金使用率與單一標的部位上限不可超過 100%")
+    if settings['warning_level'] not in RISK_LEVELS:
+        raise ValueError(f"未知的風險警告等級：{settings['warning_level']}")
+
+
+class ExposureBook:
+    """各股票與整體的持股成本部位（元），交易時增量更新"""
+
+    def __init__(self, holdings=None):
+        self.exposure = {}
+        self.total = 0.0
+        for code, info in (holdings or {}).items():
+            self.apply(code, info['shares'] * info['avg_cost'])
+
+    def apply(self, code, amount):
+        """記錄一筆交易的成本變動（買入為正、賣出為負）"""
+        code = str(code)
+        self.exposure[code] = self.exposure.get(code, 0.0) + amount
+        self.total += amount
+
+    def check(self, code, amount, settings):
+        """下單前檢查，回傳違反的限制說明（空列表表示通過）"""
+        capital = settings['total_capital']
+        violations = []
+        if amount > settings['max_trade_amount']:
+            violations.append(f"單筆交易金額 {amount:,.0f} 元超過上限 "
+                              f"{settings['max_trade_amount']:,.0f} 元")
+        position = (self.exposure.get(str(code), 0.0) + amount) / capital * 100
+        if position > settings['max_position_pct']:
+            violations.append(f"{code} 部位將達總資金 {position:.1f}%，超過上限 "
+                              f"{settings['max_position_pct']:g}%")
+        usage = (self.total + amount) / capital * 100
+        if usage > settings['max_capital_usage']:
+            violations.append(f"資金使用率將達 {usage:.1f}%，超過上限 "
+                              f"{settings['max_capital_usage']:g}%")
+        return violations
+
+    def utilization(self, settings, top=5):
+        """各項限制的使用率：[(名稱, 目前 %, 上限 %)]，含資金使用率與部位最大的 top 檔股票"""
+        capital = settings['total_capital']
+        rows = [("資金使用率", self.total / capital * 100, settings['max_capital_usage'])]
+        largest = heapq.nlargest(top, self.exposure.items(), key=lambda item: item[1])
+        rows.extend((code, amount / capital * 100, settings['max_position_pct'])
+                    for code, amount in largest if amount > 0)
+        return rows
+
+
+def stop_prices(avg_cost, stop_loss, take_profit):
+    """停損價與停利價（比例為 %），可傳入陣列"""
+    avg_cost = np.asarray(avg_cost, dtype='float64')
+    return avg_cost * (1 - stop_loss / 100), avg_cost * (1 + take_profit / 100)
+
+
+class AlertEngine:
+    """持股停損/停利與自訂價格警示：規則以陣列儲存，每次報價以向量化比較一次檢查"""
+
+    def __init__(self, cooldown=ALERT_COOLDOWN, hysteresis=ALERT_HYSTERESIS, clock=time.time):
+        self.cooldown = cooldown
+        self.hysteresis = hysteresis
+        self.clock = clock
+        self.symbols = []
+        self.names = []
+        self.index = {}
+        self.positions = {}   # 代號 -> {'shares', 'avg_cost', 'stop_loss', 'take_profit'}
+        self.custom_rules = []
+        self._rules = None
+        self._table_rows = (None, 0, 0, None)  # (報價表, 股票數, 表股票數, 列號)
+
+    def set_positions(self, holdings, stop_loss=DEFAULT_RISK_SETTINGS['stop_loss'],
+                      take_profit=DEFAULT_RISK_SETTINGS['take_profit']):
+        """由 get_stock_holdings 的結果設定持股停損/停利規則（保留自訂規則與已觸發狀態）"""
+        codes = [str(code) for code in holdings]
+        avg_cost = np.array([holdings[code]['avg_cost'] for code in holdings], dtype='float64')
+        stop, take = stop_prices(avg_cost, stop_loss, take_profit)
+        self.positions = {
+            code: {'name': info['name'], 'shares': info['shares'], 'avg_cost': cost,
+                   'stop_loss': s, 'take_profit': t}
+            for code, info, cost, s, t in zip(codes, holdings.values(), avg_cost, stop, take)}
+        self._rebuild()
+
+    def add_rule(self, code, direction, threshold, kind="價格警示", name=""):
+        """新增自訂價位規則：direction 為 BELOW（跌破，提醒買進）或 ABOVE（漲破，提醒賣出）"""
+        self.custom_rules.append((str(code), direction, float(threshold), kind, name))
+        self._rebuild()
+
+    def _symbol_row(self, code, name=""):
+        if code not in self.index:
+            self.index[code] = len(self.symbols)
+            self.symbols.append(code)
+            self.names.append(name)
+        return self.index[code]
+
+    def _rebuild(self):
+        """重建規則陣列；門檻與方向相同的規則沿用原本的觸發狀態"""
+        rules = []
+        for code, info in self.positions.items():
+            rules.append((code, BELOW, info['stop_loss'], "停損", info['name']))
+            rules.append((code, ABOVE, info['take_profit'], "停利", info['name']))
+        rules.extend(self.custom_rules)
+
+        old = self._rules
+        previous = {}
+        if old is not None:
+            for i, key in enumerate(zip(old['row'], old['direction'], old['threshold'])):
+                previous[key] = (old['armed'][i], old['last'][i])
+
+        rows = np.array([self._symbol_row(code, name) for code, _, _, _, name in rules],
+                        dtype=np.intp)
+        direction = np.array([rule[1] for rule in rules], dtype=np.int8)
+        threshold = np.array([rule[2] for rule in rules], dtype='float64')
+        state = [previous.get(key, (True, -np.inf))
+                 for key in zip(rows, direction, threshold)]
+        self._rules = {
+            'row': rows,
+            'direction': direction,
+            'threshold': threshold,
+            'kind': [rule[3] for rule in rules],
+            'armed': np.array([s[0] for s in state], dtype=bool),
+            'last': np.array([s[1] for s in state], dtype='float64'),
+        }
+
+    def rule_count(self):
+        return 0 if self._rules is None else len(self._rules['row'])
+
+    def check(self, prices, now=None):
+        """檢查所有規則；prices 為與 symbols 同順序的最新價格陣列（NaN 表示無報價）
+
+        回傳這次新觸發的警示（已觸發而價格尚未回到門檻外的規則不會重複通知）。
+        """
+        rules = self._rules
+        if rules is None or not len(rules['row']):
+            return []
+        now = self.clock() if now is None else now
+        prices = np.asarray(prices, dtype='float64')
+        price = prices[rules['row']]
+        threshold = rules['threshold']
+        below = rules['direction'] == BELOW
+
+        with np.errstate(invalid='ignore'):
+            triggered = np.where(below, price <= threshold, price >= threshold)
+            cleared = np.where(below, price > threshold * (1 + self.hysteresis),
+                               price < threshold * (1 - self.hysteresis))
+        fire = triggered & rules['armed'] & (now - rules['last'] >= self.cooldown)
+        rules['armed'] = (rules['armed'] & ~fire) | cleared
+        rules['last'][fire] = now
+
+        alerts = []
+        for i in np.flatnonzero(fire):
+            code = self.symbols[rules['row'][i]]
+            name = self.names[rules['row'][i]]
+            kind = rules['kind'][i]
+            action = ALERT_ACTIONS.get(kind, ALERT_ACTIONS[int(rules['direction'][i])])
+            alerts.append(Alert(code, name, kind, price[i], threshold[i],
+                                f"{code} {name} 現價 {price[i]:.2f} "
+                                f"{'跌破' if below[i] else '漲破'}{kind}價 {threshold[i]:.2f}，{action}"))
+        return alerts
+
+    def check_table(self, table, now=None):
+        """以 realtime.QuoteTable 的最新價格檢查（不在表中的股票視為無報價）"""
+        cached_table, symbols, table_symbols, rows = self._table_rows
+        if cached_table is not table or symbols != len(self.symbols) \
+                or table_symbols != len(table.index):
+            # 報價表的列號不會變動，只在股票增加時重新對應
+            rows = np.array([table.index.get(code, -1) for code in self.symbols], dtype=np.intp)
+            self._table_rows = (table, len(self.symbols), len(table.index), rows)
+        prices = np.full(len(rows), np.nan)
+        found = rows >= 0
+        prices[found] = table.values[rows[found], QUOTE_FIELDS.index('price')]
+        return self.check(prices, now)
@@ -0,0 +1,220 @@
+"""定時更新排程：台股交易時段判斷與集中式更新排程器
+
+每個資料流（如某檔股票的報價）只有一個計時器；多個訂閱者以參考計數共用同一次抓取，
+更新進行中再收到的更新要求會合併，不會重複抓取。
+計時器與背景執行由呼叫端提供（視窗程式傳入 root.after / after_cancel），本模組不依賴 tkinter。
+"""
+import os
+from datetime import datetime, time as time_obj, timedelta
+
+# 台股交易時段（含 8:30 起的試撮）；收盤後一小時內仍會更新以取得收盤價
+MARKET_OPEN = time_obj(8, 30)
+MARKET_CLOSE = time_obj(13, 30)
+POST_CLOSE = time_obj(14, 30)
+HOLIDAYS_FILE = "market_holidays.txt"  # 休市日清單，每行一個日期（YYYY-MM-DD）
+
+QUOTE_INTERVAL = 60         # 盤中報價更新間隔（秒）
+POST_CLOSE_INTERVAL = 300   # 收盤後更新間隔（秒）
+
+_holidays = {}  # 檔案路徑 -> (修改時間, 休市日集合)
+
+
+def load_market_holidays(path=HOLIDAYS_FILE):
+    """讀取休市日清單（忽略空白行與 # 註解），檔案未變動時使用快取"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return set()
+    cached = _holidays.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    days = set()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#')[0].strip()
+            if line:
+                try:
+                    days.add(datetime.strptime(line.replace('/', '-'), "%Y-%m-%d").date())
+                except ValueError:
+                    print(f"休市日格式錯誤：{line}")
+    _holidays[path] = (mtime, days)
+    return days
+
+
+def is_trading_day(day, holidays=None):
+    """是否為交易日（週一至週五且不在休市日清單中）"""
+    holidays = load_market_holidays() if holidays is None else holidays
+    return day.weekday() < 5 and day not in holidays
+
+
+def market_phase(now=None, holidays=None):
+    """目前的市場狀態：'open'（盤中）、'post'（收盤後一小時內）或 'closed'"""
+    now = now or datetime.now()
+    if not is_trading_day(now.date(), holidays):
+        return 'closed'
+    if MARKET_OPEN <= now.time() <= MARKET_CLOSE:
+        return 'open'
+    if MARKET_CLOSE < now.time() <= POST_CLOSE:
+        return 'post'
+    return 'closed'
+
+
+def next_market_open(now=None, holidays=None):
+    """下一次開盤時間（今天尚未開盤時為今天）"""
+    now = now or datetime.now()
+    holidays = load_market_holidays() if holidays is None else holidays
+    day = now.date()
+    if now.time() >= MARKET_OPEN:
+        day += timedelta(days=1)
+    while not is_trading_day(day, holidays):
+        day += timedelta(days=1)
+    return datetime.combine(day, MARKET_OPEN)
+
+
+def refresh_delay(interval, now=None, holidays=None):
+    """依交易時段調整更新間隔（秒）：盤中依 interval，收盤後放慢，休市時等到下次開盤"""
+    now = now or datetime.now()
+    phase = market_phase(now, holidays)
+    if phase == 'open':
+        return interval
+    if phase == 'post':
+        return max(interval, POST_CLOSE_INTERVAL)
+    return max(interval, (next_market_open(now, holidays) - now).total_seconds())
+
+
+def run_now(task, on_done, on_error):
+    """在目前執行緒直接執行（未提供背景執行函式時使用）"""
+    try:
+        result = task()
+    except Exception as e:
+        on_error(e)
+        return
+    on_done(result)
+
+
+class _Stream:
+    """單一資料流：抓取函式、訂閱者（回呼 -> 參考計數）與計時器狀態"""
+
+    def __init__(self, fetch, interval):
+        self.fetch = fetch
+        self.interval = interval
+        self.subscribers = {}
+        self.error_handlers = {}
+        self.timer = None
+        self.in_flight = False
+        self.last_result = None
+
+
+class RefreshScheduler:
+    """集中式更新排程器：每個資料流一個計時器，訂閱者參考計數，進行中的更新要求合併
+
+    call_later(毫秒, 函式) 回傳計時器代號，cancel(代號) 取消計時器；
+    run_async(task, on_done, on_error) 在背景執行抓取並於主執行緒回呼，預設直接執行。
+    """
+
+    def __init__(self, call_later, cancel, run_async=None, clock=None):
+        self.call_later = call_later
+        self.cancel = cancel
+        self.run_async = run_async or run_now
+        self.clock = clock or datetime.now
+        self._streams = {}
+        self.stats = {'fetches': 0, 'coalesced': 0, 'errors': 0}
+
+    def subscribe(self, key, fetch, callback, interval=QUOTE_INTERVAL, on_error=None,
+                  immediate=True):
+        """訂閱資料流；同一 key 只保留第一次提供的抓取函式，第一位訂閱者加入時開始排程
+
+        immediate 為 False 時等到下一次排程才更新（呼叫端已自行取得最新資料時使用）。
+        """
+        stream = self._streams.get(key)
+        is_new = stream is None
+        if is_new:
+            stream = self._streams[key] = _Stream(fetch, interval)
+        stream.interval = min(stream.interval, interval)
+        stream.subscribers[callback] = stream.subscribers.get(callback, 0) + 1
+        if on_error:
+            stream.error_handlers[callback] = on_error
+
+        if is_new:
+            if immediate:
+                self.refresh(key)
+            else:
+                self._schedule(key, stream)
+        elif immediate and stream.last_result is not None:
+            callback(stream.last_result)
+
+    def unsubscribe(self, key, callback):
+        """取消訂閱；最後一位訂閱者離開時停止計時器並移除資料流"""
+        stream = self._streams.get(key)
+        if stream is None or callback not in stream.subscribers:
+            return
+        stream.subscribers[callback] -= 1
+        if stream.subscribers[callback] <= 0:
+            del stream.subscribers[callback]
+            stream.error_handlers.pop(callback, None)
+        if not stream.subscribers:
+            self._cancel_timer(stream)
+            del self._streams[key]
+
+    def refresh(self, key):
+        """立即更新資料流（已在更新中時合併為同一次）"""
+        stream = self._streams.get(key)
+        if stream is None:
+            return
+        if stream.in_flight:
+            self.stats['coalesced'] += 1
+            return
+        self._cancel_timer(stream)
+        stream.in_flight = True
+        self.stats['fetches'] += 1
+        self.run_async(stream.fetch,
+                       lambda result: self._deliver(key, stream, result),
+                       lambda error: self._fail(key, stream, error))
+
+    def active_streams(self):
+        """目前的資料流與訂閱數：{key: 參考計數總和}"""
+        return {key: sum(stream.subscribers.values()) for key, stream in self._streams.items()}
+
+    def stop(self):
+        """停止所有計時器"""
+        for stream in self._streams.values():
+            self._cancel_timer(stream)
+        self._streams.clear()
+
+    def _deliver(self, key, stream, result):
+        stream.in_flight = False
+        if self._streams.get(key) is not stream:
+            return  # 更新期間已無訂閱者
+        stream.last_result = result
+        for callback in list(stream.subscribers):
+            try:
+                callback(result)
+            except Exception as e:
+                print(f"更新 {key} 時出錯：{str(e)}")
+        self._schedule(key, stream)
+
+    def _fail(self, key, stream, error):
+        stream.in_flight = False
+        if self._streams.get(key) is not stream:
+            return
+        self.stats['errors'] += 1
+        print(f"更新 {key} 時出錯：{str(error)}")
+        for handler in list(stream.error_handlers.values()):
+            handler(error)
+        self._schedule(key, stream)
+
+    def _schedule(self, key, stream):
+        self._cancel_timer(stream)
+        delay = refresh_delay(stream.interval, self.clock())
+        stream.timer = self.call_later(int(delay * 1000), lambda: self._on_timer(key, stream))
+
+    def _on_timer(self, key, stream):
+        stream.timer = None
+        if self._streams.get(key) is stream:
+            self.refresh(key)
+
+    def _cancel_timer(self, stream):
+        if stream.timer is not None:
+            self.cancel(stream.timer)
+            stream.timer = None
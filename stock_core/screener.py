@@ -0,0 +1,125 @@
+"""全市場選股：條件註冊與平行篩選"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .indicators import calculate_kd, calculate_rsi
+from .lazy import LazyImport
+from .market import get_foreign_net_buy, load_stock_universe, read_daily_bars
+
+pd = LazyImport(globals(), 'pd', 'pandas')
+
+# 全市場選股設定
+SCREEN_LOOKBACK = 120   # 每檔股票只取最近 120 根日K評估條件
+SCREEN_MIN_BARS = 30
+
+# 選股條件：函式簽名為 (日K, 代號, 參數, 共用資料) -> bool
+# 自訂條件需在模組層級註冊，平行運算的子程序才找得到
+SCREEN_CONDITIONS = {}
+
+
+def register_screen_condition(name):
+    """註冊選股條件的裝飾器"""
+    def decorator(func):
+        SCREEN_CONDITIONS[name] = func
+        return func
+    return decorator
+
+
+@register_screen_condition("KD黃金交叉")
+def screen_kd_golden_cross(df, code, params, context):
+    """K 值由下往上穿越 D 值"""
+    k, d = calculate_kd(df, params.get('n', 9))
+    return k.iloc[-2] <= d.iloc[-2] and k.iloc[-1] > d.iloc[-1]
+
+
+@register_screen_condition("RSI低於門檻")
+def screen_rsi_below(df, code, params, context):
+    """RSI 低於門檻（預設 30）"""
+    rsi = calculate_rsi(df, params.get('period', 14))
+    return rsi.iloc[-1] < params.get('threshold', 30)
+
+
+@register_screen_condition("站上均線")
+def screen_above_ma(df, code, params, context):
+    """收盤價高於均線（預設 MA60）"""
+    period = params.get('period', 60)
+    if len(df) < period:
+        return False
+    ma = df['Close'].rolling(window=period).mean()
+    return df['Close'].iloc[-1] > ma.iloc[-1]
+
+
+@register_screen_condition("外資連續買超")
+def screen_foreign_net_buy(df, code, params, context):
+    """外資連續 N 日買超（僅上市股票有 T86 資料）"""
+    days = params.get('days', 3)
+    net = context.get('foreign', {}).get(code, [])
+    return len(net) >= days and all(x > 0 for x in net[-days:])
+
+
+def _screen_shard(rows, conditions, context, min_match):
+    """在子程序中評估一組股票"""
+    results = []
+    for code, name, symbol in rows:
+        try:
+            df = read_daily_bars(symbol)
+        except Exception:
+            continue
+        if df is None or len(df) < SCREEN_MIN_BARS:
+            continue
+        df = df.iloc[-SCREEN_LOOKBACK:]
+
+        matched = []
+        for cond_name, params in conditions:
+            try:
+                if SCREEN_CONDITIONS[cond_name](df, code, params, context):
+                    matched.append(cond_name)
+            except Exception:
+                continue
+
+        if len(matched) >= min_match:
+            close = df['Close'].iloc[-1]
+            prev_close = df['Close'].iloc[-2]
+            results.append({
+                "代號": code,
+                "股票": name,
+                "收盤價": close,
+                "漲跌幅": (close / prev_close - 1) * 100 if prev_close else 0,
+                "成交量": df['Volume'].iloc[-1],
+                "成交值": close * df['Volume'].iloc[-1],
+                "符合條件數": len(matched),
+                "符合條件": "、".join(matched)
+            })
+    return results
+
+
+def run_screener(conditions, universe=None, min_match=None, workers=None):
+    """以多程序平行掃描全市場，回傳依符合條件數與成交值排序的結果
+
+    conditions 為 [(條件名稱, 參數 dict), ...]；min_match 預設為全部符合。
+    """
+    if universe is None:
+        universe = load_stock_universe()
+    min_match = len(conditions) if min_match is None else min_match
+    context = {}
+    if any(name == "外資連續買超" for name, _ in conditions):
+        days = max(p.get('days', 3) for n, p in conditions if n == "外資連續買超")
+        context['foreign'] = get_foreign_net_buy(days)
+
+    rows = list(universe[["代號", "股票", "symbol"]].itertuples(index=False, name=None))
+    workers = workers or os.cpu_count() or 1
+    # 分片數多於程序數，讓各程序負載平均
+    shard_count = min(len(rows), workers * 4) or 1
+    shards = [rows[i::shard_count] for i in range(shard_count)]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_screen_shard, shard, conditions, context, min_match)
+                   for shard in shards]
+        for future in futures:
+            results.extend(future.result())
+
+    columns = ["代號", "股票", "收盤價", "漲跌幅", "成交量", "成交值", "符合條件數", "符合條件"]
+    result_df = pd.DataFrame(results, columns=columns)
+    return result_df.sort_values(["符合條件數", "成交值"], ascending=False,
+                                 ignore_index=True)
@@ -0,0 +1,386 @@
+"""本機 HTTP 報價與投資組合服務：多台電腦共用同一份快取，同一檔股票的同時請求只向上游抓一次
+
+使用方式：python -m stock_core serve [--host 127.0.0.1] [--port 8765] [--replay ohlcv_cache]
+
+端點（GET，回傳 JSON）：
+    /quote/<代號>                      最新收盤價與漲跌
+    /bars/<代號>?timeframe=D           K線（D/W/M）
+    /indicators/<代號>?timeframe=D     最新技術指標
+    /chip/<代號>                       籌碼資料
+    /holdings                          目前持股、市值與未實現損益
+    /history/<代號>                    個股歷史交易記錄
+    /metrics?symbol=<代號>             績效指標（未指定時計算全部交易）
+    /stats                             快取命中、合併請求與上游抓取次數
+"""
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import ledger
+from .cli import history_snapshot, holdings_snapshot, to_jsonable
+from .indicators import latest_indicators
+from .lazy import LazyImport
+from .ledger import calculate_performance_metrics, load_original_trades
+from .market import (DAILY_REFRESH_SECONDS, TIMEFRAMES, chip_data_from_bars, format_stock_code,
+                     get_bars, get_stock_name, load_chip_data, resample_bars)
+
+pd = LazyImport(globals(), 'pd', 'pandas')
+yf = LazyImport(globals(), 'yf', 'yfinance')
+
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+
+# 各類資料在共用快取中的有效秒數
+CACHE_TTL = {
+    'bars': DAILY_REFRESH_SECONDS,
+    'indicators': DAILY_REFRESH_SECONDS,
+    'chip': 300,
+    'name': 24 * 60 * 60,
+    'trades': 5,  # 交易紀錄另外以檔案修改時間判斷是否過期
+}
+
+
+class SingleFlight:
+    """合併同時進行的相同請求：同一個 key 只執行一次，其他呼叫等待並共用結果（或例外）"""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        """執行 func() 或等待進行中的相同請求，回傳 (結果, 是否為合併的請求)"""
+        with self._lock:
+            call = self._calls.get(key)
+            shared = call is not None
+            if not shared:
+                call = self._calls[key] = self._Call()
+
+        if shared:
+            call.done.wait()
+        else:
+            try:
+                call.result = func()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result, shared
+
+
+class SharedCache:
+    """有效期限快取 + 請求合併：過期或不存在時只有一個執行緒向上游載入"""
+
+    def __init__(self, ttl=None):
+        self.ttl = dict(CACHE_TTL if ttl is None else ttl)
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (到期時間, 值)
+        self._flight = SingleFlight()
+        self.stats = {'hits': 0, 'loads': 0, 'coalesced': 0, 'errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, key, loader):
+        """取得 key 的值；key 的第一個元素為資料類別，決定有效秒數"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.stats['hits'] += 1
+                return entry[1]
+
+        def load():
+            self._count('loads')
+            value = loader()
+            with self._lock:
+                self._entries[key] = (time.monotonic() + self.ttl.get(key[0], 60), value)
+            return value
+
+        try:
+            value, shared = self._flight.do(key, load)
+        except Exception:
+            self._count('errors')
+            raise
+        if shared:
+            self._count('coalesced')
+        return value
+
+    def clear(self):
+        """清除所有快取"""
+        with self._lock:
+            self._entries.clear()
+
+
+class LiveProvider:
+    """上游資料來源：Yahoo Finance（經由日K快取）"""
+
+    def __init__(self):
+        self.fetches = 0  # 向上游抓取的次數（統計用）
+
+    def bars(self, stock_code, timeframe="D"):
+        """K線"""
+        self.fetches += 1
+        return get_bars(stock_code, timeframe)
+
+    def name(self, stock_code):
+        """股票名稱"""
+        self.fetches += 1
+        return get_stock_name(yf.Ticker(format_stock_code(stock_code)))
+
+    def chip(self, stock_code):
+        """籌碼資料"""
+        self.fetches += 1
+        return load_chip_data(stock_code)
+
+
+class ReplayProvider:
+    """離線重播資料來源：讀取錄製好的日K檔（與 ohlcv_cache 相同格式：<代碼>.csv）
+
+    latency 模擬上游延遲（秒），供離線壓力測試驗證請求合併與快取效果。
+    """
+
+    def __init__(self, directory, latency=0.0):
+        self.directory = directory
+        self.latency = latency
+        self.fetches = 0
+        self._lock = threading.Lock()
+
+    def _daily(self, stock_code):
+        """讀取錄製的日K，不存在時回傳空的 DataFrame"""
+        with self._lock:
+            self.fetches += 1
+        if self.latency:
+            time.sleep(self.latency)
+        stock_code = str(stock_code)
+        formatted_code = stock_code if '.' in stock_code else format_stock_code(stock_code)
+        path = os.path.join(self.directory, f"{formatted_code}.csv")
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        return pd.read_csv(path, index_col=0, parse_dates=True)
+
+    def bars(self, stock_code, timeframe="D"):
+        """K線（週/月K由日K推導）"""
+        daily = self._daily(stock_code)
+        return daily if timeframe == "D" or daily.empty else resample_bars(daily, timeframe)
+
+    def name(self, stock_code):
+        """錄製資料沒有股票名稱"""
+        return ''
+
+    def chip(self, stock_code):
+        """由最近5根日K推估籌碼資料"""
+        daily = self._daily(stock_code)
+        return chip_data_from_bars(daily.tail(5)) if not daily.empty else None
+
+
+class QuoteService:
+    """服務邏輯：所有資料都經過共用快取"""
+
+    def __init__(self, provider=None, cache=None, ledger_path=None):
+        self.provider = provider or LiveProvider()
+        self.cache = cache or SharedCache()
+        self.ledger_path = ledger_path or ledger.ORIGINAL_FILE_NAME
+
+    def bars(self, stock_code, timeframe="D"):
+        """K線 DataFrame"""
+        return self.cache.get(('bars', stock_code, timeframe),
+                              lambda: self.provider.bars(stock_code, timeframe))
+
+    def quote(self, stock_code):
+        """最新收盤價、漲跌與成交量"""
+        bars = self.bars(stock_code, "D")
+        if bars.empty:
+            raise LookupError(f"無法獲取股票 {stock_code} 的數據")
+        name = self.cache.get(('name', stock_code), lambda: self.provider.name(stock_code))
+        close = bars['Close']
+        previous = close.iloc[-2] if len(close) > 1 else close.iloc[-1]
+        return {
+            '代號': stock_code,
+            'name': name or f"股票 {stock_code}",
+            'date': bars.index[-1].strftime('%Y-%m-%d'),
+            'price': close.iloc[-1],
+            'change': close.iloc[-1] - previous,
+            'change_pct': (close.iloc[-1] / previous - 1) * 100 if previous else None,
+            'volume': bars['Volume'].iloc[-1],
+        }
+
+    def bars_json(self, stock_code, timeframe="D"):
+        """K線（日期與各欄位陣列）"""
+        bars = self.bars(stock_code, timeframe)
+        return {
+            '代號': stock_code,
+            'timeframe': timeframe,
+            'dates': [d.strftime('%Y-%m-%d') for d in bars.index],
+            **{column.lower(): bars[column].tolist() for column in bars.columns},
+        }
+
+    def indicators(self, stock_code, timeframe="D"):
+        """最新技術指標"""
+        return self.cache.get(('indicators', stock_code, timeframe),
+                              lambda: {'代號': stock_code,
+                                       **latest_indicators(self.bars(stock_code, timeframe))})
+
+    def chip(self, stock_code):
+        """籌碼資料"""
+        data = self.cache.get(('chip', stock_code), lambda: self.provider.chip(stock_code))
+        if data is None:
+            raise LookupError(f"無法獲取股票 {stock_code} 的籌碼資料")
+        return {
+            '代號': stock_code,
+            'dates': [d.strftime('%Y-%m-%d') for d in data['dates']],
+            **{key: list(data[key]) for key in ('foreign', 'trust', 'dealer', 'margin', 'short')},
+            'holding': data['holding'],
+        }
+
+    def trades(self):
+        """交易紀錄（檔案修改後自動重新讀取）"""
+        mtime = os.path.getmtime(self.ledger_path) if os.path.exists(self.ledger_path) else 0
+        return self.cache.get(('trades', self.ledger_path, mtime),
+                              lambda: load_original_trades(self.ledger_path))
+
+    def holdings(self):
+        """目前持股，價格取自共用快取"""
+        return holdings_snapshot(self.trades(), with_prices=True,
+                                 price_func=lambda code: float(self.quote(code)['price']))
+
+    def history(self, stock_code):
+        """個股歷史交易記錄"""
+        return history_snapshot(self.trades(), [stock_code], workers=1)[0]
+
+    def metrics(self, stock_code=None):
+        """績效指標"""
+        trades = self.trades()
+        if stock_code:
+            return {'代號': stock_code,
+                    **calculate_performance_metrics(int(stock_code), trades)}
+        return {'代號': '全部', **calculate_performance_metrics(trades=trades)}
+
+    def stats(self):
+        """快取統計與上游抓取次數"""
+        return {**self.cache.stats, 'upstream_fetches': self.provider.fetches}
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """HTTP 請求處理：路徑 /<資源>/<代號>，回傳 JSON"""
+
+    service = None  # 由 create_server 設定
+    quiet = True
+
+    def _send(self, status, payload):
+        body = json.dumps(to_jsonable(payload), ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        query = {k: v[-1] for k, v in urllib.parse.parse_qs(url.query).items()}
+        parts = [p for p in url.path.split('/') if p]
+        resource, args = (parts[0], parts[1:]) if parts else ('', [])
+        timeframe = query.get('timeframe', 'D')
+        service = self.service
+
+        routes = {
+            'quote': (1, lambda code: service.quote(code)),
+            'bars': (1, lambda code: service.bars_json(code, timeframe)),
+            'indicators': (1, lambda code: service.indicators(code, timeframe)),
+            'chip': (1, lambda code: service.chip(code)),
+            'history': (1, lambda code: service.history(code)),
+            'holdings': (0, lambda: service.holdings()),
+            'metrics': (0, lambda: service.metrics(query.get('symbol'))),
+            'stats': (0, lambda: service.stats()),
+        }
+        if resource not in routes or len(args) != routes[resource][0]:
+            self._send(404, {'error': f"未知的路徑：{url.path}"})
+            return
+        if args and not args[0].isalnum():
+            self._send(400, {'error': f"股票代號格式錯誤：{args[0]}"})
+            return
+        if timeframe not in TIMEFRAMES.values():
+            self._send(400, {'error': f"不支援的K線週期：{timeframe}"})
+            return
+
+        try:
+            self._send(200, routes[resource][1](*args))
+        except LookupError as e:
+            self._send(404, {'error': str(e)})
+        except Exception as e:
+            print(f"處理 {url.path} 時出錯：{str(e)}")
+            self._send(502, {'error': str(e)})
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class ServiceServer(ThreadingHTTPServer):
+    """每個連線一個執行緒的 HTTP 服務"""
+
+    daemon_threads = True
+    request_queue_size = 128  # 預設 5：大量同時連線時會被拒絕並延遲 1 秒以上重送
+
+
+def create_server(service=None, host=SERVICE_HOST, port=SERVICE_PORT, quiet=True):
+    """建立（尚未啟動的）HTTP 服務；port 為 0 時自動選擇可用埠號"""
+    handler = type('BoundServiceHandler', (ServiceHandler,),
+                   {'service': service or QuoteService(), 'quiet': quiet})
+    return ServiceServer((host, port), handler)
+
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, replay=None, latency=0.0, ledger_path=None):
+    """啟動服務直到中斷（replay 指定錄製資料目錄時不連網）"""
+    provider = ReplayProvider(replay, latency) if replay else LiveProvider()
+    server = create_server(QuoteService(provider, ledger_path=ledger_path), host, port,
+                           quiet=False)
+    print(f"服務已啟動：http://{server.server_address[0]}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class ServiceClient:
+    """服務的用戶端（GUI 與其他程式共用服務的快取）"""
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def get(self, path, **params):
+        """GET 並解析 JSON；服務回傳錯誤時以服務的錯誤訊息拋出例外"""
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        if params:
+            url += '?' + urllib.parse.urlencode(params)
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode('utf-8')).get('error', str(e))
+            except ValueError:
+                message = str(e)
+            raise Exception(message) from e
+
+    def quote(self, stock_code):
+        """最新報價"""
+        return self.get(f"quote/{stock_code}")
@@ -0,0 +1,22 @@
+"""測試共用的合成資料"""
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_daily_bars(days=300, seed=0, start='2023-01-02', price=100.0):
+    """合成日K（交易日、OHLCV 欄位與 load_daily_bars 相同）"""
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    open_ = np.concatenate([[price], close[:-1]]) * np.exp(rng.normal(0, 0.005, days))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, days)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, days)))
+    volume = rng.integers(1_000, 100_000, days).astype('float64') * 1000
+    index = pd.bdate_range(start, periods=days)
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close,
+                         'Volume': volume}, index=index)
+
+
+@pytest.fixture
+def daily_bars():
+    return make_daily_bars()
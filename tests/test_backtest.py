@@ -0,0 +1,62 @@
+"""回測績效：零漂移隨機漫步不應被評為明顯獲利"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_core.backtest import STRATEGIES, backtest_strategy, run_parameter_sweep
+
+
+def random_walk_panel(seed=0, days=1000, stocks=20, sigma=0.02):
+    """零漂移（期望價格不變）的隨機漫步 OHLCV 面板"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(-sigma ** 2 / 2, sigma, (days, stocks)), axis=0))
+    prev = np.vstack([np.full(stocks, 100.0), close[:-1]])
+    open_ = prev * np.exp(rng.normal(0, 0.005, (days, stocks)))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.005, (days, stocks))))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.005, (days, stocks))))
+    index = pd.bdate_range('2015-01-01', periods=days)
+    columns = [str(1000 + i) for i in range(stocks)]
+    frame = lambda values: pd.DataFrame(values, index=index, columns=columns)
+    return {'Open': frame(open_), 'High': frame(high), 'Low': frame(low),
+            'Close': frame(close), 'Volume': frame(np.full((days, stocks), 1e6))}
+
+
+@pytest.mark.parametrize('strategy', list(STRATEGIES))
+def test_random_walk_is_not_strongly_profitable(strategy):
+    trades, metrics = backtest_strategy([], strategy, panel=random_walk_panel())
+
+    assert metrics['total_trades'] > 100
+    assert metrics['roi'] < 1
+    assert metrics['profit_factor'] < 1.2
+
+
+def test_backtest_ledger_scores_each_round_trip():
+    trades, metrics = backtest_strategy([], "KD交叉", panel=random_walk_panel(seed=1))
+
+    # 回測中同一檔股票同時最多一筆部位：每筆賣出的損益 = 賣出淨收入 + 對應買進支出
+    side = trades['買/賣/股利']
+    buys, sells = trades[side == '買'], trades[side == '賣']
+    trip = [buys.groupby('代號').cumcount(), sells.groupby('代號').cumcount()]
+    cost = dict(zip(zip(buys['代號'], trip[0]), buys['支出']))
+    profit = [income + cost[(code, n)]
+              for code, n, income in zip(sells['代號'], trip[1], sells['收入'])]
+
+    assert metrics['total_trades'] == len(profit)
+    assert metrics['total_return'] == pytest.approx(sum(profit))
+    assert metrics['win_trades'] == sum(p > 0 for p in profit)
+
+
+def test_empty_backtest_has_no_metrics():
+    trades, metrics = backtest_strategy([], "KD交叉", params={'n': 5000},
+                                        panel=random_walk_panel(days=50, stocks=2))
+    assert trades.empty and metrics == {}
+
+
+def test_parameter_sweep_finds_no_edge_in_random_walk():
+    space = {"n": [5, 9, 14], "m1": [3], "m2": [3]}
+
+    result = run_parameter_sweep(random_walk_panel(seed=2), "KD交叉", space, workers=2)
+
+    assert len(result) == 3
+    assert result['profit_factor'].max() < 1.2
+    assert result['roi'].max() < 1
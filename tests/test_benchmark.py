@@ -0,0 +1,45 @@
+"""相對基準的滾動 Beta、Alpha、追蹤誤差與資訊比率"""
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_core.benchmark import rolling_relative_metrics
+
+
+def _naive_relative(x, b, window, min_fraction=0.8):
+    """以 pandas rolling 計算同一組指標（對照用，資料不足一個視窗的開頭為 NaN）"""
+    valid = x.notna() & b.notna()
+    x, b = x.where(valid), b.where(valid)
+    rolling = dict(window=window, min_periods=max(2, math.ceil(min_fraction * window)))
+    beta = x.rolling(**rolling).cov(b) / b.rolling(**rolling).var()
+    alpha = (x.rolling(**rolling).mean() - beta * b.rolling(**rolling).mean()) * 252 * 100
+    tracking = (x - b).rolling(**rolling).std() * np.sqrt(252)
+    information = (x - b).rolling(**rolling).mean() * 252 / tracking
+    metrics = {'beta': beta, 'alpha': alpha, 'tracking_error': tracking * 100,
+               'information_ratio': information}
+    return {metric: values.where(np.arange(len(values)) >= window - 1)
+            for metric, values in metrics.items()}
+
+
+@pytest.mark.parametrize('window', [5, 20, 60])
+def test_rolling_relative_metrics_match_pandas_rolling(window):
+    rng = np.random.default_rng(window)
+    index = pd.bdate_range('2023-01-02', periods=300)
+    benchmark = pd.Series(rng.normal(0.0003, 0.01, len(index)), index=index)
+    returns = pd.DataFrame({
+        'A': 0.0002 + 1.3 * benchmark + rng.normal(0, 0.005, len(index)),
+        'B': -0.5 * benchmark + rng.normal(0, 0.02, len(index)),
+    }, index=index)
+    returns = returns.mask(rng.random(returns.shape) < 0.05)  # 停牌日
+    benchmark.iloc[[10, 11, 150]] = np.nan
+
+    result = rolling_relative_metrics(returns, benchmark, windows=(window,))
+
+    for name in returns.columns:
+        expected = _naive_relative(returns[name], benchmark, window)
+        for metric, values in expected.items():
+            assert values.notna().sum() > 200
+            np.testing.assert_allclose(result[(metric, window, name)], values,
+                                       rtol=1e-7, atol=1e-9, err_msg=f"{metric} {name}")
@@ -0,0 +1,71 @@
+"""圖表降採樣：LTTB 折線取樣與K棒合併"""
+import numpy as np
+import pytest
+
+from stock_core.charts import downsample_line, lttb_indices, ohlc_buckets
+
+
+def _ohlc(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = close + rng.normal(0, 0.5, n)
+    high = np.maximum(open_, close) + rng.random(n)
+    low = np.minimum(open_, close) - rng.random(n)
+    volume = rng.integers(1, 1000, n).astype('float64')
+    return open_, high, low, close, volume, np.arange(n, dtype='float64')
+
+
+@pytest.mark.parametrize('n, threshold', [(1000, 100), (1001, 3), (500, 499), (50, 7)])
+def test_lttb_keeps_endpoints_and_one_point_per_bucket(n, threshold):
+    rng = np.random.default_rng(n)
+    x = np.arange(n, dtype='float64')
+    y = np.cumsum(rng.normal(size=n))
+
+    indices = lttb_indices(x, y, threshold)
+
+    assert len(indices) == threshold
+    assert indices[0] == 0 and indices[-1] == n - 1
+    # 中間每個區間各取一點
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    assert (indices[1:-1] >= edges[:-1]).all() and (indices[1:-1] < edges[1:]).all()
+
+
+def test_lttb_keeps_spike_and_short_series():
+    y = np.zeros(1000)
+    y[437] = 50.0
+    assert 437 in lttb_indices(np.arange(1000.0), y, 20)
+    np.testing.assert_array_equal(lttb_indices(np.arange(5.0), np.ones(5), 10), np.arange(5))
+
+
+def test_downsample_line_skips_missing_values():
+    x = np.arange(2000, dtype='float64')
+    y = np.sin(x / 50)
+    y[:30] = np.nan
+    out_x, out_y = downsample_line(x, y, 200)
+    assert len(out_x) == 200 and np.isfinite(out_y).all()
+    assert out_x[0] == 30 and out_x[-1] == 1999
+
+
+@pytest.mark.parametrize('offset', [0, 1, 7])
+@pytest.mark.parametrize('n, max_bars', [(1000, 100), (1003, 64), (10, 3)])
+def test_ohlc_buckets_preserve_each_bucket(n, max_bars, offset):
+    open_, high, low, close, volume, x = _ohlc(n)
+
+    o, h, l, c, v, bx, k = ohlc_buckets(open_, high, low, close, volume, x, max_bars, offset)
+
+    assert k == -(-n // max_bars)
+    # 依絕對位置（offset + 索引）每 k 根分組，首組可能不足 k 根
+    groups = np.split(np.arange(n), np.flatnonzero((np.arange(1, n) + offset) % k == 0) + 1)
+    assert len(o) == len(groups) <= max_bars + (offset % k != 0)
+    for i, group in enumerate(groups):
+        assert o[i] == open_[group[0]] and c[i] == close[group[-1]]
+        assert h[i] == high[group].max() and l[i] == low[group].min()
+        assert v[i] * len(group) == pytest.approx(volume[group].sum())
+        assert bx[i] == pytest.approx(x[group].mean())
+    assert (v * [len(g) for g in groups]).sum() == pytest.approx(volume.sum())
+
+
+def test_ohlc_buckets_leave_short_series_unchanged():
+    open_, high, low, close, volume, x = _ohlc(50)
+    result = ohlc_buckets(open_, high, low, close, volume, x, 100)
+    assert result[-1] == 1 and result[1] is high
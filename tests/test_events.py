@@ -0,0 +1,100 @@
+"""事件匯流排：同一批事件合併分派，handler 出錯不影響其他訂閱者"""
+from stock_core.events import (BarsUpdated, EventBus, LedgerChanged, QuoteUpdated,
+                               SymbolSelected)
+
+
+class ManualLater:
+    """記錄排程的 call_later 替身，由測試決定何時執行"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, delay, func):
+        self.calls.append((delay, func))
+
+    def run(self):
+        calls, self.calls = self.calls, []
+        for _, func in calls:
+            func()
+
+
+def test_quote_updates_before_flush_are_merged():
+    later = ManualLater()
+    bus = EventBus(call_later=later)
+    received = []
+    bus.subscribe(QuoteUpdated, received.append)
+
+    bus.publish(QuoteUpdated(frozenset({'2330'})))
+    bus.publish(QuoteUpdated(frozenset({'2317', '2330'})))
+    bus.publish(QuoteUpdated(frozenset({'0050'})))
+
+    # 只排程一次，分派前訂閱者尚未收到
+    assert len(later.calls) == 1 and received == []
+    later.run()
+
+    assert received == [QuoteUpdated(frozenset({'2330', '2317', '0050'}))]
+    assert bus.stats == {'published': 3, 'coalesced': 2, 'flushes': 1, 'dispatched': 1}
+    assert bus.latest(QuoteUpdated) == received[0]
+
+
+def test_events_with_different_keys_are_kept_apart():
+    later = ManualLater()
+    bus = EventBus(call_later=later)
+    ledgers, bars, symbols = [], [], []
+    bus.subscribe(LedgerChanged, ledgers.append)
+    bus.subscribe(BarsUpdated, bars.append)
+    bus.subscribe(SymbolSelected, symbols.append)
+
+    bus.publish(LedgerChanged('a.csv'))
+    bus.publish(LedgerChanged('b.csv'))
+    bus.publish(LedgerChanged('a.csv'))
+    bus.publish(BarsUpdated(frozenset({'2330'}), frozenset({'1min'})))
+    bus.publish(BarsUpdated(frozenset({'2317'}), frozenset({'5min'})))
+    bus.publish(SymbolSelected('2330'))
+    bus.publish(SymbolSelected('2317'))
+    later.run()
+
+    assert ledgers == [LedgerChanged('a.csv'), LedgerChanged('b.csv')]
+    assert bars == [BarsUpdated(frozenset({'2330', '2317'}), frozenset({'1min', '5min'}))]
+    assert symbols == [SymbolSelected('2317')]
+
+
+def test_failing_handler_does_not_block_other_subscribers(capsys):
+    bus = EventBus()  # 未提供 call_later：發布即分派
+    received = []
+
+    def broken(event):
+        raise RuntimeError("畫面已關閉")
+
+    bus.subscribe(LedgerChanged, received.append)
+    bus.subscribe(LedgerChanged, broken)
+    bus.subscribe(LedgerChanged, lambda event: received.append(('second', event.path)))
+
+    bus.publish(LedgerChanged('stock_trades-original.csv'))
+
+    assert received == [LedgerChanged('stock_trades-original.csv'),
+                        ('second', 'stock_trades-original.csv')]
+    assert "處理 LedgerChanged 事件時出錯：畫面已關閉" in capsys.readouterr().out
+
+
+def test_events_published_during_flush_wait_for_next_batch():
+    later = ManualLater()
+    bus = EventBus(call_later=later)
+    received = []
+
+    def republish(event):
+        received.append(event)
+        if event.code == '2330':
+            bus.publish(SymbolSelected('2317'))
+
+    bus.subscribe(SymbolSelected, republish)
+    bus.publish(SymbolSelected('2330'))
+    later.run()
+    assert received == [SymbolSelected('2330')] and len(later.calls) == 1
+    later.run()
+    assert received == [SymbolSelected('2330'), SymbolSelected('2317')]
+
+    # replay 讓之後加入的訂閱者立即收到最後一次事件
+    late = []
+    bus.subscribe(SymbolSelected, late.append, replay=True)
+    assert late == [SymbolSelected('2317')]
@@ -0,0 +1,48 @@
+"""滾動最高/最低價：單調佇列與分塊累積兩種實作皆與 pandas rolling 一致"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_core import indicators
+
+
+def _random_high_low(shape, seed=0):
+    rng = np.random.default_rng(seed)
+    high = rng.normal(size=shape)
+    low = rng.normal(size=shape)
+    high[rng.random(shape) < 0.02] = np.nan
+    low[rng.random(shape) < 0.02] = np.nan
+    return high, low
+
+
+def _expected(high, low, n):
+    shape = high.shape
+    out_max = pd.DataFrame(high.reshape(shape[0], -1)).rolling(n).max().to_numpy()
+    out_min = pd.DataFrame(low.reshape(shape[0], -1)).rolling(n).min().to_numpy()
+    return out_max.reshape(shape), out_min.reshape(shape)
+
+
+@pytest.mark.parametrize('shape', [(300,), (301, 4)])
+@pytest.mark.parametrize('n', [1, 2, 9, 14, 300])
+def test_block_fallback_matches_pandas(monkeypatch, shape, n):
+    monkeypatch.setattr(indicators, '_extrema_kernel', False)  # 視為未安裝 numba
+    high, low = _random_high_low(shape)
+    out_max, out_min = indicators.rolling_extrema(high, low, n)
+    expected_max, expected_min = _expected(high, low, n)
+    np.testing.assert_allclose(out_max, expected_max)
+    np.testing.assert_allclose(out_min, expected_min)
+
+
+@pytest.mark.parametrize('n', [1, 9, 14])
+def test_monotonic_queue_kernel_matches_pandas(n):
+    high, low = _random_high_low((300,), seed=1)
+    out_max, out_min = np.empty(300), np.empty(300)
+    indicators._rolling_extrema_kernel(high, low, n, out_max, out_min)
+    expected_max, expected_min = _expected(high, low, n)
+    np.testing.assert_allclose(out_max, expected_max)
+    np.testing.assert_allclose(out_min, expected_min)
+
+
+def test_short_series_is_all_nan():
+    out_max, out_min = indicators.rolling_extrema([1.0, 2.0], [0.5, 1.5], 3)
+    assert np.isnan(out_max).all() and np.isnan(out_min).all()
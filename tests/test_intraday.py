@@ -0,0 +1,47 @@
+"""盤中分K：即時報價成交量（張）換算為股數，只有成交價寫入K棒"""
+import numpy as np
+
+from stock_core.intraday import SHARES_PER_LOT, IntradayStore
+from stock_core.realtime import QUOTE_FIELDS, QuoteTable, parse_mis_payload
+
+
+def test_quote_volume_is_converted_from_lots_to_shares():
+    table = QuoteTable(['2330'])
+    store = IntradayStore()
+    row = np.full(len(QUOTE_FIELDS), np.nan)
+    row[QUOTE_FIELDS.index('traded')] = 1
+    for seconds, price, lots in [(0, 100.0, 10), (20, 101.0, 15), (40, 99.0, 18)]:
+        row[QUOTE_FIELDS.index('price')] = price
+        row[QUOTE_FIELDS.index('volume')] = lots   # 當日累計成交量（張）
+        row[QUOTE_FIELDS.index('time')] = 1_700_000_000 + seconds
+        table.update(['2330'], ['台積電'], row[None, :])
+        store.add_quotes(table)
+
+    bars = store.bars('2330', '1min')
+
+    # 第一筆只作為累計量基準，之後兩次共增加 8 張
+    assert bars['Volume'].sum() == 8 * SHARES_PER_LOT
+    assert bars['High'].max() == 101.0
+
+
+def test_quoted_only_rows_are_not_written_to_bars():
+    # 2330 已有成交；6488 尚無成交，現價以最佳委買價代替
+    messages = [
+        {'c': '2330', 'n': '台積電', 'z': '580.00', 'v': '12', 'y': '575.00',
+         'b': '579.00_578.00_', 'a': '581.00_582.00_', 'tlong': '1700000000000'},
+        {'c': '6488', 'n': '環球晶', 'z': '-', 'v': '0', 'y': '400.00',
+         'b': '398.50_398.00_', 'a': '401.00_', 'tlong': '1700000000000'},
+    ]
+    codes, names, block = parse_mis_payload(messages)
+    assert block[:, QUOTE_FIELDS.index('traded')].tolist() == [1.0, 0.0]
+    assert block[1, QUOTE_FIELDS.index('price')] == 398.5
+
+    table = QuoteTable(['2330', '6488'])
+    table.update(codes, names, block)
+    store = IntradayStore()
+    store.add_quotes(table)
+
+    assert store.bars('2330', '1min')['Close'].tolist() == [580.0]
+    assert store.bars('6488', '1min').empty
+    # 報價表仍保留委買價供顯示
+    assert table.get('6488')['price'] == 398.5 and table.get('6488')['traded'] == 0
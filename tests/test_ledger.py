@@ -0,0 +1,105 @@
+"""交易紀錄績效統計"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_core.ledger import (TRADE_COLUMNS, _running_average_cost, calculate_fees,
+                               calculate_performance_metrics)
+
+
+def make_trades(rows):
+    """以 (日期, 買/賣, 代號, 股數, 價格) 建立交易紀錄（手續費與交易稅依 calculate_fees）"""
+    records = []
+    for date, side, code, shares, price in rows:
+        fee, tax = calculate_fees(price, shares, side == '買')
+        buy = side == '買'
+        records.append({
+            "交易日期": date, "買/賣/股利": side, "代號": code, "股票": str(code),
+            "交易類別": "現股", "買入股數": shares if buy else 0,
+            "買入價格": price if buy else 0, "賣出股數": 0 if buy else shares,
+            "賣出價格": 0 if buy else price, "現價": price, "手續費": fee, "交易稅": tax,
+            "交易成本": fee + tax, "支出": -(price * shares + fee) if buy else 0,
+            "收入": 0 if buy else price * shares - fee - tax,
+        })
+    return pd.DataFrame(records, columns=TRADE_COLUMNS)
+
+
+def test_repeated_round_trips_use_current_cost_basis():
+    trades = make_trades([
+        ("2024/01/02", '買', 2330, 1000, 100.0),
+        ("2024/01/10", '賣', 2330, 1000, 110.0),
+        ("2024/02/01", '買', 2330, 1000, 150.0),
+        ("2024/02/15", '賣', 2330, 1000, 140.0),
+        ("2024/03/01", '買', 2330, 1000, 90.0),
+        ("2024/03/20", '賣', 2330, 1000, 95.0),
+    ])
+    # 每次來回的損益 = 賣出淨收入 - 買進成本（含手續費）
+    expected = [trades['收入'][i + 1] + trades['支出'][i] for i in (0, 2, 4)]
+
+    metrics = calculate_performance_metrics(trades=trades)
+
+    assert metrics['total_trades'] == 3
+    assert metrics['win_trades'] == 2
+    assert metrics['loss_trades'] == 1
+    assert metrics['total_return'] == pytest.approx(sum(expected))
+    assert metrics['profit_factor'] == pytest.approx(
+        (expected[0] + expected[2]) / -expected[1])
+
+
+def test_partial_sells_keep_average_cost():
+    trades = make_trades([
+        ("2024/01/02", '買', 2317, 1000, 100.0),
+        ("2024/01/03", '買', 2317, 1000, 120.0),
+        ("2024/01/10", '賣', 2317, 1000, 130.0),
+        ("2024/01/11", '買', 2317, 1000, 80.0),
+        ("2024/01/20", '賣', 2317, 2000, 100.0),
+    ])
+    fee = trades['手續費']
+    # 前兩筆平均成本 110（含手續費），賣出一半後剩餘 1000 股成本不變，再買 1000 股
+    first_cost = (100 * 1000 + fee[0] + 120 * 1000 + fee[1]) / 2000
+    second_cost = (first_cost * 1000 + 80 * 1000 + fee[3]) / 2000
+    expected = [
+        130 * 1000 - fee[2] - trades['交易稅'][2] - first_cost * 1000,
+        100 * 2000 - fee[4] - trades['交易稅'][4] - second_cost * 2000,
+    ]
+
+    metrics = calculate_performance_metrics(trades=trades)
+
+    assert metrics['total_return'] == pytest.approx(sum(expected))
+    assert metrics['win_trades'] == 2
+
+
+def _average_cost_loop(codes, is_buy, is_sell, buy_shares, buy_cost, sell_shares):
+    """逐筆推進的平均成本（對照用）"""
+    avg_cost = np.zeros(len(codes))
+    shares, cost = {}, {}
+    for i in np.flatnonzero(is_buy | is_sell):
+        held, held_cost = shares.get(codes[i], 0.0), cost.get(codes[i], 0.0)
+        if is_buy[i]:
+            held += buy_shares[i]
+            held_cost += buy_cost[i]
+            avg_cost[i] = held_cost / held
+        else:
+            avg_cost[i] = held_cost / held if held > 0 else 0.0
+            held = max(held - sell_shares[i], 0.0)
+            held_cost = avg_cost[i] * held
+        shares[codes[i]], cost[codes[i]] = held, held_cost
+    return avg_cost
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_grouped_average_cost_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    size = 80
+    codes = rng.choice(['2330', '2317', '0050'], size).astype(object)
+    side = rng.choice(3, size, p=[0.45, 0.45, 0.1])  # 買、賣、股利
+    is_buy, is_sell = side == 0, side == 1
+    buy_shares = rng.integers(1, 5, size) * 1000.0
+    buy_cost = buy_shares * rng.uniform(10, 100, size)
+    # 含賣出 0 股、超賣與持股為 0 時賣出
+    sell_shares = np.where(is_sell, rng.integers(0, 6, size) * 500.0, np.nan)
+
+    np.testing.assert_allclose(
+        _running_average_cost(codes, is_buy, is_sell, buy_shares, buy_cost, sell_shares),
+        _average_cost_loop(codes, is_buy, is_sell, buy_shares, buy_cost, sell_shares),
+        rtol=1e-9)
@@ -0,0 +1,33 @@
+"""交易紀錄檔：附加交易後持股與歷史讀取同一個檔案"""
+from stock_core.ledger import append_trade, get_stock_holdings, load_original_trades
+
+
+def buy(code, shares, price):
+    return {"交易日期": "2024/03/01", "買/賣/股利": "買", "代號": code, "股票": "測試",
+            "交易類別": "一般", "買入股數": shares, "買入價格": price, "賣出股數": "",
+            "賣出價格": "", "現價": price, "手續費": 20, "交易稅": 0, "交易成本": 20,
+            "支出": f"-{price * shares + 20:,.0f}", "收入": ""}
+
+
+def test_appended_trades_are_read_back_as_holdings(tmp_path):
+    path = str(tmp_path / "trades.csv")
+
+    append_trade(buy(2330, 1000, 100.0), path)
+    append_trade(buy(2330, 1000, 120.0), path)
+
+    trades = load_original_trades(path)
+    holdings = get_stock_holdings(trades)
+    assert holdings[2330]['shares'] == 2000
+    assert holdings[2330]['avg_cost'] == 110.0
+    assert trades['支出'].tolist() == [-100020, -120020]
+
+
+def test_append_keeps_existing_column_order(tmp_path):
+    path = tmp_path / "trades.csv"
+    path.write_text("代號,交易日期,買/賣/股利,股票,交易類別,買入股數,買入價格,賣出股數,賣出價格,"
+                    "現價,手續費,交易稅,交易成本,支出,收入", encoding='utf-8')
+
+    append_trade(buy(2317, 1000, 100.0), str(path))
+
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert lines[1].startswith("2317,2024/03/01,買")
@@ -0,0 +1,74 @@
+"""台股資料：日K推導週/月K的增量更新與報價查詢"""
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from stock_core import market
+from stock_core.market import fetch_quote, resample_bars, update_resampled_bars
+
+from conftest import make_daily_bars
+
+
+@pytest.mark.parametrize('timeframe', ['W', 'M'])
+@pytest.mark.parametrize('split', [150, 151, 152, 153, 154, 170])
+def test_incremental_update_matches_full_resample(timeframe, split):
+    daily = make_daily_bars(days=220)
+    cached = resample_bars(daily.iloc[:split], timeframe)
+
+    # 之後的日K逐日補進（最後一根週/月K尚未完成時持續更新）
+    bars = cached
+    for end in range(split + 1, len(daily) + 1):
+        bars = update_resampled_bars(bars, daily.iloc[:end], timeframe)
+
+    pd.testing.assert_frame_equal(bars, resample_bars(daily, timeframe))
+
+
+@pytest.mark.parametrize('timeframe', ['W', 'M'])
+def test_partial_last_bar_is_replaced_not_appended(timeframe):
+    daily = make_daily_bars(days=60)
+    bars = resample_bars(daily.iloc[:-1], timeframe)
+    # 最後一天改成新高與大量，應更新最後一根K棒的高、收、量
+    changed = daily.copy()
+    changed.iloc[-1, changed.columns.get_loc('High')] = 1_000.0
+    changed.iloc[-1, changed.columns.get_loc('Volume')] += 1e9
+
+    updated = update_resampled_bars(bars, changed, timeframe)
+    full = resample_bars(changed, timeframe)
+
+    pd.testing.assert_frame_equal(updated, full)
+    assert updated['High'].iloc[-1] == 1_000.0
+    assert updated['Volume'].sum() == pytest.approx(changed['Volume'].sum())
+
+
+def test_daily_timeframe_is_returned_as_is():
+    daily = make_daily_bars(days=10)
+    assert resample_bars(daily, 'D') is daily
+
+
+class FakeTicker:
+    """只有指定代碼有日K的 yfinance.Ticker 替身"""
+    listed = {}
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.info = {'longName': f"名稱{symbol}"}
+
+    def history(self, period):
+        return self.listed.get(self.symbol, pd.DataFrame())
+
+
+def test_fetch_quote_switches_exchange_suffix(monkeypatch):
+    monkeypatch.setattr(market, 'yf', SimpleNamespace(Ticker=FakeTicker))
+    daily = make_daily_bars(days=5)
+    code = market.format_stock_code("6488")
+    other = "6488.TW" if code.endswith('.TWO') else "6488.TWO"
+    monkeypatch.setattr(FakeTicker, 'listed', {other: daily})
+
+    price, date, name = fetch_quote("6488")
+
+    assert price == daily['Close'].iloc[-1]
+    assert date == daily.index[-1].strftime("%Y-%m-%d")
+    assert name == f"名稱{other}"
+    with pytest.raises(Exception, match="無法獲取股票 1234"):
+        fetch_quote("1234")
@@ -0,0 +1,42 @@
+"""投資組合績效：時間加權報酬與期間報酬"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_core.ledger import TRADE_COLUMNS
+from stock_core.portfolio import build_equity_curve, calculate_portfolio_metrics, period_returns
+
+
+def _trade(date, side, shares, price):
+    buy = side == '買'
+    return {"交易日期": date, "買/賣/股利": side, "代號": 2330, "股票": "台積電",
+            "買入股數": shares if buy else 0, "買入價格": price if buy else 0,
+            "賣出股數": 0 if buy else shares, "賣出價格": 0 if buy else price,
+            "手續費": 0, "交易稅": 0, "收入": 0 if buy else price * shares}
+
+
+def test_time_weighted_return_with_second_deposit():
+    dates = pd.to_datetime(['2024-01-30', '2024-01-31', '2024-02-01', '2024-02-02',
+                            '2024-02-05'])
+    closes = pd.DataFrame({'2330': [100.0, 110.0, 99.0, 120.0, 120.0]}, index=dates)
+    trades = pd.DataFrame([_trade('2024/01/30', '買', 1000, 100.0),
+                           _trade('2024/02/01', '買', 1000, 99.0),   # 第二次投入 99,000
+                           _trade('2024/02/05', '賣', 2000, 120.0)], columns=TRADE_COLUMNS)
+
+    curve = build_equity_curve(trades, closes)
+
+    # 投入資金視為當日開盤前存入：2/1 的期初資產 = 前一日淨值 110,000 + 99,000
+    expected = [0.0, 0.10, 198_000 / 209_000 - 1, 240_000 / 198_000 - 1, 0.0]
+    np.testing.assert_allclose(curve['return'], expected)
+    np.testing.assert_allclose(curve['deposits'].iloc[-1], 199_000)
+    np.testing.assert_allclose(curve['equity'].iloc[-1], 240_000)
+    twr = 1.10 * 240_000 / 209_000 - 1
+    assert curve['nav'].iloc[-1] - 1 == pytest.approx(twr)
+    # 與金額加權的報酬（41,000 / 199,000）不同
+    assert calculate_portfolio_metrics(curve)['twr'] == pytest.approx(twr * 100)
+    assert twr != pytest.approx(41_000 / 199_000)
+
+    monthly = period_returns(curve, 'M')
+    assert list(monthly['期間']) == ['2024-01', '2024-02']
+    np.testing.assert_allclose(monthly['報酬率'], [0.10, 240_000 / 209_000 - 1])
+    np.testing.assert_allclose(monthly['累計報酬'], [0.10, twr])
@@ -0,0 +1,48 @@
+"""停損/停利與自訂價位警示"""
+import numpy as np
+
+from stock_core.risk import ABOVE, ALERT_ACTIONS, BELOW, AlertEngine
+
+HOLDINGS = {'2330': {'name': '台積電', 'shares': 1000, 'avg_cost': 100.0}}
+
+
+def check(engine, price, now):
+    return engine.check(np.array([price] * len(engine.symbols)), now=now)
+
+
+def test_stop_loss_and_take_profit_have_distinct_actions():
+    engine = AlertEngine()
+    engine.set_positions(HOLDINGS, stop_loss=10, take_profit=10)
+
+    stop = check(engine, 89.0, now=0)
+    take = check(engine, 111.0, now=1000)
+
+    assert [a.kind for a in stop] == ["停損"]
+    assert stop[0].message.endswith(ALERT_ACTIONS["停損"])
+    assert [a.kind for a in take] == ["停利"]
+    assert take[0].message.endswith(ALERT_ACTIONS["停利"])
+
+
+def test_custom_rules_give_buy_and_sell_hints_by_direction():
+    engine = AlertEngine()
+    engine.add_rule('2317', BELOW, 90, name='鴻海')
+    engine.add_rule('2317', ABOVE, 120, name='鴻海')
+
+    low = check(engine, 85.0, now=0)
+    high = check(engine, 125.0, now=1000)
+
+    assert low[0].message.endswith(ALERT_ACTIONS[BELOW])
+    assert high[0].message.endswith(ALERT_ACTIONS[ABOVE])
+
+
+def test_alert_is_debounced_until_price_recovers():
+    engine = AlertEngine(cooldown=300)
+    engine.set_positions(HOLDINGS, stop_loss=10, take_profit=10)
+
+    assert len(check(engine, 89.0, now=0)) == 1
+    assert check(engine, 88.0, now=400) == []      # 仍在門檻下，不重複提醒
+    check(engine, 95.0, now=450)                   # 回到門檻外，重新啟用
+    assert len(check(engine, 89.0, now=500)) == 1
+    check(engine, 95.0, now=550)
+    assert check(engine, 89.0, now=600) == []      # 距上次提醒未滿冷卻時間
+    assert len(check(engine, 89.0, now=800)) == 1
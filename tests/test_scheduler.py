@@ -0,0 +1,158 @@
+"""定時更新排程器：參考計數、進行中合併、休市延後與每個資料流一次抓取"""
+from datetime import datetime
+
+import pytest
+
+from stock_core.scheduler import POST_CLOSE_INTERVAL, RefreshScheduler
+
+
+class FakeTimers:
+    """以手動觸發取代 root.after / after_cancel"""
+
+    def __init__(self):
+        self.pending = {}  # 代號 -> (毫秒, 函式)
+        self.next_id = 0
+
+    def call_later(self, ms, func):
+        self.next_id += 1
+        self.pending[self.next_id] = (ms, func)
+        return self.next_id
+
+    def cancel(self, timer_id):
+        self.pending.pop(timer_id, None)
+
+    def fire_all(self):
+        timers, self.pending = self.pending, {}
+        for _, func in timers.values():
+            func()
+
+    def delays(self):
+        return sorted(ms for ms, _ in self.pending.values())
+
+
+class FakeAsync:
+    """背景抓取先暫存，由測試決定何時完成"""
+
+    def __init__(self):
+        self.tasks = []
+
+    def __call__(self, task, on_done, on_error):
+        self.tasks.append((task, on_done, on_error))
+
+    def complete_all(self):
+        tasks, self.tasks = self.tasks, []
+        for task, on_done, on_error in tasks:
+            try:
+                result = task()
+            except Exception as e:
+                on_error(e)
+            else:
+                on_done(result)
+
+
+MONDAY_OPEN = datetime(2024, 3, 4, 10, 0)
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # 不讀取工作目錄中的休市日清單
+    timers, run_async = FakeTimers(), FakeAsync()
+    now = {'time': MONDAY_OPEN}
+    scheduler = RefreshScheduler(timers.call_later, timers.cancel, run_async,
+                                 clock=lambda: now['time'])
+    return scheduler, timers, run_async, now
+
+
+def _counter(calls, key):
+    def fetch():
+        calls[key] = calls.get(key, 0) + 1
+        return f"{key}#{calls[key]}"
+    return fetch
+
+
+def test_subscribers_are_reference_counted(env):
+    scheduler, timers, run_async, _ = env
+    calls, received = {}, []
+    first, second = received.append, lambda result: received.append(('second', result))
+
+    scheduler.subscribe('2330', _counter(calls, '2330'), first, interval=30)
+    scheduler.subscribe('2330', _counter(calls, '2330'), first, interval=30)
+    run_async.complete_all()
+    scheduler.subscribe('2330', _counter(calls, '2330'), second, interval=30)
+
+    # 後加入的訂閱者直接收到最後結果，不會再抓一次
+    assert calls == {'2330': 1}
+    assert received == ['2330#1', ('second', '2330#1')]
+    assert scheduler.active_streams() == {'2330': 3}
+    assert timers.delays() == [30_000]
+
+    scheduler.unsubscribe('2330', first)
+    scheduler.unsubscribe('2330', second)
+    assert scheduler.active_streams() == {'2330': 1} and len(timers.pending) == 1
+    scheduler.unsubscribe('2330', first)
+    assert scheduler.active_streams() == {} and not timers.pending
+
+
+def test_refresh_requests_merge_while_in_flight(env):
+    scheduler, timers, run_async, _ = env
+    calls, received = {}, []
+
+    scheduler.subscribe('2317', _counter(calls, '2317'), received.append)
+    scheduler.refresh('2317')
+    scheduler.refresh('2317')
+    assert len(run_async.tasks) == 1 and not timers.pending
+
+    run_async.complete_all()
+    assert calls == {'2317': 1} and received == ['2317#1']
+    assert scheduler.stats == {'fetches': 1, 'coalesced': 2, 'errors': 0}
+    assert len(timers.pending) == 1
+
+
+def test_delay_follows_market_phase(env):
+    scheduler, timers, run_async, now = env
+    scheduler.subscribe('0050', lambda: 1, lambda result: None, interval=60)
+    run_async.complete_all()
+    assert timers.delays() == [60_000]
+
+    now['time'] = datetime(2024, 3, 4, 13, 45)  # 收盤後一小時內
+    scheduler.refresh('0050')
+    run_async.complete_all()
+    assert timers.delays() == [POST_CLOSE_INTERVAL * 1000]
+
+    now['time'] = datetime(2024, 3, 9, 10, 0)  # 週六：等到週一開盤
+    scheduler.refresh('0050')
+    run_async.complete_all()
+    wait = datetime(2024, 3, 11, 8, 30) - now['time']
+    assert timers.delays() == [int(wait.total_seconds() * 1000)]
+
+
+def test_each_stream_fetches_once_per_tick(env):
+    scheduler, timers, run_async, _ = env
+    calls, received = {}, []
+    keys = ['2330', '2317', '2454']
+    for key in keys:
+        for i in range(3):
+            scheduler.subscribe(key, _counter(calls, key),
+                                lambda result, i=i: received.append((i, result)))
+    run_async.complete_all()
+
+    for tick in range(2, 5):
+        timers.fire_all()
+        run_async.complete_all()
+        assert calls == {key: tick for key in keys}
+    assert len(timers.pending) == len(keys)
+    assert len(received) == 4 * len(keys) * 3
+
+
+def test_fetch_error_reaches_handlers_and_reschedules(env):
+    scheduler, timers, run_async, _ = env
+    errors = []
+
+    def fail():
+        raise ConnectionError("連線逾時")
+
+    scheduler.subscribe('6488', fail, lambda result: None, on_error=errors.append)
+    run_async.complete_all()
+
+    assert [str(e) for e in errors] == ["連線逾時"]
+    assert scheduler.stats['errors'] == 1 and len(timers.pending) == 1
@@ -0,0 +1,46 @@
+"""全市場選股：分片平行篩選與單一程序逐檔篩選結果一致"""
+import pandas as pd
+import pytest
+
+from stock_core.market import save_daily_bars
+from stock_core.screener import _screen_shard, run_screener
+
+from conftest import make_daily_bars
+
+CONDITIONS = [("站上均線", {'period': 20}), ("RSI低於門檻", {'threshold': 50}),
+              ("KD黃金交叉", {})]
+
+
+@pytest.fixture
+def universe(tmp_path, monkeypatch):
+    """在暫存目錄建立日K快取檔，回傳對應的股票清單"""
+    monkeypatch.chdir(tmp_path)
+    rows = []
+    for i in range(24):
+        code = str(1101 + i)
+        symbol = f"{code}.TW"
+        # 第一檔資料不足、第二檔沒有快取檔，兩者都應被略過
+        if i != 1:
+            save_daily_bars(symbol, make_daily_bars(days=10 if i == 0 else 200, seed=i))
+        rows.append((code, f"股票{code}", symbol))
+    return pd.DataFrame(rows, columns=["代號", "股票", "symbol"])
+
+
+def test_sharded_run_matches_serial(universe):
+    rows = list(universe.itertuples(index=False, name=None))
+    serial = pd.DataFrame(_screen_shard(rows, CONDITIONS, {}, 2))
+    serial = serial.sort_values(["符合條件數", "成交值"], ascending=False, ignore_index=True)
+
+    for workers in (1, 3):
+        result = run_screener(CONDITIONS, universe=universe, min_match=2, workers=workers)
+        pd.testing.assert_frame_equal(result, serial)
+
+    assert 0 < len(serial) < len(universe) - 2
+    assert not {"1101", "1102"} & set(serial["代號"])
+
+
+def test_min_match_defaults_to_all_conditions(universe):
+    result = run_screener(CONDITIONS[:2], universe=universe, workers=2)
+    assert (result["符合條件數"] == 2).all()
+    loose = run_screener(CONDITIONS[:2], universe=universe, min_match=1, workers=2)
+    assert set(result["代號"]) <= set(loose["代號"])
@@ -0,0 +1,76 @@
+"""服務快取：同一個 key 的同時請求只向上游載入一次"""
+import threading
+import time
+
+import pytest
+
+from stock_core.service import SharedCache, SingleFlight
+
+THREADS = 16
+
+
+def _concurrent_gets(cache, key, loader):
+    """THREADS 個執行緒同時 get，回傳各執行緒的 ('ok', 值) 或 ('error', 例外)"""
+    barrier = threading.Barrier(THREADS)
+    results = [None] * THREADS
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = ('ok', cache.get(key, loader))
+        except Exception as e:
+            results[i] = ('error', e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in threads)
+    return results
+
+
+def _slow_loader(calls, result=None, error=None):
+    """記錄呼叫次數，等待其他執行緒都進入 get 後才回傳（或拋出例外）"""
+    def loader():
+        calls.append(threading.get_ident())
+        time.sleep(0.2)
+        if error is not None:
+            raise error
+        return result
+    return loader
+
+
+def test_concurrent_gets_share_one_load():
+    cache = SharedCache({'bars': 60})
+    calls = []
+    value = object()
+
+    results = _concurrent_gets(cache, ('bars', '2330'), _slow_loader(calls, result=value))
+
+    assert len(calls) == 1
+    assert results == [('ok', value)] * THREADS
+    assert cache.stats['loads'] == 1 and cache.stats['coalesced'] == THREADS - 1
+    # 之後的請求直接命中快取
+    assert cache.get(('bars', '2330'), lambda: pytest.fail("不應重新載入")) is value
+    assert cache.stats['hits'] == 1
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    cache = SharedCache({'quote': 60})
+    calls = []
+    error = LookupError("上游無資料")
+
+    results = _concurrent_gets(cache, ('quote', '9999'), _slow_loader(calls, error=error))
+
+    assert len(calls) == 1
+    assert all(kind == 'error' and e is error for kind, e in results)
+    assert cache.stats['errors'] == THREADS
+    # 失敗不會留在快取中，下一次請求重新載入
+    assert cache.get(('quote', '9999'), lambda: 42) == 42
+
+
+def test_single_flight_runs_again_after_completion():
+    flight = SingleFlight()
+    assert flight.do('key', lambda: 1) == (1, False)
+    assert flight.do('key', lambda: 2) == (2, False)